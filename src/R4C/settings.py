@@ -1,8 +1,14 @@
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# `manage.py test` keeps its logs, caches and reports apart from the ones of the running project
+TESTING = sys.argv[1:2] == ["test"]
+RUNTIME_DIR = Path(tempfile.gettempdir()) / "r4c_test" if TESTING else BASE_DIR
+
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = "mztx@x_-=gfhc9xs@bm58m&@3pc7##opo14zob!(l2tus05+jo"
 
@@ -28,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that the time of other middleware is measured as well
+    "home.middleware.metrics_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -64,7 +72,67 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
-    }
+        # Keep connections open between requests instead of opening a new one for every request
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        # File rather than in-memory database, so concurrent writers in tests wait for each other up to `busy_timeout`
+        # like in production. Shared in-memory one fails with "database table is locked" instead.
+        # It's in the temporary directory, since WAL files of connections left open by test threads outlive it.
+        "TEST": {"NAME": Path(tempfile.gettempdir()) / "r4c_test.sqlite3"},
+    },
+    # Copy of `default` made by `sync_replica` command. Reports are read from it, see `home.utils.replica`.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "replica.sqlite3",
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+    },
+}
+
+DATABASE_ROUTERS = ["home.utils.replica.ReportReplicaRouter"]
+
+# Database alias report reads are sent to or `None` to read everything from `default`.
+# Replica is used only while its last sync is known to be no older than `REPORTS_REPLICA_MAX_LAG` seconds.
+# Sync time is kept in `replica` cache, which is shared with the process running `sync_replica` command.
+REPORTS_REPLICA = "replica"
+REPORTS_REPLICA_MAX_LAG = 60
+
+# Executed on every new SQLite connection, see `home.utils.signals`. Empty `dict` keeps SQLite defaults.
+# WAL lets reports be read while robots are written, and writers wait for each other up to `busy_timeout` ms.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+}
+
+
+# Queries slower than that are logged by `home.middleware` while metrics are collected. `None` disables the logging.
+SLOW_QUERY_THRESHOLD_MS = 200
+
+
+# Cache
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Rendered reports and production generation, see `robots.utils.cache`. The generation is bumped by every
+    # process that commits robots (e.g. `import_robots` command), so it must be shared by all of them.
+    "reports": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": RUNTIME_DIR / "cache" / "reports",
+        "TIMEOUT": 60 * 60,
+        "OPTIONS": {
+            "MAX_ENTRIES": 64,
+        },
+    },
+    # Sync time of `REPORTS_REPLICA`, see `home.utils.replica`. Written by `sync_replica` command and read by every
+    # process serving reports, so it must be shared by all of them. SQLite replica is on the same host anyway.
+    "replica": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": RUNTIME_DIR / "cache" / "replica",
+    },
 }
 
 
@@ -88,20 +156,22 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Logging
 
-LOGS_DIR = BASE_DIR / "logs"
-LOGS_DIR.mkdir(exist_ok=True)
+LOGS_DIR = RUNTIME_DIR / "logs"
+LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "handlers": {
+        # Logging threads only queue records. Every process formats and writes them in a thread of its own
+        # into a file per day shared by all processes, see `home.utils.log`.
         "info_to_file": {
-            "class": "logging.handlers.TimedRotatingFileHandler",
+            "class": "home.utils.log.BackgroundHandler",
             "filename": LOGS_DIR / "log",
             "level": "INFO",
-            "formatter": "general",
-            "when": "midnight",
-            "backupCount": 30,
+            "formatter": "json",
+            "backup_count": 30,
+            "queue_size": 10_000,
         },
     },
     "loggers": {
@@ -111,9 +181,9 @@ LOGGING = {
         },
     },
     "formatters": {
-        "general": {
-            "format": "[{asctime}] [{levelname}] {name}: {message}",
-            "style": "{",
+        # One JSON object per line, see `home.utils.log.JsonFormatter`
+        "json": {
+            "()": "home.utils.log.JsonFormatter",
         },
     },
 }
@@ -146,5 +216,26 @@ DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
-REPORTS_DIR = BASE_DIR / "reports"
-REPORTS_DIR.mkdir(exist_ok=True)
+DEFAULT_FROM_EMAIL = "info@robocomplex.com"
+
+# Threads generating reports for async views
+REPORTS_MAX_WORKERS = 2
+
+# If on, robots added by `new_robot_view` are committed in batches of up to `ROBOTS_GROUP_COMMIT_BATCH_SIZE` robots
+# received within `ROBOTS_GROUP_COMMIT_DELAY_MS` ms, see `robots.utils.group_commit`. Requests are answered only once
+# their batch is committed. If `ROBOTS_GROUP_COMMIT_QUEUE_SIZE` robots are already waiting, requests get 429.
+ROBOTS_GROUP_COMMIT = False
+ROBOTS_GROUP_COMMIT_BATCH_SIZE = 500
+ROBOTS_GROUP_COMMIT_DELAY_MS = 2
+ROBOTS_GROUP_COMMIT_QUEUE_SIZE = 5000
+
+# Production totals are snapshotted to DB every that many `ProductionEvent` rows, see `robots.utils.counters`
+PRODUCTION_SNAPSHOT_EVERY = 10_000
+
+# Robots assembled more than that many days ago are moved to `ArchivedRobot` by `archive_robots` command.
+# Don't increase it once robots are archived: newer ones are never looked up in the archive. `None` disables archival.
+ROBOTS_ARCHIVE_AFTER_DAYS = 365
+
+# Reports built by `run_report_jobs` command. They're deleted `REPORTS_TTL` seconds after they're finished.
+REPORTS_DIR = RUNTIME_DIR / "reports"
+REPORTS_TTL = 60 * 60
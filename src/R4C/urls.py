@@ -3,11 +3,12 @@ from django.urls import path, include
 from django.views.generic import RedirectView
 from django.templatetags.static import static
 
-from home.views import index_view
+from home.views import index_view, metrics_view
 
 
 urlpatterns = [
     path("", index_view),
+    path("metrics", metrics_view, name="metrics_view"),
     path("admin/", admin.site.urls),
     path("robots/", include("robots.urls")),
     path("orders/", include("orders.urls")),
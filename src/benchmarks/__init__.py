@@ -0,0 +1,46 @@
+"""Offline benchmarks. Run from `src` directory, e.g. `python -m benchmarks.robot_indexes --help`.
+Every benchmark works with its own temporary SQLite database and never touches `db.sqlite3`.
+"""
+
+import os
+import statistics
+import time
+from pathlib import Path
+
+import django
+
+
+def setup_django(db_path: Path) -> None:
+    """Configure Django to use SQLite database at `db_path` (and its replica next to it) and initialize apps"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "R4C.settings")
+
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.DATABASES["replica"]["NAME"] = db_path.with_suffix(".replica.sqlite3")
+    django.setup()
+
+
+def measure(func, repeat: int) -> dict[str, float]:
+    """Call `func` `repeat` times. Return median and max wall time in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {"median_ms": round(statistics.median(timings), 3), "max_ms": round(max(timings), 3)}
+
+
+def percentiles(timings: list[float]) -> dict[str, float]:
+    """Return median, 90th and 99th percentiles and max of `timings` (in seconds) in milliseconds"""
+    if len(timings) < 2:
+        return {"max_ms": round(max(timings, default=0) * 1000, 3)}
+
+    quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "p90_ms": round(quantiles[89] * 1000, 3),
+        "p99_ms": round(quantiles[98] * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+    }
@@ -0,0 +1,90 @@
+"""Compare throughput of sync and async views served through ASGI handler by `AsyncClient`.
+
+python -m benchmarks.async_views --requests 2000 --concurrency 50
+"""
+
+import time
+import json
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks import setup_django
+
+
+async def _run(client, requests: list[tuple[str, str, dict]], concurrency: int) -> dict[str, float]:
+    """Send `requests` as (method, url, kwargs) with at most `concurrency` of them in flight. Return throughput."""
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = {}
+
+    async def send(method: str, url: str, kwargs: dict) -> None:
+        async with semaphore:
+            response = await getattr(client, method)(url, **kwargs)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(*request) for request in requests))
+    elapsed = time.perf_counter() - start
+
+    return {"requests_per_second": round(len(requests) / elapsed, 1), "statuses": statuses}
+
+
+async def _benchmark(count: int, concurrency: int) -> dict:
+    from django.urls import reverse
+    from django.test import AsyncClient
+    from django.utils import timezone as tz
+
+    client = AsyncClient()
+    now = tz.localtime().replace(microsecond=0, tzinfo=None)
+    results = {}
+
+    for offset, view in enumerate(("new_robot_view", "new_robot_async_view")):
+        requests = [
+            (
+                "post",
+                reverse(view),
+                {
+                    "data": {
+                        "model": "R2",
+                        "version": "D2",
+                        "created": f"{now - tz.timedelta(seconds=idx * 2 + offset)}",
+                    },
+                    "content_type": "application/json",
+                },
+            )
+            for idx in range(count)
+        ]
+        results[view] = await _run(client, requests, concurrency)
+
+    for view in ("new_order_view", "new_order_async_view"):
+        data = {"serial": "X5-LT", "email": "address@example.org"}
+        results[view] = await _run(client, [("post", reverse(view), {"data": data})] * count, concurrency)
+
+    for view in ("last_week_stats_view", "last_week_stats_async_view"):
+        results[view] = await _run(client, [("get", reverse(view), {})] * count, concurrency)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per view")
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(Path(tmp_dir) / "bench.sqlite3")
+
+        from django.core.management import call_command
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        call_command("migrate", verbosity=0)
+        results = asyncio.run(_benchmark(args.requests, args.concurrency))
+
+    print(json.dumps({"requests": args.requests, "concurrency": args.concurrency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
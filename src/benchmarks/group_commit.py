@@ -0,0 +1,107 @@
+"""Compare per-request commits with group commit (`ROBOTS_GROUP_COMMIT`) of robots posted to `new_robot_view`
+by `Client` in several threads at various concurrency levels. Every robot is acknowledged only once committed.
+
+python -m benchmarks.group_commit --concurrency 1 8 32 --requests 2000 --synchronous FULL
+"""
+
+import json
+import time
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+from benchmarks import setup_django, percentiles
+
+
+def _run(threads_count: int, count: int, offset: int) -> dict:
+    """Post `count` robots from `threads_count` threads at once. Return throughput, latencies and error statuses."""
+    from django.urls import reverse
+    from django.db import connections, close_old_connections
+    from django.test import Client
+
+    lock = threading.Lock()
+    timings, statuses = [], {}
+    barrier = threading.Barrier(threads_count)
+
+    def worker(idx: int) -> None:
+        client = Client(raise_request_exception=False)
+        barrier.wait()
+        try:
+            for n in range(idx, count, threads_count):
+                # Every robot is assembled at its own second
+                created = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(offset + n))
+                data = {"model": "R2", "version": "D2", "created": created}
+                start = time.perf_counter()
+                response = client.post(reverse("new_robot_view"), data=data, content_type="application/json")
+                # `Client` keeps connections open, unlike real handlers, which close old ones after every request
+                close_old_connections()
+                with lock:
+                    timings.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(threads_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {"robots_per_second": round(count / elapsed, 1), "statuses": statuses, "latency": percentiles(timings)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Threads posting robots")
+    parser.add_argument("--requests", type=int, default=2000, help="Robots per concurrency level and mode")
+    parser.add_argument(
+        "--synchronous",
+        choices=("OFF", "NORMAL", "FULL"),
+        default="FULL",
+        help="SQLite `synchronous` pragma. With `FULL` every commit is an fsync.",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(Path(tmp_dir) / "bench.sqlite3")
+
+        from django.conf import settings
+        from django.db import connections
+        from django.core.management import call_command
+        from django.test.utils import setup_test_environment
+
+        from robots.utils.factory import group_commit_writer
+
+        setup_test_environment()
+        settings.SQLITE_PRAGMAS = {**settings.SQLITE_PRAGMAS, "synchronous": args.synchronous}
+        call_command("migrate", verbosity=0)
+        connections.close_all()
+
+        # Recent seconds, so robots aren't old enough to be looked up in the archive
+        results, offset = {}, int(time.time()) - 2 * len(args.concurrency) * args.requests
+        for mode in ("per_request", "group_commit"):
+            settings.ROBOTS_GROUP_COMMIT = mode == "group_commit"
+            for concurrency in args.concurrency:
+                results.setdefault(mode, {})[concurrency] = _run(concurrency, args.requests, offset)
+                offset += args.requests
+            group_commit_writer.stop()
+
+    print(
+        json.dumps(
+            {
+                "requests": args.requests,
+                "synchronous": args.synchronous,
+                "batch_size": settings.ROBOTS_GROUP_COMMIT_BATCH_SIZE,
+                "delay_ms": settings.ROBOTS_GROUP_COMMIT_DELAY_MS,
+                **results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure `import_robots` command throughput in rows per second for CSV and NDJSON files.
+
+python -m benchmarks.import_robots --rows 500000
+"""
+
+import io
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks import setup_django
+
+
+def _write_file(path: Path, import_format: str, rows: int, start: datetime) -> None:
+    """Write `rows` records of robots assembled every second, starting at `start`"""
+    models = [f"{n:02}" for n in range(50)]
+    versions = ("A1", "B2", "C3", "D4")
+
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        if import_format == "csv":
+            file.write("model,version,created\n")
+        for idx in range(rows):
+            model, version = models[idx % len(models)], versions[idx % len(versions)]
+            created = f"{start + timedelta(seconds=idx):%Y-%m-%d %H:%M:%S}"
+            if import_format == "csv":
+                file.write(f"{model},{version},{created}\n")
+            else:
+                file.write(json.dumps({"model": model, "version": version, "created": created}) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="Rows per file")
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(Path(tmp_dir) / "bench.sqlite3")
+
+        from django.conf import settings
+        from django.core.management import call_command
+        from django.utils import timezone as tz
+
+        # Measure like production. With `DEBUG`, every query is formatted along with its params to be logged,
+        # which takes longer than some of the queries themselves.
+        settings.DEBUG = False
+
+        call_command("migrate", verbosity=0)
+
+        # Robots assembled recently, so they're never looked up in the archive
+        formats = ("csv", "ndjson")
+        first_created = tz.localtime().replace(microsecond=0, tzinfo=None) - timedelta(seconds=len(formats) * args.rows)
+        results = {}
+        for offset, import_format in enumerate(formats):
+            path = Path(tmp_dir) / f"robots.{import_format}"
+            _write_file(path, import_format, args.rows, first_created + timedelta(seconds=offset * args.rows))
+
+            start = time.perf_counter()
+            call_command("import_robots", path, format=import_format, chunk_size=args.chunk_size, stdout=io.StringIO())
+            elapsed = time.perf_counter() - start
+            results[import_format] = {"seconds": round(elapsed, 3), "rows_per_second": round(args.rows / elapsed)}
+
+    print(json.dumps({"rows": args.rows, "chunk_size": args.chunk_size, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Compare latency of robots posted to `new_robot_view` by `Client` in several threads when every request's log line
+is written synchronously by `TimedRotatingFileHandler` (the former setup) or queued by `BackgroundHandler`.
+Disk pressure is simulated by sleeping `--write-delay-ms` ms on every write to the log file.
+
+python -m benchmarks.logging_pressure --concurrency 1 8 --requests 1000 --write-delay-ms 0 5
+"""
+
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from logging.config import dictConfig
+
+from benchmarks import setup_django, percentiles
+
+HANDLERS = {
+    "sync": {
+        "class": "logging.handlers.TimedRotatingFileHandler",
+        "when": "midnight",
+        "backupCount": 30,
+        # Opened on the first record, so that `_configure_logging` can slow it down
+        "delay": True,
+    },
+    "background": {
+        "class": "home.utils.log.BackgroundHandler",
+        "backup_count": 30,
+        "queue_size": 10_000,
+    },
+}
+
+
+class _SlowStream:
+    """File stream that waits `delay` seconds before every write, like a saturated disk does"""
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, data: str) -> int:
+        time.sleep(self.delay)
+        return self.stream.write(data)
+
+    def __getattr__(self, name: str):
+        return getattr(self.stream, name)
+
+
+def _configure_logging(mode: str, logs_dir: Path, write_delay_ms: float) -> logging.Handler:
+    """Log to `logs_dir` with `mode` handler, which writes to a slow file. Return the handler."""
+    dictConfig(
+        {
+            "version": 1,
+            "disable_existing_loggers": False,
+            "handlers": {"file": {**HANDLERS[mode], "filename": logs_dir / "log", "formatter": "json"}},
+            "loggers": {"": {"level": "INFO", "handlers": ["file"]}},
+            "formatters": {"json": {"()": "home.utils.log.JsonFormatter"}},
+        }
+    )
+    handler = logging.getLogger().handlers[0]
+    file_handler = getattr(handler, "target", handler)
+    open_stream = file_handler._open
+    file_handler._open = lambda: _SlowStream(open_stream(), write_delay_ms / 1000)
+
+    return handler
+
+
+def _run(threads_count: int, count: int, offset: int) -> dict:
+    """Post `count` robots from `threads_count` threads at once. Return throughput, latencies and error statuses."""
+    from django.urls import reverse
+    from django.db import connections, close_old_connections
+    from django.test import Client
+
+    lock = threading.Lock()
+    timings, statuses = [], {}
+    barrier = threading.Barrier(threads_count)
+
+    def worker(idx: int) -> None:
+        client = Client(raise_request_exception=False)
+        barrier.wait()
+        try:
+            for n in range(idx, count, threads_count):
+                created = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(offset + n))
+                data = {"model": "R2", "version": "D2", "created": created}
+                start = time.perf_counter()
+                response = client.post(reverse("new_robot_view"), data=data, content_type="application/json")
+                close_old_connections()
+                with lock:
+                    timings.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(threads_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {"robots_per_second": round(count / elapsed, 1), "statuses": statuses, "latency": percentiles(timings)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="Threads posting robots")
+    parser.add_argument("--requests", type=int, default=1000, help="Robots per concurrency level, mode and delay")
+    parser.add_argument(
+        "--write-delay-ms", type=float, nargs="+", default=[0, 5], help="Delay of every write to the log file"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(Path(tmp_dir) / "bench.sqlite3")
+
+        from django.db import connections
+        from django.core.management import call_command
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        call_command("migrate", verbosity=0)
+        connections.close_all()
+
+        # Robots assembled during the last hours, so they're never looked up in the archive
+        runs = len(args.write_delay_ms) * len(HANDLERS) * len(args.concurrency)
+        results, offset = {}, int(time.time()) - runs * args.requests
+        for delay in args.write_delay_ms:
+            for mode in HANDLERS:
+                for concurrency in args.concurrency:
+                    logs_dir = Path(tmp_dir) / f"logs-{mode}-{delay}-{concurrency}"
+                    logs_dir.mkdir()
+                    handler = _configure_logging(mode, logs_dir, delay)
+                    result = _run(concurrency, args.requests, offset)
+                    offset += args.requests
+
+                    # Time to write what's still queued isn't part of any request
+                    handler.close()
+                    lines = [json.loads(line) for path in logs_dir.iterdir() for line in path.read_text().splitlines()]
+                    result["ingest_lines"] = sum(line.get("event") == "robot_ingest" for line in lines)
+                    result["dropped"] = sum(line.get("dropped", 0) for line in lines) + getattr(handler, "dropped", 0)
+                    results.setdefault(f"{delay}ms", {}).setdefault(mode, {})[concurrency] = result
+
+    print(json.dumps({"requests": args.requests, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Measure overhead of `home.middleware.metrics_middleware` by serving the same requests with it and without it.
+
+python -m benchmarks.metrics_overhead --requests 2000
+"""
+
+import json
+import timeit
+import argparse
+import itertools
+import tempfile
+from pathlib import Path
+
+from benchmarks import setup_django, measure
+
+
+def _requests(count: int) -> dict:
+    """Return functions sending `count` requests to a view by its name. Every call uses its own data."""
+    from django.test import Client
+    from django.urls import reverse
+    from django.utils import timezone as tz
+
+    # Robots assembled during the last days, so they're never looked up in the archive
+    seconds = itertools.count()
+    start = tz.localtime().replace(microsecond=0, tzinfo=None) - tz.timedelta(days=7)
+
+    def new_robot(client: Client) -> None:
+        for _ in range(count):
+            created = f"{start + tz.timedelta(seconds=next(seconds)):%Y-%m-%d %H:%M:%S}"
+            data = {"model": "R2", "version": "D2", "created": created}
+            client.post(reverse("new_robot_view"), data=data, content_type="application/json")
+
+    def get(url: str, params: dict | None = None):
+        def send(client: Client) -> None:
+            for _ in range(count):
+                client.get(url, params)
+
+        return send
+
+    return {
+        "new_robot_view": new_robot,
+        "last_week_stats_view": get(reverse("last_week_stats_view")),
+        "production_report_view": get(
+            reverse("production_report_view"), {"start": f"{start:%Y-%m-%d}", "end": f"{tz.localdate()}"}
+        ),
+        "index_view": get("/"),
+    }
+
+
+def _middleware_cost(number: int) -> float:
+    """Return the cost of `metrics_middleware` alone in microseconds per request, with a view doing nothing"""
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from home.middleware import metrics_middleware
+
+    request, response = RequestFactory().get("/"), HttpResponse(b"x" * 1024)
+    request.resolver_match = None
+    middleware = metrics_middleware(lambda request: response)
+
+    return round(min(timeit.repeat(lambda: middleware(request), number=number, repeat=5)) / number * 1e6, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per view and measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per view and mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(Path(tmp_dir) / "bench.sqlite3")
+
+        from django.conf import settings
+        from django.db import connection
+        from django.test import Client
+        from django.core.management import call_command
+        from django.test.utils import setup_test_environment
+
+        from home.middleware import record_query
+        from home.utils.signals import METRICS_MIDDLEWARE
+
+        setup_test_environment()
+        call_command("migrate", verbosity=0)
+
+        middleware = {
+            "off": [name for name in settings.MIDDLEWARE if name != METRICS_MIDDLEWARE],
+            "on": [METRICS_MIDDLEWARE, *(name for name in settings.MIDDLEWARE if name != METRICS_MIDDLEWARE)],
+        }
+
+        def use_middleware(mode: str) -> Client:
+            """Return client served with or without metrics. Query recorder is set up as on connection creation."""
+            settings.MIDDLEWARE = middleware[mode]
+            if mode == "on" and record_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(record_query)
+            elif mode == "off" and record_query in connection.execute_wrappers:
+                connection.execute_wrappers.remove(record_query)
+            return Client()
+
+        results = {}
+        for view, send in _requests(args.requests).items():
+            # Interleave measurements, so that noise affects both modes alike. The best one is reported.
+            timings = {mode: [] for mode in middleware}
+            for _ in range(args.repeat):
+                for mode in middleware:
+                    client = use_middleware(mode)
+                    timings[mode].append(measure(lambda: send(client), 1)["median_ms"])
+
+            results[view] = {mode: round(min(timings[mode]) * 1000 / args.requests, 1) for mode in middleware}
+            results[view]["overhead_percent"] = round((results[view]["on"] / results[view]["off"] - 1) * 100, 1)
+
+        middleware_cost = _middleware_cost(number=100_000)
+
+    print(
+        json.dumps(
+            {"requests": args.requests, "middleware_us_per_request": middleware_cost, "us_per_request": results},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
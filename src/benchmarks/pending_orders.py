@@ -0,0 +1,100 @@
+"""Measure ingestion of robots one by one (like `new_robot_view` does) when 0%, 1% or 50% of them match
+a pending order. Robots nobody waits for skip the order lookup thanks to `Stock.waiting`.
+
+python -m benchmarks.pending_orders --robots 5000 --ratios 0 0.01 0.5
+"""
+
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks import setup_django
+
+
+def _seed(robots: int, ratio: float) -> list[dict]:
+    """Create pending orders for every `1 / ratio`-th robot and stock rows of every serial.
+    Return params of `robots` robots to ingest.
+    """
+    from django.utils import timezone as tz
+
+    from orders.models import Order, Stock
+    from customers.models import Customer
+
+    every = round(1 / ratio) if ratio else 0
+    start = tz.now().replace(microsecond=0) - tz.timedelta(days=1)
+    robots_params, waiting = [], []
+    for idx in range(robots):
+        matching = every and idx % every == 0
+        model, version = f"{idx % 50:02}", "Z9" if matching else "A1"
+        robots_params.append({"model": model, "version": version, "created": start + tz.timedelta(seconds=idx)})
+        if matching:
+            waiting.append(f"{model}-{version}")
+
+    customers = Customer.objects.bulk_create(Customer(email=f"user{idx}@example.org") for idx in range(len(waiting)))
+    Stock.objects.bulk_create(
+        Stock(robot_serial=f"{idx:02}-{version}") for idx in range(50) for version in ("A1", "Z9")
+    )
+    Order.objects.bulk_create(
+        (Order(customer=customer, robot_serial=serial) for customer, serial in zip(customers, waiting)), batch_size=1000
+    )
+
+    return robots_params
+
+
+def _run(robots_params: list[dict]) -> dict:
+    """Create robots one by one. Return throughput and queries per robot."""
+    from django.db import connection
+
+    from orders.models import Order, Notification
+    from robots.utils.factory import _create_robot
+
+    counts = {"queries": 0, "order_lookups": 0}
+
+    def count_queries(execute, sql, params, many, context):
+        counts["queries"] += 1
+        counts["order_lookups"] += sql.startswith("SELECT") and 'FROM "orders_order"' in sql
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    with connection.execute_wrapper(count_queries):
+        for params in robots_params:
+            _create_robot(params)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "robots_per_second": round(len(robots_params) / elapsed, 1),
+        "queries_per_robot": round(counts["queries"] / len(robots_params), 2),
+        "order_lookups_per_robot": round(counts["order_lookups"] / len(robots_params), 3),
+        "fulfilled": Notification.objects.count(),
+        "pending": Order.objects.count(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--robots", type=int, default=5000)
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0, 0.01, 0.5], help="Shares of matching robots")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(Path(tmp_dir) / "bench.sqlite3")
+
+        from django.conf import settings
+        from django.db import connections
+        from django.core.management import call_command
+
+        results = {}
+        for ratio in args.ratios:
+            # Every ratio gets its own database
+            connections.close_all()
+            settings.DATABASES["default"]["NAME"] = Path(tmp_dir) / f"{ratio}.sqlite3"
+            call_command("migrate", verbosity=0)
+            results[f"{ratio:.0%}"] = _run(_seed(args.robots, ratio))
+
+    print(json.dumps({"robots": args.robots, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
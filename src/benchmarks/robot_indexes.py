@@ -0,0 +1,96 @@
+"""Compare query plans and timings of the hot lookups before and after `robots.0003_robot_indexes` migration.
+
+python -m benchmarks.robot_indexes --robots 1000000
+"""
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+from benchmarks import setup_django, measure
+
+
+def _seed(robots: int, orders: int) -> None:
+    """Insert `robots` robots assembled every second until now and `orders` orders with raw SQL"""
+    from django.db import connection, transaction
+    from django.utils import timezone as tz
+
+    now = tz.now().replace(microsecond=0, tzinfo=None)
+    models = [f"{n:02}" for n in range(50)]
+    versions = ("A1", "B2", "C3", "D4")
+
+    def robot_rows():
+        for idx in range(robots):
+            model, version = models[idx % len(models)], versions[idx % len(versions)]
+            yield f"{model}-{version}", model, version, f"{now - tz.timedelta(seconds=idx):%Y-%m-%d %H:%M:%S}"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO robots_robot (serial, model, version, created) VALUES (%s, %s, %s, %s)", robot_rows()
+        )
+        cursor.executemany(
+            "INSERT INTO customers_customer (email) VALUES (%s)", ((f"user{idx}@example.org",) for idx in range(orders))
+        )
+        cursor.executemany(
+            "INSERT INTO orders_order (customer_id, robot_serial) VALUES (%s, %s)",
+            ((idx + 1, f"{models[idx % len(models)]}-Z9") for idx in range(orders)),
+        )
+
+
+def _run_queries(repeat: int) -> dict:
+    """Return query plan and timings of every hot lookup"""
+    from django.db.models import Count
+    from django.utils import timezone as tz
+
+    from orders.models import Order
+    from robots.models import Robot
+    from customers.models import Customer
+
+    now = tz.now()
+    week_ago = now - tz.timedelta(weeks=1)
+    querysets = {
+        "robot_assembled_at_second": Robot.objects.filter(created=now - tz.timedelta(hours=1)),
+        "last_week_summary": Robot.objects.filter(created__range=(week_ago, now))
+        .values("model", "version")
+        .annotate(count=Count("id"))
+        .order_by("model", "version"),
+        "model_last_week_summary": Robot.objects.filter(model="07", created__range=(week_ago, now))
+        .values("version")
+        .annotate(count=Count("id")),
+        "orders_by_serial": Order.objects.filter(robot_serial="R2-D2"),
+        "customer_by_email": Customer.objects.filter(email="user42@example.org"),
+    }
+
+    return {
+        name: {"plan": queryset.explain(), **measure(lambda: list(queryset.all()), repeat)}
+        for name, queryset in querysets.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--robots", type=int, default=1_000_000)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(Path(tmp_dir) / "bench.sqlite3")
+
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0)
+        for app, migration in (("robots", "0002"), ("orders", "0001"), ("customers", "0001")):
+            call_command("migrate", app, migration, verbosity=0)
+
+        _seed(args.robots, args.orders)
+        before = _run_queries(args.repeat)
+        call_command("migrate", verbosity=0)
+        after = _run_queries(args.repeat)
+
+    print(json.dumps({"robots": args.robots, "before": before, "after": after}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
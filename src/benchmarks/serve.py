@@ -0,0 +1,26 @@
+"""Serve the project with `runserver` using SQLite database at the given path. Used by `benchmarks.suite`.
+
+python -m benchmarks.serve /tmp/bench.sqlite3 --port 8765
+"""
+
+import argparse
+from pathlib import Path
+
+from benchmarks import setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_path", type=Path)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    setup_django(args.db_path)
+
+    from django.core.management import call_command
+
+    call_command("runserver", f"127.0.0.1:{args.port}", use_reloader=False, skip_checks=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Compare bare SQLite config with the tuned one from settings (`SQLITE_PRAGMAS`, `CONN_MAX_AGE`) under concurrent
+robot posts and production report reads served by `Client` in several threads.
+
+python -m benchmarks.sqlite_concurrency --writers 8 --readers 8 --requests 200
+"""
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+from benchmarks import setup_django, percentiles
+
+
+def _run(writers: int, readers: int, count: int) -> dict:
+    """Send `count` requests from each of `writers` + `readers` threads at once. Return latencies and errors."""
+    from django.urls import reverse
+    from django.db import connections, close_old_connections, OperationalError
+    from django.test import Client
+    from django.core.signals import got_request_exception
+    from django.db.backends.signals import connection_created
+    from django.utils import timezone as tz
+
+    lock = threading.Lock()
+    stats = {"lock_errors": 0, "other_errors": 0, "connections": 0}
+    timings = {"write": [], "read": []}
+
+    def on_exception(sender, request, **kwargs):
+        exc = sys.exc_info()[1]
+        with lock:
+            stats["lock_errors" if isinstance(exc, OperationalError) and "locked" in f"{exc}" else "other_errors"] += 1
+
+    def on_connection(sender, connection, **kwargs):
+        with lock:
+            stats["connections"] += 1
+
+    barrier = threading.Barrier(writers + readers)
+    # Every writer posts robots assembled during its own hour of the last day, never looked up in the archive
+    first_hour = tz.localtime().replace(minute=0, second=0, microsecond=0, tzinfo=None) - tz.timedelta(hours=writers)
+
+    def worker(kind: str, idx: int) -> None:
+        client = Client(raise_request_exception=False)
+        barrier.wait()
+        try:
+            for n in range(count):
+                start = time.perf_counter()
+                if kind == "write":
+                    created = f"{first_hour + tz.timedelta(hours=idx, seconds=n % 3600):%Y-%m-%d %H:%M:%S}"
+                    data = {"model": "R2", "version": "D2", "created": created}
+                    client.post(reverse("new_robot_view"), data=data, content_type="application/json")
+                else:
+                    client.get(
+                        reverse("production_report_view"),
+                        {"start": f"{first_hour:%Y-%m-%d}", "end": f"{tz.localdate()}"},
+                    )
+                # `Client` keeps connections open, unlike real handlers, which close old ones after every request
+                close_old_connections()
+                with lock:
+                    timings[kind].append(time.perf_counter() - start)
+        finally:
+            connections.close_all()
+
+    got_request_exception.connect(on_exception)
+    connection_created.connect(on_connection)
+    threads = [threading.Thread(target=worker, args=("write", idx)) for idx in range(writers)]
+    threads += [threading.Thread(target=worker, args=("read", idx)) for idx in range(readers)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    got_request_exception.disconnect(on_exception)
+    connection_created.disconnect(on_connection)
+
+    return {
+        "seconds": round(elapsed, 3),
+        **stats,
+        "write": percentiles(timings["write"]),
+        "read": percentiles(timings["read"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(Path(tmp_dir) / "bench.sqlite3")
+
+        from django.conf import settings
+        from django.db import connections
+        from django.core.management import call_command
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        profiles = {
+            "bare": {"SQLITE_PRAGMAS": {}, "CONN_MAX_AGE": 0},
+            "tuned": {
+                "SQLITE_PRAGMAS": settings.SQLITE_PRAGMAS,
+                "CONN_MAX_AGE": settings.DATABASES["default"]["CONN_MAX_AGE"],
+            },
+        }
+
+        results = {}
+        for name, profile in profiles.items():
+            # Every profile gets its own database file, since WAL mode is persistent
+            connections.close_all()
+            settings.SQLITE_PRAGMAS = profile["SQLITE_PRAGMAS"]
+            settings.DATABASES["default"]["CONN_MAX_AGE"] = profile["CONN_MAX_AGE"]
+            settings.DATABASES["default"]["NAME"] = Path(tmp_dir) / f"{name}.sqlite3"
+            call_command("migrate", verbosity=0)
+            connections.close_all()
+            results[name] = _run(args.writers, args.readers, args.requests)
+
+    print(
+        json.dumps({"writers": args.writers, "readers": args.readers, "requests": args.requests, **results}, indent=2)
+    )
+
+
+if __name__ == "__main__":
+    main()
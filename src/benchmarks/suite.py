@@ -0,0 +1,347 @@
+"""Benchmark suite of the main endpoints: robot ingest, order creation with notifications fan-out and reports.
+Every volume of robots gets its own database seeded with `robots.utils.factory`-compatible records.
+Requests are sent either in-process by Django test `Client` or over HTTP to a local `runserver`.
+Results are JSON. Pass results of another commit as `--baseline` to get the changes.
+
+python -m benchmarks.suite --robots 10000 1000000 --requests 200 --output results.json
+python -m benchmarks.suite --robots 10000 --transport server --concurrency 4 --baseline results.json
+"""
+
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+from functools import cache, partial
+from collections import Counter
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks import setup_django, percentiles
+
+MODELS = [f"{n:02}" for n in range(50)]
+VERSIONS = ("A1", "B2", "C3", "D4")
+# Robots posted by scenarios are assembled during this period, right after seeded ones
+INGEST_PERIOD = timedelta(days=1)
+
+
+class _Request(NamedTuple):
+    method: str
+    path: str
+    body: str | dict | None = None
+    content_type: str | None = None
+    # Sent before the request itself without being measured
+    before: "_Request | None" = None
+
+
+class _ClientTransport:
+    """Send requests in-process with Django test `Client`"""
+
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client()
+
+    def request(self, method: str, path: str, body: str | dict | None = None, content_type: str | None = None) -> int:
+        if method == "GET":
+            response = self.client.get(path, body)
+        elif content_type is None:
+            response = self.client.post(path, body)
+        else:
+            response = self.client.post(path, body, content_type=content_type)
+        # Read the whole body like a real client does
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class _ServerTransport:
+    """Send requests over HTTP with `urllib`. Redirects aren't followed, CSRF token is obtained on first POST."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _csrf_token(self) -> str:
+        if not any(cookie.name == "csrftoken" for cookie in self.cookies):
+            self.request("GET", "/orders/new/")
+        return next(cookie.value for cookie in self.cookies if cookie.name == "csrftoken")
+
+    def request(self, method: str, path: str, body: str | dict | None = None, content_type: str | None = None) -> int:
+        url, data, headers = self.base_url + path, None, {}
+        if method == "GET" and body:
+            url += "?" + urllib.parse.urlencode(body)
+        elif method == "POST" and content_type is None:
+            data = urllib.parse.urlencode(body).encode()
+            headers = {"Content-Type": "application/x-www-form-urlencoded", "X-CSRFToken": self._csrf_token()}
+        elif method == "POST":
+            data, headers = body.encode(), {"Content-Type": content_type}
+
+        try:
+            with self.opener.open(urllib.request.Request(url, data=data, headers=headers, method=method)) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+def _run(transport_factory, requests: list[_Request], concurrency: int) -> dict:
+    """Send `requests` using `concurrency` threads. Every thread has its own transport.
+    Return statuses, throughput and latency percentiles.
+    """
+    from django.db import connections
+
+    local = threading.local()
+    lock = threading.Lock()
+    statuses = Counter()
+
+    def send(request: _Request) -> float:
+        if not hasattr(local, "transport"):
+            local.transport = transport_factory()
+        if request.before is not None:
+            local.transport.request(*request.before[:4])
+        start = time.perf_counter()
+        status = local.transport.request(*request[:4])
+        elapsed = time.perf_counter() - start
+        with lock:
+            statuses[status] += 1
+        return elapsed
+
+    def close_connections(_) -> None:
+        connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(send, requests))
+        # In-process transport opens DB connections in worker threads
+        list(executor.map(close_connections, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(requests),
+        "statuses": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(requests) / elapsed, 1),
+        **percentiles(timings),
+    }
+
+
+@cache
+def _ingest_start() -> datetime:
+    """Return local time `INGEST_PERIOD` ago. Robots assembled that recently are never looked up in the archive."""
+    from django.utils import timezone as tz
+
+    return tz.localtime().replace(microsecond=0, tzinfo=None) - INGEST_PERIOD
+
+
+def _seed(robots: int) -> float:
+    """Import `robots` robot records assembled every second until `_ingest_start()`, like `manage.py import_robots`
+    does. Return seconds spent.
+    """
+    from robots.utils.importer import import_robots
+
+    def records():
+        for idx in range(robots):
+            created = _ingest_start() - timedelta(seconds=idx + 1)
+            record = {"model": MODELS[idx % len(MODELS)], "version": VERSIONS[idx % len(VERSIONS)]}
+            yield idx, {**record, "created": f"{created:%Y-%m-%d %H:%M:%S}"}
+
+    def reject(line_num, record, error):
+        raise error
+
+    start = time.perf_counter()
+    import_robots(records(), reject)
+    return time.perf_counter() - start
+
+
+def _scenarios(count: int) -> dict[str, list[_Request]]:
+    """Return requests of every scenario by name. Scenarios are run in order and some of them depend on others."""
+    from django.urls import reverse
+
+    def robot(idx: int, model: str = "R2", version: str = "D2") -> str:
+        created = _ingest_start() + timedelta(seconds=idx)
+        return json.dumps({"model": model, "version": version, "created": f"{created:%Y-%m-%d %H:%M:%S}"})
+
+    batch_size = 100
+    batches = [
+        "\n".join(robot(count + batch * batch_size + idx) for idx in range(batch_size))
+        for batch in range(max(count // batch_size, 1))
+    ]
+    offset = count + len(batches) * batch_size
+    # Waiting orders of "ZZ-Z9" are fulfilled all at once by a single batch of robots
+    fanout = "\n".join(robot(offset + idx, "ZZ", "Z9") for idx in range(count))
+    offset += count
+    if offset + count > INGEST_PERIOD.total_seconds():
+        raise ValueError(f"Robots of {count} requests aren't assembled within {INGEST_PERIOD}")
+
+    new_robot, new_batch, new_order = (
+        reverse("new_robot_view"),
+        reverse("new_robots_batch_view"),
+        reverse("new_order_view"),
+    )
+    last_week_stats, production = reverse("last_week_stats_view"), reverse("production_report_view")
+
+    return {
+        "robot_ingest": [_Request("POST", new_robot, robot(idx), "application/json") for idx in range(count)],
+        "robot_ingest_batch_of_100": [_Request("POST", new_batch, batch, "application/x-ndjson") for batch in batches],
+        "order_in_stock": [
+            _Request("POST", new_order, {"serial": "00-A1", "email": f"stock{idx}@example.org"}) for idx in range(count)
+        ],
+        "order_pending": [
+            _Request("POST", new_order, {"serial": "ZZ-Z9", "email": f"pending{idx}@example.org"})
+            for idx in range(count)
+        ],
+        "order_fanout": [_Request("POST", new_batch, fanout, "application/x-ndjson")],
+        "last_week_stats_warm": [_Request("GET", last_week_stats)] * count,
+        # Every report is rebuilt, since a new robot is added before it
+        "last_week_stats_cold": [
+            _Request(
+                "GET", last_week_stats, before=_Request("POST", new_robot, robot(offset + idx), "application/json")
+            )
+            for idx in range(count)
+        ],
+        "production_report_json": [_Request("GET", production, {"start": "2000-01-01", "granularity": "month"})]
+        * count,
+        "production_report_xlsx": [_Request("GET", production, {"start": "2000-01-01", "format": "xlsx"})] * count,
+        "export_csv_one_model": [_Request("GET", reverse("export_robots_view"), {"model": "00"})] * max(count // 10, 1),
+    }
+
+
+def _wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server didn't start on port {port}")
+
+
+def _benchmark_volume(db_path: Path, robots: int, args) -> dict:
+    """Seed database at `db_path` with `robots` robots and run every scenario against it"""
+    from django.conf import settings
+    from django.db import connections
+    from django.core.management import call_command
+
+    from orders.models import Notification
+
+    connections.close_all()
+    settings.DATABASES["default"]["NAME"] = db_path
+    call_command("migrate", verbosity=0)
+    result = {"seed_seconds": round(_seed(robots), 3), "scenarios": {}}
+    connections.close_all()
+
+    server = None
+    if args.transport == "server":
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.serve", str(db_path), "--port", str(args.port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        _wait_for_port(args.port)
+        transport_factory = partial(_ServerTransport, f"http://127.0.0.1:{args.port}")
+    else:
+        transport_factory = _ClientTransport
+
+    try:
+        for name, requests in _scenarios(args.requests).items():
+            if args.only and name not in args.only:
+                continue
+            concurrency = 1 if name == "last_week_stats_cold" else args.concurrency
+            result["scenarios"][name] = _run(transport_factory, requests, concurrency)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    result["notifications_queued"] = Notification.objects.count()
+    connections.close_all()
+    return result
+
+
+def _compare(results: dict, baseline: dict) -> None:
+    """Add changes in percent against `baseline` results to every scenario present in both"""
+    for robots, volume in results["volumes"].items():
+        for name, scenario in volume["scenarios"].items():
+            if (old := baseline.get("volumes", {}).get(robots, {}).get("scenarios", {}).get(name)) is None:
+                continue
+            scenario["change_percent"] = {
+                metric: round((scenario[metric] / old[metric] - 1) * 100, 1)
+                for metric in ("throughput_rps", "p50_ms", "p99_ms")
+                if scenario.get(metric) and old.get(metric)
+            }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "HEAD"), capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--robots", type=int, nargs="+", default=[10_000], help="Volumes of seeded robots")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="Threads sending requests")
+    parser.add_argument("--transport", choices=("client", "server"), default="client")
+    parser.add_argument("--port", type=int, default=8765, help="Port of `runserver` for 'server' transport")
+    parser.add_argument("--only", nargs="+", help="Run only these scenarios")
+    parser.add_argument("--baseline", type=Path, help="Results of another run to compare with")
+    parser.add_argument("--output", type=Path, help="File to write results to. Defaults to stdout.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(Path(tmp_dir) / "bench.sqlite3")
+
+        import django
+        from django.test.utils import setup_test_environment
+
+        # Lets test `Client` through `ALLOWED_HOSTS`
+        setup_test_environment()
+
+        results = {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "transport": args.transport,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "volumes": {
+                str(robots): _benchmark_volume(Path(tmp_dir) / f"{robots}.sqlite3", robots, args)
+                for robots in args.robots
+            },
+        }
+
+    if args.baseline:
+        _compare(results, json.loads(args.baseline.read_text()))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Microbenchmarks of robot and order validation. Report ns/op for valid input and every invalid-input branch.
+
+python -m benchmarks.validation --number 200000
+"""
+
+import json
+import timeit
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks import setup_django
+
+
+def _cases() -> dict:
+    """Return callables to benchmark by name. Invalid ones are expected to raise."""
+    from robots.models import Robot
+    from customers.models import Customer
+    from robots.utils.factory import _validate_robot_params, json_loads
+
+    robot_params = {
+        "valid": {"model": "R2", "version": "D2", "created": "2023-01-01 00:00:00"},
+        "wrong_params_count": {"model": "R2", "version": "D2"},
+        "missing_param": {"model": "R2", "version": "D2", "date": "2023-01-01 00:00:00"},
+        "not_a_string": {"model": "R2", "version": 2, "created": "2023-01-01 00:00:00"},
+        "wrong_length": {"model": "R2 ", "version": "D2", "created": "2023-01-01 00:00:00"},
+        "malformed_timestamp": {"model": "R2", "version": "D2", "created": "2023-01-01T00:00:00"},
+        "impossible_timestamp": {"model": "R2", "version": "D2", "created": "2023-02-30 00:00:00"},
+    }
+    body = json.dumps(robot_params["valid"])
+
+    cases = {
+        f"robot_params/{name}": lambda p=params: _validate_robot_params(p) for name, params in robot_params.items()
+    }
+    cases |= {
+        f"json_loads/{json_loads.__module__}": lambda: json_loads(body),
+        "serial_is_valid/valid": lambda: Robot.serial_is_valid("R2-D2"),
+        "serial_is_valid/invalid": lambda: Robot.serial_is_valid("R2_D2"),
+        "email_is_valid/valid": lambda: Customer.email_is_valid("address@example.org"),
+        "email_is_valid/invalid": lambda: Customer.email_is_valid("address@example"),
+    }
+
+    return cases
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100_000, help="Calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per case. The best one is reported.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(Path(tmp_dir) / "bench.sqlite3")
+
+        results = {}
+        for name, case in _cases().items():
+
+            def call(case=case):
+                try:
+                    case()
+                except (TypeError, ValueError):
+                    pass
+
+            best = min(timeit.repeat(call, number=args.number, repeat=args.repeat))
+            results[name] = {"ns_per_op": round(best / args.number * 1e9, 1)}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,19 @@
 from django.contrib import admin
 
-# Register your models here.
+from home.utils.admin import LargeTableAdmin
+from customers.models import Customer
+
+
+@admin.register(Customer)
+class CustomerAdmin(LargeTableAdmin):
+    list_display = ("id", "email")
+    search_fields = ("email",)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Find the customer by exact email. Emails are stored normalized, so it's a unique index lookup
+        unlike `LIKE` ones `search_fields` produce.
+        """
+        if not search_term:
+            return queryset, False
+
+        return queryset.filter(email=Customer.normalize_email(search_term)), False
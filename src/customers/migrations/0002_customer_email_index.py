@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customers", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="customer",
+            name="email",
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+
+
+def normalize_email(email: str) -> str:
+    """Same as `Customer.normalize_email`. Copied, since migrations mustn't depend on the current models."""
+    return email.strip().lower()
+
+
+def merge_duplicate_customers(apps, schema_editor):
+    """Keep the oldest customer of every normalized email, move orders of the rest to it and delete them.
+    Changes are applied in small transactions, so the tables are never locked for long.
+    """
+    Customer = apps.get_model("customers", "Customer")
+    Order = apps.get_model("orders", "Order")
+
+    # Collect only the rows that need changes. Emails are normalized in Python, exactly like new ones are:
+    # SQLite `LOWER()` and `TRIM()` only handle ASCII letters and spaces.
+    merges, renames = [], []
+    keep_ids = {}
+    for customer_id, email in Customer.objects.order_by("id").values_list("id", "email").iterator(BATCH_SIZE):
+        normalized = normalize_email(email)
+        if (keep_id := keep_ids.setdefault(normalized, customer_id)) != customer_id:
+            merges.append((customer_id, keep_id))
+        elif email != normalized:
+            renames.append((customer_id, normalized))
+
+    for start in range(0, len(merges), BATCH_SIZE):
+        with transaction.atomic():
+            for customer_id, keep_id in merges[start : start + BATCH_SIZE]:
+                Order.objects.filter(customer_id=customer_id).update(customer_id=keep_id)
+            Customer.objects.filter(
+                id__in=[customer_id for customer_id, _ in merges[start : start + BATCH_SIZE]]
+            ).delete()
+
+    for start in range(0, len(renames), BATCH_SIZE):
+        with transaction.atomic():
+            for customer_id, email in renames[start : start + BATCH_SIZE]:
+                Customer.objects.filter(id=customer_id).update(email=email)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("customers", "0002_customer_email_index"),
+        ("orders", "0003_notification"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_customers, migrations.RunPython.noop),
+    ]
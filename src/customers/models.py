@@ -1,12 +1,21 @@
-from re import fullmatch
+import re
 
 from django.db import models
 
 
+# Optimization. Compile once instead of looking it up in `re` cache on every call.
+EMAIL_PATTERN = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
+
 class Customer(models.Model):
-    email = models.CharField(max_length=255, blank=False, null=False)
+    email = models.CharField(max_length=255, blank=False, null=False, unique=True)
 
     @staticmethod
     def email_is_valid(email: str) -> bool:
         """Return `True` if `email` matches `*@*.*` pattern, otherwise `False`"""
-        return fullmatch(r"[^@]+@[^@]+\.[^@]+", email) is not None
+        return EMAIL_PATTERN.fullmatch(email) is not None
+
+    @staticmethod
+    def normalize_email(email: str) -> str:
+        """Return `email` in the form it's stored in DB, so the same address always matches the same customer"""
+        return email.strip().lower()
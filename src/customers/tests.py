@@ -1,3 +1,51 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TransactionTestCase
+from django.db.migrations.executor import MigrationExecutor
 
-# Create your tests here.
+
+class MergeDuplicateCustomersMigrationTest(TransactionTestCase):
+    before = [("customers", "0002_customer_email_index"), ("orders", "0003_notification")]
+    after = [("customers", "0004_customer_email_unique"), ("orders", "0005_order_unique_pending_order")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_are_merged(self):
+        apps = self.migrate(self.before)
+        Customer, Order = apps.get_model("customers", "Customer"), apps.get_model("orders", "Order")
+        first = Customer.objects.create(email="Address@Example.org")
+        second = Customer.objects.create(email=" address@example.org")
+        other = Customer.objects.create(email="other@example.org")
+        Order.objects.create(customer=first, robot_serial="R2-D2")
+        Order.objects.create(customer=second, robot_serial="R2-D2")
+        Order.objects.create(customer=second, robot_serial="X5-LT")
+        Order.objects.create(customer=other, robot_serial="R2-D2")
+
+        apps = self.migrate(self.after)
+        Customer, Order = apps.get_model("customers", "Customer"), apps.get_model("orders", "Order")
+
+        self.assertEqual(
+            list(Customer.objects.order_by("id").values_list("id", "email")),
+            [(first.id, "address@example.org"), (other.id, "other@example.org")],
+        )
+        self.assertEqual(
+            sorted(Order.objects.values_list("customer_id", "robot_serial")),
+            [(first.id, "R2-D2"), (first.id, "X5-LT"), (other.id, "R2-D2")],
+        )
+
+    def test_emails_are_normalized_like_new_ones(self):
+        apps = self.migrate(self.before)
+        Customer = apps.get_model("customers", "Customer")
+        first = Customer.objects.create(email="\tÄDRESS@EXAMPLE.ORG\u00a0")
+        Customer.objects.create(email="ädress@example.org")
+
+        apps = self.migrate(self.after)
+        Customer = apps.get_model("customers", "Customer")
+
+        self.assertEqual(list(Customer.objects.values_list("id", "email")), [(first.id, "ädress@example.org")])
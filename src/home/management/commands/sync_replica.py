@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from home.utils.replica import sync_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary database into `REPORTS_REPLICA` database. "
+        "Reports are read from the primary one if the copy is older than `REPORTS_REPLICA_MAX_LAG` seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0, help="Sync every N seconds. Exit if 0.")
+
+    def handle(self, *args, interval, **options):
+        if settings.REPORTS_REPLICA is None:
+            raise CommandError("Replica is disabled by `REPORTS_REPLICA` setting")
+
+        while True:
+            synced = sync_replica()
+            self.stdout.write(f"Replica '{settings.REPORTS_REPLICA}' is synced as of {synced:%Y-%m-%d %H:%M:%S}")
+            if not interval:
+                break
+            time.sleep(interval)
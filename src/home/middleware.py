@@ -0,0 +1,80 @@
+import time
+import logging
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+
+from asgiref.sync import iscoroutinefunction
+
+from home.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# DB stats of the request being served: [number of queries, seconds spent]. Context variables are copied into
+# `sync_to_async()` threads, so queries of async views are counted as well.
+_db_stats: ContextVar[list | None] = ContextVar("db_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection while `metrics_middleware` is enabled, see `home.utils.signals`.
+    Count query and its time in the current request's stats. Log it if it's slower than `SLOW_QUERY_THRESHOLD_MS`.
+    """
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        if (stats := _db_stats.get()) is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+        if (threshold := settings.SLOW_QUERY_THRESHOLD_MS) is not None and elapsed * 1000 >= threshold:
+            logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, sql)
+
+
+def _observe(request: HttpRequest, response: HttpResponse, elapsed: float, db_stats: list) -> None:
+    """Record metrics of served request under its URL name"""
+    view = request.resolver_match.url_name if request.resolver_match else None
+    view = view or "unknown"
+    metrics.requests_total.inc(view, response.status_code)
+    metrics.request_duration.observe(elapsed, view)
+    metrics.request_db_queries.observe(db_stats[0], view)
+    metrics.request_db_duration.observe(db_stats[1], view)
+    # Size of streaming responses is known only if they set it, e.g. `FileResponse`
+    if not response.streaming:
+        metrics.response_size.observe(len(response.content), view)
+    elif "Content-Length" in response.headers:
+        metrics.response_size.observe(int(response.headers["Content-Length"]), view)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Measure wall time, DB queries and DB time, response size of every request. See `/metrics`."""
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request: HttpRequest) -> HttpResponse:
+            db_stats = [0, 0.0]
+            token = _db_stats.set(db_stats)
+            start = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _db_stats.reset(token)
+            _observe(request, response, time.perf_counter() - start, db_stats)
+            return response
+
+    else:
+
+        def middleware(request: HttpRequest) -> HttpResponse:
+            db_stats = [0, 0.0]
+            token = _db_stats.set(db_stats)
+            start = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _db_stats.reset(token)
+            _observe(request, response, time.perf_counter() - start, db_stats)
+            return response
+
+    return middleware
@@ -1,3 +1,312 @@
-from django.test import TestCase
+import os
+import sys
+import json
+import time
+import logging
+import tempfile
+import threading
+import subprocess
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, connections, router
+from django.urls import reverse
+from django.utils import timezone as tz
+from django.core.management import call_command, CommandError
+from django.test.utils import CaptureQueriesContext
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from asgiref.sync import sync_to_async
+from openpyxl import load_workbook
+
+from home.utils import metrics
+from home.utils.admin import EstimatedCountPaginator
+from home.utils.log import BackgroundHandler, DailyFileHandler, JsonFormatter, log_duration
+from home.utils.replica import SYNCED_CACHE, replica_synced, _synced_key
+from robots.models import Robot, ProductionDailyRollup, ReportJob
+from robots.utils import jobs
+
+
+class SqlitePragmasTest(SimpleTestCase):
+    def query_new_connection(self, *pragmas: str) -> list:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            wrapper = type(connections["default"])(
+                {**connections["default"].settings_dict, "NAME": Path(tmp_dir) / "db.sqlite3"}, "pragmas"
+            )
+            try:
+                with wrapper.cursor() as cursor:
+                    return [cursor.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in pragmas]
+            finally:
+                wrapper.close()
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        self.assertEqual(
+            self.query_new_connection("journal_mode", "synchronous", "busy_timeout"),
+            ["wal", 1, 5000],
+        )
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_no_pragmas(self):
+        self.assertEqual(self.query_new_connection("journal_mode", "synchronous"), ["delete", 2])
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        for metric in metrics.METRICS:
+            metric.clear()
+
+    def get_metrics(self) -> dict[str, float]:
+        response = self.client.get(reverse("metrics_view"))
+        self.assertEqual(response.status_code, 200)
+
+        return {
+            sample: float(value)
+            for sample, value in (line.rsplit(" ", 1) for line in response.content.decode().splitlines())
+            if not sample.startswith("#")
+        }
+
+    def test_metrics_are_collected_per_view(self):
+        data = {"model": "R2", "version": "D2", "created": "2023-01-01 00:00:00"}
+        self.client.post(reverse("new_robot_view"), data=data, content_type="application/json")
+
+        samples = self.get_metrics()
+        self.assertEqual(samples['r4c_requests_total{view="new_robot_view",status="200"}'], 1)
+        self.assertEqual(samples['r4c_request_duration_seconds_count{view="new_robot_view"}'], 1)
+        self.assertGreater(samples['r4c_request_db_queries_sum{view="new_robot_view"}'], 0)
+        self.assertGreater(samples['r4c_response_size_bytes_sum{view="new_robot_view"}'], 0)
+        self.assertNotIn('r4c_requests_total{view="metrics_view",status="200"}', samples)
+
+    async def test_async_view_queries_are_counted(self):
+        data = {"model": "R2", "version": "D2", "created": "2023-01-01 00:00:00"}
+        await self.async_client.post(reverse("new_robot_async_view"), data=data, content_type="application/json")
+
+        samples = await sync_to_async(self.get_metrics)()
+        self.assertGreater(samples['r4c_request_db_queries_sum{view="new_robot_async_view"}'], 0)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_are_logged(self):
+        with self.assertLogs("home.middleware", level="WARNING") as logs:
+            self.client.get(reverse("production_report_view"))
+
+        self.assertIn("robots_productiondailyrollup", logs.output[0])
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    def test_table_isnt_counted(self):
+        start = tz.now().replace(microsecond=0)
+        robots = Robot.objects.bulk_create(
+            Robot(serial="R2-D2", model="R2", version="D2", created=start + tz.timedelta(seconds=idx))
+            for idx in range(5)
+        )
+        robots[2].delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            # Deleted robot is still counted, so the last page may be empty but every robot can be reached
+            self.assertEqual(EstimatedCountPaginator(Robot.objects.order_by("id"), 2).count, 5)
+        self.assertFalse(any("COUNT(" in query["sql"] for query in queries))
+        self.assertEqual(EstimatedCountPaginator(Robot.objects.filter(id__gt=robots[0].id).order_by("id"), 2).count, 3)
+        self.assertEqual(EstimatedCountPaginator(Robot.objects.none(), 2).count, 0)
+
+
+class ReportReplicaTest(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.now = tz.now().replace(microsecond=0)
+        self.start = self.now - tz.timedelta(days=1)
+        # Other tests mustn't read from the replica
+        self.addCleanup(caches[SYNCED_CACHE].delete, _synced_key("replica"))
+
+    def create_robot(self, seconds_ago: int) -> None:
+        Robot.objects.create(
+            serial="R2-D2", model="R2", version="D2", created=self.now - tz.timedelta(seconds=seconds_ago)
+        )
+
+    def count_robots(self) -> int:
+        rows = ProductionDailyRollup.objects.production_report(self.start.date(), tz.localdate(self.now), "day", "R2")
+        return sum(row["count"] for row in rows)
+
+    def test_reports_are_read_from_synced_replica(self):
+        self.create_robot(1)
+        # Never synced, so the primary database is used
+        self.assertEqual(self.count_robots(), 1)
+
+        stdout = StringIO()
+        call_command("sync_replica", stdout=stdout)
+        self.assertIn("Replica 'replica' is synced", stdout.getvalue())
+        self.create_robot(2)
+
+        self.assertEqual(self.count_robots(), 1)
+        # Everything else is still read from the primary database, e.g. the duplicate check
+        self.assertEqual(router.db_for_read(Robot), "default")
+        self.assertTrue(Robot.objects.filter(created=self.now - tz.timedelta(seconds=2)).exists())
+
+        call_command("sync_replica", stdout=StringIO())
+        self.assertEqual(self.count_robots(), 2)
+
+    def test_sync_time_is_shared_between_processes(self):
+        call_command("sync_replica", stdout=StringIO())
+
+        code = (
+            "import django; django.setup(); from django.core.cache import caches; "
+            f"print(caches[{SYNCED_CACHE!r}].get({_synced_key('replica')!r}))"
+        )
+        process = subprocess.run(
+            # "test" argument makes settings the same as the ones of `manage.py test`
+            (sys.executable, "-c", code, "test"),
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "R4C.settings"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(process.stdout.strip(), f"{replica_synced()}")
+
+    def test_stale_replica_falls_back_to_primary(self):
+        call_command("sync_replica", stdout=StringIO())
+        self.create_robot(1)
+        self.assertEqual(self.count_robots(), 0)
+
+        caches[SYNCED_CACHE].set(_synced_key("replica"), replica_synced() - tz.timedelta(seconds=61), timeout=None)
+        self.assertEqual(self.count_robots(), 1)
+
+        with override_settings(REPORTS_REPLICA_MAX_LAG=120):
+            self.assertEqual(self.count_robots(), 0)
+        with override_settings(REPORTS_REPLICA=None):
+            self.assertEqual(self.count_robots(), 1)
+
+    def test_production_report_is_read_from_replica(self):
+        call_command("sync_replica", stdout=StringIO())
+        self.client.post(
+            reverse("new_robot_view"),
+            data={"model": "R2", "version": "D2", "created": f"{self.now:%Y-%m-%d %H:%M:%S}"},
+            content_type="application/json",
+        )
+
+        response = self.client.get(reverse("production_report_view"), {"start": "2000-01-01"})
+        self.assertEqual(response.json()["data"], [])
+
+    def test_report_jobs_are_built_from_primary(self):
+        call_command("sync_replica", stdout=StringIO())
+        self.create_robot(1)
+        job = ReportJob.objects.create(
+            key="production",
+            kind=ReportJob.Kind.PRODUCTION,
+            params={"start": "2000-01-01", "end": f"{tz.localdate()}", "granularity": "day", "model": None},
+        )
+
+        with tempfile.TemporaryDirectory() as reports_dir, override_settings(REPORTS_DIR=reports_dir):
+            workbook = load_workbook(Path(reports_dir) / jobs.build_report(job.id))
+
+        self.assertEqual(workbook.sheetnames, ["R2"])
+
+    @override_settings(REPORTS_REPLICA=None)
+    def test_disabled_replica_cant_be_synced(self):
+        with self.assertRaisesMessage(CommandError, "Replica is disabled"):
+            call_command("sync_replica", stdout=StringIO())
+
+
+class LoggingTest(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.logs_dir = Path(tmp_dir.name)
+        self.logger = logging.getLogger("home.tests.logging")
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, "propagate", True)
+
+    def add_handler(self, **kwargs) -> BackgroundHandler:
+        handler = BackgroundHandler(self.logs_dir / "log", **kwargs)
+        handler.setFormatter(JsonFormatter())
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        self.addCleanup(handler.close)
+        return handler
+
+    def read_lines(self) -> list[dict]:
+        return [json.loads(line) for path in self.logs_dir.glob("log.*") for line in path.read_text().splitlines()]
+
+    def test_records_are_written_as_json_lines(self):
+        handler = self.add_handler()
+        with log_duration(self.logger, "robot_ingest", serial="R2-D2") as fields:
+            fields["robots"] = 1
+        try:
+            raise ValueError("Oops")
+        except ValueError:
+            self.logger.exception("Failed %s", "badly")
+        handler.flush()
+
+        ingest, failure = self.read_lines()
+        self.assertEqual(ingest["event"], "robot_ingest")
+        self.assertEqual(ingest["status"], "success")
+        self.assertEqual((ingest["serial"], ingest["robots"]), ("R2-D2", 1))
+        self.assertGreaterEqual(ingest["duration_ms"], 0)
+        self.assertEqual((failure["level"], failure["message"]), ("ERROR", "Failed badly"))
+        self.assertIn("ValueError: Oops", failure["exception"])
+
+    def test_failed_block_is_logged(self):
+        with self.assertLogs(self.logger) as logs, self.assertRaises(ValueError):
+            with log_duration(self.logger, "order_created"):
+                raise ValueError("serial is invalid")
+
+        self.assertEqual((logs.records[0].status, logs.records[0].error), ("error", "serial is invalid"))
+
+    def test_slow_disk_doesnt_block_logging(self):
+        handler = self.add_handler(queue_size=2)
+        writing, release = threading.Event(), threading.Event()
+        emit = handler.target.emit
+        handler.target.emit = lambda record: (writing.set(), release.wait(), emit(record))
+
+        start = time.perf_counter()
+        self.logger.info("Record 0")
+        writing.wait()
+        # The listener is stuck writing the first record, the next two fill the queue, the rest are dropped
+        for idx in range(1, 10):
+            self.logger.info("Record %s", idx)
+        self.assertLess(time.perf_counter() - start, 1)
+
+        release.set()
+        while not handler.queue.empty():
+            time.sleep(0.001)
+        self.logger.info("Last record")
+        handler.flush()
+
+        lines = self.read_lines()
+        self.assertEqual(
+            [line["message"] for line in lines],
+            ["Record 0", "Record 1", "Record 2", "Log queue was full, records were dropped", "Last record"],
+        )
+        self.assertEqual(lines[3]["dropped"], 7)
+
+    def test_files_are_switched_daily_and_deleted_after_backup_count_days(self):
+        today = tz.localdate()
+        old_path = self.logs_dir / f"log.{today - tz.timedelta(days=31)}"
+        old_path.touch()
+        handler = DailyFileHandler(self.logs_dir / "log", backup_count=30)
+        self.addCleanup(handler.close)
+        # Deleted by the next process started instead of renamed by the current one
+        self.assertFalse(old_path.exists())
+
+        handler.day = today - tz.timedelta(days=1)
+        old_path.touch()
+        handler.emit(logging.makeLogRecord({"msg": "New day"}))
+
+        self.assertEqual((self.logs_dir / f"log.{today}").read_text(), "New day\n")
+        self.assertFalse(old_path.exists())
+
+    def test_tests_dont_write_project_logs(self):
+        self.assertFalse(settings.LOGS_DIR.is_relative_to(settings.BASE_DIR))
+        self.assertEqual(Path(logging.getLogger().handlers[0].target.baseFilename).parent, settings.LOGS_DIR)
+
+    def test_days_are_local(self):
+        # Their dates always differ, so the day of `TIME_ZONE` is never the day of the system time zone
+        with override_settings(TIME_ZONE="Pacific/Kiritimati"), mock.patch.dict(os.environ, {"TZ": "Etc/GMT+12"}):
+            time.tzset()
+            self.addCleanup(time.tzset)
+            handler = DailyFileHandler(self.logs_dir / "log")
+            self.addCleanup(handler.close)
+
+            self.assertEqual(handler.day, tz.localdate())
@@ -0,0 +1,102 @@
+from datetime import datetime
+
+from django.contrib import admin
+from django.db import models
+from django.core.paginator import Paginator
+from django.db.models import Max, Min
+from django.utils import timezone as tz
+from django.utils.functional import cached_property
+
+
+# Periods `IndexedDatesQuerySet.datetimes()` can seek
+DATETIME_KINDS = ("year", "month", "day")
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that doesn't `COUNT(*)` the whole table, which reads every row of its smallest index in SQLite.
+    Rows of an unfiltered queryset are estimated by the span of integer primary keys, so every row can be reached,
+    but the last pages may be empty if rows were deleted. Filtered querysets are counted as usual.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        query = getattr(queryset, "query", None)
+        if query is None or query.has_filters() or query.is_sliced or query.distinct:
+            return super().count
+        if not isinstance(queryset.model._meta.pk, models.AutoField):
+            return super().count
+
+        # Separate queries, since SQLite looks up a single `MIN()` or `MAX()` in the index but scans it for both
+        if (first := queryset.aggregate(first=Min("pk"))["first"]) is None:
+            return 0
+
+        return queryset.aggregate(last=Max("pk"))["last"] - first + 1
+
+
+def _truncate(value: datetime, kind: str) -> datetime:
+    """Return the beginning of the `kind` period `value` belongs to"""
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if kind == "year":
+        return value.replace(month=1, day=1)
+    if kind == "month":
+        return value.replace(day=1)
+
+    return value
+
+
+def _next_period(period: datetime, kind: str) -> datetime:
+    """Return the beginning of the `kind` period following `period`"""
+    if kind == "year":
+        return period.replace(year=period.year + 1)
+    if kind == "month":
+        return period.replace(year=period.year + period.month // 12, month=period.month % 12 + 1)
+
+    return period + tz.timedelta(days=1)
+
+
+class IndexedDatesQuerySet(models.QuerySet):
+    """QuerySet for admin changelists of large tables. `datetimes()` seeks the next distinct period with an index
+    lookup instead of truncating every row, so date hierarchy costs a query per year, month or day it shows.
+    The field it's called with must be indexed.
+    """
+
+    def aggregate(self, *args, **kwargs) -> dict:
+        # Like in `EstimatedCountPaginator`, `MIN()` and `MAX()` are looked up one by one
+        if args or len(kwargs) < 2 or not all(isinstance(value, (Min, Max)) for value in kwargs.values()):
+            return super().aggregate(*args, **kwargs)
+
+        result = {}
+        for alias, aggregate in kwargs.items():
+            result.update(super().aggregate(**{alias: aggregate}))
+
+        return result
+
+    def _seek(self, field_name: str, start: datetime | None) -> datetime | None:
+        """Return the earliest `field_name` value not earlier than `start` (the earliest one at all if it's `None`)"""
+        queryset = self
+        if start is not None:
+            # SQLite starts index range at the first lower bound of the column in WHERE, so it must be this one
+            queryset = self.model._base_manager.using(self.db).filter(**{f"{field_name}__gte": start}) & self
+
+        return queryset.order_by(field_name).values_list(field_name, flat=True).first()
+
+    def datetimes(self, field_name: str, kind: str, order: str = "ASC", tzinfo=None, **kwargs):
+        if kind not in DATETIME_KINDS or kwargs:
+            return super().datetimes(field_name, kind, order, tzinfo, **kwargs)
+
+        tzinfo = tzinfo or tz.get_current_timezone()
+        periods = []
+        value = self._seek(field_name, None)
+        while value is not None:
+            periods.append(_truncate(value.astimezone(tzinfo), kind))
+            value = self._seek(field_name, _next_period(periods[-1], kind))
+
+        return periods[::-1] if order == "DESC" else periods
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Admin of a table with millions of rows. Changelists never count or scan the whole table."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,172 @@
+import os
+import copy
+import json
+import time
+import queue
+import logging
+from pathlib import Path
+from datetime import date, datetime, timedelta, timezone
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+from django.utils import timezone as tz
+
+# Attributes every `LogRecord` has. The rest were passed with `extra` and become fields of JSON lines.
+RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as JSON lines with time, level, logger and message, plus every field passed with `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRS)
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DailyFileHandler(logging.FileHandler):
+    """Append records to `<filename>.<YYYY-MM-DD>` file of the current day in `TIME_ZONE`. Files older than `backup_count` days
+    are deleted. Files are never renamed, so unlike `TimedRotatingFileHandler` it's safe to use in several processes
+    at once: every process switches to the next day's file on its own, and each record is appended with one `write()`.
+    """
+
+    def __init__(self, filename: str | Path, backup_count: int = 30, encoding: str = "utf-8"):
+        self.base_path = Path(filename)
+        self.backup_count = backup_count
+        self.day = tz.localdate()
+        super().__init__(self._path(self.day), encoding=encoding, delay=True)
+        self._delete_old_files()
+
+    def _path(self, day: date) -> Path:
+        return self.base_path.with_name(f"{self.base_path.name}.{day.isoformat()}")
+
+    def _delete_old_files(self) -> None:
+        oldest = self.day - timedelta(days=self.backup_count)
+        for path in self.base_path.parent.glob(f"{self.base_path.name}.*"):
+            try:
+                if date.fromisoformat(path.name.rsplit(".", 1)[1]) < oldest:
+                    path.unlink(missing_ok=True)
+            except ValueError:
+                continue
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if (today := tz.localdate()) != self.day:
+            self.day = today
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.fspath(self._path(today))
+            self._delete_old_files()
+
+        super().emit(record)
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room instead of failing to stop if the queue is full
+        self.queue.put(self._sentinel)
+
+
+class BackgroundHandler(QueueHandler):
+    """Put records into a bounded in-process queue, so threads that log never wait for disk. A listener thread formats
+    them and writes them with `DailyFileHandler`. If the queue is full (e.g. the disk stalls), records are dropped,
+    and how many of them were lost is logged once there's room again.
+    Every process starts its own listener with its first record, so processes forked after configuring logging
+    (e.g. `run_report_jobs` workers) get theirs too.
+    """
+
+    def __init__(self, filename: str | Path, backup_count: int = 30, queue_size: int = 10_000):
+        self.target = DailyFileHandler(filename, backup_count)
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        super().__init__(queue.Queue(queue_size))
+
+    def setFormatter(self, fmt: logging.Formatter | None) -> None:
+        # Records are formatted by the listener
+        self.target.setFormatter(fmt)
+
+    def _start(self) -> None:
+        if self._pid is not None:
+            # Forked. Locks of the parent's queue and file may have been held by its listener at that moment.
+            self.queue = queue.Queue(self.queue_size)
+            self.target.stream = None
+        self._listener = _Listener(self.queue, self.target)
+        self._listener.start()
+        self._pid = os.getpid()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Unlike `QueueHandler.prepare()`, leave formatting to the listener. Only merge message with its args now,
+        since they may change after the record is queued.
+        """
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Called with the handler lock held
+        if self._pid != os.getpid():
+            self._start()
+
+        if self.dropped:
+            dropped = logging.makeLogRecord(
+                {
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": "Log queue was full, records were dropped",
+                    "dropped": self.dropped,
+                }
+            )
+            try:
+                self.queue.put_nowait(dropped)
+                self.dropped = 0
+            except queue.Full:
+                pass
+
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Wait until every queued record is written"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener.start()
+        self.target.flush()
+
+    def close(self) -> None:
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+        self._listener = None
+        self.target.close()
+        super().close()
+
+
+@contextmanager
+def log_duration(logger: logging.Logger, event: str, **fields):
+    """Log `event` with `fields`, `status` and `duration_ms` once the block is done. Yield `fields`, so the block can
+    add some more. If the block raises, `status` is 'error' and `error` is the exception message.
+    Field names must not clash with `LogRecord` attributes, e.g. `created` or `name`.
+    """
+    fields = {"event": event, "status": "success", **fields}
+    start = time.perf_counter()
+    try:
+        yield fields
+    except Exception as e:
+        fields.update(status="error", error=f"{e}")
+        raise
+    finally:
+        fields["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        logger.info(event, extra=fields)
@@ -0,0 +1,104 @@
+import threading
+from bisect import bisect_left
+from typing import Iterator
+
+
+# Upper bounds of histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_lock = threading.Lock()
+
+
+def _labels(names: tuple[str, ...], values: tuple, **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Prometheus counter. Values are kept per combination of `labels`."""
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name, self.description, self.labels = name, description, labels
+        self.values = {}
+
+    def clear(self) -> None:
+        with _lock:
+            self.values.clear()
+
+    def inc(self, *label_values) -> None:
+        with _lock:
+            self.values[label_values] = self.values.get(label_values, 0) + 1
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} counter"
+        with _lock:
+            values = sorted(self.values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+    """Prometheus histogram with fixed `buckets`. Values are kept per combination of `labels`."""
+
+    def __init__(self, name: str, description: str, buckets: tuple, labels: tuple[str, ...] = ()):
+        self.name, self.description, self.buckets, self.labels = name, description, buckets, labels
+        # Observations per bucket (not cumulative, the last one is '+Inf') and their sum
+        self.series = {}
+
+    def clear(self) -> None:
+        with _lock:
+            self.series.clear()
+
+    def observe(self, value: float, *label_values) -> None:
+        idx = bisect_left(self.buckets, value)
+        with _lock:
+            if (series := self.series.get(label_values)) is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][idx] += 1
+            series[1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} histogram"
+        with _lock:
+            series = sorted(
+                (label_values, (counts.copy(), total)) for label_values, (counts, total) in self.series.items()
+            )
+        for label_values, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, le=bound)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {round(total, 6)}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}"
+
+
+# Collected by `home.middleware.metrics_middleware` per URL name. Every process has its own values.
+requests_total = Counter("r4c_requests_total", "Requests served.", labels=("view", "status"))
+request_duration = Histogram(
+    "r4c_request_duration_seconds", "Wall time of request.", DURATION_BUCKETS, labels=("view",)
+)
+request_db_queries = Histogram("r4c_request_db_queries", "DB queries per request.", QUERIES_BUCKETS, labels=("view",))
+request_db_duration = Histogram(
+    "r4c_request_db_duration_seconds", "Time spent in DB per request.", DURATION_BUCKETS, labels=("view",)
+)
+response_size = Histogram("r4c_response_size_bytes", "Response body size.", SIZE_BUCKETS, labels=("view",))
+# Counted by `robots.utils.cache.get_or_create_report`
+report_cache_requests = Counter("r4c_report_cache_requests_total", "Rendered report cache lookups.", labels=("result",))
+
+METRICS = (
+    requests_total,
+    request_duration,
+    request_db_queries,
+    request_db_duration,
+    response_size,
+    report_cache_requests,
+)
+
+
+def render_metrics() -> str:
+    """Return every metric in Prometheus text exposition format"""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone as tz
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Querysets of managers with these hints may be read from `REPORTS_REPLICA`,
+# e.g. `Robot.objects.db_manager(hints=REPORT_HINTS).filter(...)`. The rest are always read from the primary database.
+REPORT_HINTS = {"report": True}
+# Cache where `sync_replica` stores sync time of replicas. Must be shared by every process, see settings.
+SYNCED_CACHE = "replica"
+
+
+def _synced_key(alias: str) -> str:
+    """Return cache key of sync time of database `alias`. It depends on the database file rather than the alias,
+    so e.g. tests never see sync time of the real replica.
+    """
+    name = hashlib.sha1(f"{connections[alias].settings_dict['NAME']}".encode()).hexdigest()
+
+    return f"replica:{alias}:{name}:synced"
+
+
+def replica_synced() -> datetime | None:
+    """Return the moment `REPORTS_REPLICA` data is as of or `None` if it's disabled or hasn't been synced"""
+    if settings.REPORTS_REPLICA is None:
+        return None
+
+    return caches[SYNCED_CACHE].get(_synced_key(settings.REPORTS_REPLICA))
+
+
+def replica_is_fresh() -> bool:
+    """Return `True` if `REPORTS_REPLICA` lags behind the primary database by no more than `REPORTS_REPLICA_MAX_LAG`"""
+    if (synced := replica_synced()) is None:
+        return False
+
+    return tz.now() - synced <= tz.timedelta(seconds=settings.REPORTS_REPLICA_MAX_LAG)
+
+
+def sync_replica() -> datetime:
+    """Copy the primary database into `REPORTS_REPLICA` with SQLite online backup API. Return the moment the copy
+    is as of. Replica readers wait for the copy to finish, primary ones and writers aren't blocked thanks to WAL.
+    """
+    alias = settings.REPORTS_REPLICA
+    primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+    primary.ensure_connection()
+    replica.ensure_connection()
+
+    # Backup reads a snapshot of the primary database taken after this moment
+    synced = tz.now()
+    primary.connection.backup(replica.connection)
+    caches[SYNCED_CACHE].set(_synced_key(alias), synced, timeout=None)
+
+    return synced
+
+
+class ReportReplicaRouter:
+    """Send reads of querysets with `REPORT_HINTS` to `REPORTS_REPLICA` unless it's too stale, see `replica_is_fresh`.
+    Everything else, writes included, goes to the primary database.
+    Replica is a copy of the primary database made by `sync_replica` command, so nothing is migrated in it.
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        if hints.get("report") and replica_is_fresh():
+            return settings.REPORTS_REPLICA
+
+        return None
+
+    def allow_migrate(self, db, app_label, **hints) -> bool | None:
+        if db == settings.REPORTS_REPLICA:
+            return False
+
+        return None
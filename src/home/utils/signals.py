@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.dispatch import receiver
+from django.db.backends.signals import connection_created
+
+from home.middleware import record_query
+
+
+METRICS_MIDDLEWARE = "home.middleware.metrics_middleware"
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs) -> None:
+    """Apply `settings.SQLITE_PRAGMAS` to every new SQLite connection"""
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs) -> None:
+    """Count queries of every new connection in request metrics if `metrics_middleware` is enabled"""
+    if METRICS_MIDDLEWARE in settings.MIDDLEWARE and record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
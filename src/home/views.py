@@ -2,7 +2,15 @@ from django.shortcuts import render
 from django.http import HttpRequest, HttpResponse
 from django.views.decorators.http import require_GET
 
+from home.utils.metrics import render_metrics
+
 
 @require_GET
 def index_view(request: HttpRequest) -> HttpResponse:
     return render(request, template_name="home/index.html")
+
+
+@require_GET
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Request metrics of this process in Prometheus text format"""
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,3 +1,16 @@
 from django.contrib import admin
 
-# Register your models here.
+from home.utils.admin import LargeTableAdmin
+from orders.models import Order
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ("id", "customer_email", "robot_serial")
+    list_select_related = ("customer",)
+    # Choosing a customer from a `<select>` of every one of them would load the whole table
+    raw_id_fields = ("customer",)
+
+    @admin.display(description="customer")
+    def customer_email(self, order: Order) -> str:
+        return order.customer.email
@@ -0,0 +1,69 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db.models import F
+from django.core.mail import get_connection, send_mass_mail
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def _send_chunk(notifications: list[Notification]) -> bool:
+    """Send `notifications` over a single mail server connection. Return `True` if all of them are sent."""
+    datatuple = tuple((n.subject, n.message, None, (n.email,)) for n in notifications)
+    try:
+        send_mass_mail(datatuple, connection=get_connection())
+    except (Exception,):
+        logger.exception("Failed to send %s notifications", len(notifications))
+        return False
+
+    return True
+
+
+class Command(BaseCommand):
+    help = "Send emails queued in `Notification` outbox. Every email is sent at least once."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Notifications fetched from DB at once")
+        parser.add_argument("--workers", type=int, default=4, help="Threads sending emails in parallel")
+        parser.add_argument("--max-attempts", type=int, default=5, help="Give up on notification after N failures")
+        parser.add_argument("--interval", type=float, default=0, help="Check outbox every N seconds. Exit if 0.")
+
+    def handle(self, *args, batch_size, workers, max_attempts, interval, **options):
+        for option, value in (("--batch-size", batch_size), ("--workers", workers)):
+            if value < 1:
+                raise CommandError(f"'{option}' must be at least 1")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                sent, failed = self._drain(executor, batch_size, workers, max_attempts)
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} notifications, {failed} failed")
+                if not interval:
+                    break
+                time.sleep(interval)
+
+    @staticmethod
+    def _drain(executor: ThreadPoolExecutor, batch_size: int, workers: int, max_attempts: int) -> tuple[int, int]:
+        """Try to send every pending notification once. Return numbers of sent and failed ones."""
+        sent = failed = 0
+        last_id = 0
+        while batch := list(
+            Notification.objects.filter(id__gt=last_id, attempts__lt=max_attempts).order_by("id")[:batch_size]
+        ):
+            last_id = batch[-1].id
+            chunks = [batch[idx::workers] for idx in range(workers) if batch[idx::workers]]
+
+            sent_ids, failed_ids = [], []
+            for chunk, ok in zip(chunks, executor.map(_send_chunk, chunks)):
+                (sent_ids if ok else failed_ids).extend(n.id for n in chunk)
+
+            # Delete only after sending. If worker dies in between, emails are sent once again.
+            Notification.objects.filter(id__in=sent_ids).delete()
+            Notification.objects.filter(id__in=failed_ids).update(attempts=F("attempts") + 1)
+            sent, failed = sent + len(sent_ids), failed + len(failed_ids)
+
+        return sent, failed
@@ -0,0 +1,35 @@
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+
+
+def merge_duplicate_orders(apps, schema_editor):
+    """Keep the oldest order of every (customer, robot_serial) pair and delete the rest in small transactions"""
+    Order = apps.get_model("orders", "Order")
+
+    # Duplicates are adjacent when ordered by customer and serial
+    duplicates = []
+    previous = None
+    orders = Order.objects.order_by("customer_id", "robot_serial", "id")
+    for order_id, customer_id, serial in orders.values_list("id", "customer_id", "robot_serial").iterator(BATCH_SIZE):
+        if (customer_id, serial) == previous:
+            duplicates.append(order_id)
+        previous = (customer_id, serial)
+
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        with transaction.atomic():
+            Order.objects.filter(id__in=duplicates[start : start + BATCH_SIZE]).delete()
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("orders", "0003_notification"),
+        ("customers", "0003_merge_duplicate_customers"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.17 on 2026-10-18 10:36
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_stock(apps, schema_editor):
+    """Every robot assembled so far is in stock, since orders have never been allocated robots"""
+    Robot = apps.get_model("robots", "Robot")
+    Stock = apps.get_model("orders", "Stock")
+
+    rows = Robot.objects.values("serial").annotate(count=Count("id")).order_by()
+    Stock.objects.bulk_create((Stock(robot_serial=row["serial"], count=row["count"]) for row in rows), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0005_order_unique_pending_order"),
+        ("robots", "0003_robot_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Stock",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("robot_serial", models.CharField(max_length=5, unique=True)),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_stock, migrations.RunPython.noop),
+    ]
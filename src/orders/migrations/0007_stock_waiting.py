@@ -0,0 +1,33 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:19
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_waiting_orders(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    Stock = apps.get_model("orders", "Stock")
+
+    rows = Order.objects.values("robot_serial").annotate(count=Count("id")).order_by()
+    waiting = {row["robot_serial"]: row["count"] for row in rows}
+    Stock.objects.bulk_create((Stock(robot_serial=serial) for serial in waiting), ignore_conflicts=True)
+    stocks = list(Stock.objects.filter(robot_serial__in=list(waiting)))
+    for stock in stocks:
+        stock.waiting = waiting[stock.robot_serial]
+    Stock.objects.bulk_update(stocks, ("waiting",), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0006_stock"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stock",
+            name="waiting",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_waiting_orders, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,68 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import F
 
 from customers.models import Customer
 
 
+class OrdersManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs) -> list:
+        """`bulk_create()` that counts new orders in `Stock.waiting` along with them, since it doesn't send `post_save`.
+        Orders skipped with `ignore_conflicts` are counted as well, which only costs an extra lookup later.
+        """
+        objs = list(objs)
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            Stock.objects.add_waiting(Counter(order.robot_serial for order in objs))
+
+        return created
+
+
 class Order(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
-    robot_serial = models.CharField(max_length=5, blank=False, null=False)
+    robot_serial = models.CharField(max_length=5, blank=False, null=False, db_index=True)
+    objects = OrdersManager()
+
+    class Meta:
+        # Orders are deleted once fulfilled, so every order is pending
+        constraints = (models.UniqueConstraint(fields=("customer", "robot_serial"), name="unique_pending_order"),)
+
+
+class Notification(models.Model):
+    """Outbox of emails to customers. Filled along with fulfilled orders, drained by `send_notifications` command."""
+
+    email = models.CharField(max_length=255, blank=False, null=False)
+    subject = models.CharField(max_length=255, blank=False, null=False)
+    message = models.TextField(blank=False, null=False)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+
+class StockManager(models.Manager):
+    def add_waiting(self, counts: Counter[str]) -> None:
+        """Count new pending orders (number per serial) in `Stock.waiting`.
+        Must be called in the transaction creating the orders, otherwise a robot assembled in between stays in stock.
+        """
+        missing = [
+            serial
+            for serial, count in counts.items()
+            if not self.filter(robot_serial=serial).update(waiting=F("waiting") + count)
+        ]
+        if missing:
+            self.bulk_create((self.model(robot_serial=serial) for serial in missing), ignore_conflicts=True)
+            for serial in missing:
+                self.filter(robot_serial=serial).update(waiting=F("waiting") + counts[serial])
+
+
+class Stock(models.Model):
+    """Number of assembled robots of every serial that aren't allocated to any order yet
+    and number of pending orders waiting for them
+    """
+
+    robot_serial = models.CharField(max_length=5, blank=False, null=False, unique=True)
+    count = models.PositiveIntegerField(default=0)
+    # Incremented along with every new order (see `OrdersManager` and `count_waiting_order`), recounted when robots
+    # are allocated. Orders deleted some other way (e.g. with their customer) leave it too high, which only costs
+    # an extra lookup until it's recounted.
+    waiting = models.PositiveIntegerField(default=0)
+    objects = StockManager()
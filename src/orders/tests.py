@@ -1,3 +1,247 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.urls import reverse
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+
+from orders.models import Order, Notification, Stock
+from orders.utils.stock import allocate_robots, reserve_robot
+from robots.models import Robot
+from customers.models import Customer
+
+
+class SendNotificationsCommandTest(TestCase):
+    def setUp(self):
+        for idx in range(5):
+            customer = Customer.objects.create(email=f"user{idx}@example.org")
+            Order.objects.create(customer=customer, robot_serial="R2-D2")
+        for idx in range(5):
+            created = datetime(2023, 1, 1, second=idx, tzinfo=timezone.utc)
+            Robot.objects.create(serial="R2-D2", model="R2", version="D2", created=created)
+
+    def send_notifications(self, **options) -> None:
+        call_command("send_notifications", stdout=StringIO(), **options)
+
+    def test_orders_are_fulfilled_through_outbox(self):
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Notification.objects.count(), 5)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.send_notifications(batch_size=2, workers=2)
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f"user{idx}@example.org" for idx in range(5)])
+        self.assertIn("модели R2, версии D2", mail.outbox[0].body)
+        self.assertEqual(mail.outbox[0].from_email, "info@robocomplex.com")
+
+    def test_failed_notifications_are_retried(self):
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=OSError):
+            self.send_notifications()
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(set(Notification.objects.values_list("attempts", flat=True)), {1})
+
+        self.send_notifications()
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_notifications_are_not_retried_after_max_attempts(self):
+        Notification.objects.update(attempts=3)
+
+        self.send_notifications(max_attempts=3)
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_invalid_options_are_rejected(self):
+        for options in ({"workers": 0}, {"batch_size": 0}):
+            with self.assertRaises(CommandError):
+                self.send_notifications(**options)
+
+        self.assertEqual(Notification.objects.count(), 5)
+
+
+class NewOrderAsyncViewTest(TestCase):
+    async def test_new_order(self):
+        response = await self.async_client.post(
+            reverse("new_order_async_view"), data={"serial": "r2-d2", "email": "address@example.org"}
+        )
+
+        self.assertRedirects(response, reverse("successful_order_view"), fetch_redirect_response=False)
+        order = await Order.objects.select_related("customer").aget()
+        self.assertEqual((order.robot_serial, order.customer.email), ("R2-D2", "address@example.org"))
+
+    async def test_invalid_order(self):
+        response = await self.async_client.post(reverse("new_order_async_view"), data={"serial": "R2-D2"})
+
+        self.assertRedirects(response, reverse("failed_order_view"), fetch_redirect_response=False)
+        self.assertFalse(await Order.objects.aexists())
+
+
+class NewOrderViewTest(TestCase):
+    def test_repeated_orders_are_coalesced(self):
+        for email in ("Address@Example.org", "address@example.org", " address@example.org "):
+            self.client.post(reverse("new_order_view"), data={"serial": "r2-d2", "email": email})
+        self.client.post(reverse("new_order_view"), data={"serial": "X5-LT", "email": "address@example.org"})
+
+        self.assertEqual(list(Customer.objects.values_list("email", flat=True)), ["address@example.org"])
+        self.assertEqual(sorted(Order.objects.values_list("robot_serial", flat=True)), ["R2-D2", "X5-LT"])
+
+
+class StockTest(TestCase):
+    def add_robots(self, count: int) -> None:
+        start = Robot.objects.count()
+        for idx in range(start, start + count):
+            created = datetime(2023, 1, 1, second=idx, tzinfo=timezone.utc)
+            Robot.objects.create(serial="R2-D2", model="R2", version="D2", created=created)
+
+    def order(self, email: str) -> None:
+        self.client.post(reverse("new_order_view"), data={"serial": "R2-D2", "email": email})
+
+    def test_robot_in_stock_is_allocated_right_away(self):
+        self.add_robots(1)
+
+        self.order("first@example.org")
+        self.order("second@example.org")
+
+        self.assertEqual(list(Notification.objects.values_list("email", flat=True)), ["first@example.org"])
+        self.assertEqual(list(Order.objects.values_list("customer__email", flat=True)), ["second@example.org"])
+        self.assertEqual(Stock.objects.get(robot_serial="R2-D2").count, 0)
+
+    def test_robots_are_allocated_to_the_oldest_orders(self):
+        for idx in range(3):
+            self.order(f"user{idx}@example.org")
+
+        self.add_robots(2)
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list("email", flat=True)), ["user0@example.org", "user1@example.org"]
+        )
+        self.assertEqual(list(Order.objects.values_list("customer__email", flat=True)), ["user2@example.org"])
+
+        self.add_robots(2)
+
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Stock.objects.get(robot_serial="R2-D2").count, 1)
+
+    def test_robots_nobody_waits_for_go_to_stock_with_one_query(self):
+        self.add_robots(1)
+
+        with CaptureQueriesContext(connection) as queries:
+            allocate_robots(Counter({"R2-D2": 2}))
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(Stock.objects.get(robot_serial="R2-D2").count, 3)
+
+    def test_model_with_dash(self):
+        customer = Customer.objects.create(email="address@example.org")
+        Order.objects.create(customer=customer, robot_serial="A--D2")
+
+        created = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        Robot.objects.create(serial="A--D2", model="A-", version="D2", created=created)
+
+        self.assertIn("модели A-, версии D2", Notification.objects.get().message)
+
+    def test_waiting_orders_are_counted(self):
+        self.order("first@example.org")
+        customers = Customer.objects.bulk_create(Customer(email=f"user{idx}@example.org") for idx in range(2))
+        Order.objects.bulk_create(Order(customer=customer, robot_serial="R2-D2") for customer in customers)
+        self.assertEqual(Stock.objects.get(robot_serial="R2-D2").waiting, 3)
+
+        self.add_robots(1)
+        self.assertEqual(Stock.objects.get(robot_serial="R2-D2").waiting, 2)
+        self.assertEqual(list(Notification.objects.values_list("email", flat=True)), ["first@example.org"])
+
+        # Deleted orders are forgotten once robots are allocated
+        Customer.objects.filter(email__in=("user0@example.org", "user1@example.org")).delete()
+        self.assertEqual(Stock.objects.get(robot_serial="R2-D2").waiting, 2)
+        self.add_robots(1)
+        self.assertEqual(Stock.objects.values_list("count", "waiting").get(robot_serial="R2-D2"), (1, 0))
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+class OrderAdminTest(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.org", "password"))
+
+    def count_changelist_queries(self, orders_count: int) -> int:
+        customers = Customer.objects.bulk_create(
+            Customer(email=f"user{Customer.objects.count() + idx}@example.org") for idx in range(orders_count)
+        )
+        Order.objects.bulk_create(Order(customer=customer, robot_serial="R2-D2") for customer in customers)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:orders_order_changelist"))
+        self.assertContains(response, customers[-1].email)
+
+        return len(queries)
+
+    def test_customers_are_selected_along_with_orders(self):
+        few_orders_queries = self.count_changelist_queries(2)
+
+        self.assertEqual(self.count_changelist_queries(50), few_orders_queries)
+
+
+class StockConcurrencyTest(TransactionTestCase):
+    def test_robot_is_never_allocated_twice(self):
+        in_stock, customers_count = 5, 20
+        for idx in range(in_stock):
+            created = datetime(2023, 1, 1, second=idx, tzinfo=timezone.utc)
+            Robot.objects.create(serial="R2-D2", model="R2", version="D2", created=created)
+        customers = [Customer.objects.create(email=f"user{idx}@example.org") for idx in range(customers_count)]
+        barrier = threading.Barrier(customers_count, timeout=10)
+
+        def order(customer: Customer) -> None:
+            barrier.wait()
+            try:
+                reserve_robot(customer, "R2-D2")
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=customers_count) as executor:
+            tuple(executor.map(order, customers))
+
+        self.assertEqual(Notification.objects.count(), in_stock)
+        self.assertEqual(Order.objects.count(), customers_count - in_stock)
+        self.assertEqual(Stock.objects.get(robot_serial="R2-D2").count, 0)
+
+    def test_robot_is_never_left_in_stock_while_somebody_waits(self):
+        robots_count, customers_count = 8, 8
+        customers = [Customer.objects.create(email=f"user{idx}@example.org") for idx in range(customers_count)]
+        barrier = threading.Barrier(robots_count + customers_count, timeout=10)
+
+        def run(func, *args) -> None:
+            barrier.wait()
+            try:
+                func(*args)
+            finally:
+                connection.close()
+
+        def add_robot(idx: int) -> None:
+            with transaction.atomic():
+                created = datetime(2023, 1, 1, second=idx, tzinfo=timezone.utc)
+                Robot.objects.create(serial="R2-D2", model="R2", version="D2", created=created)
+
+        with ThreadPoolExecutor(max_workers=robots_count + customers_count) as executor:
+            futures = [executor.submit(run, add_robot, idx) for idx in range(robots_count)]
+            futures += [executor.submit(run, reserve_robot, customer, "R2-D2") for customer in customers]
+            for future in futures:
+                future.result()
+
+        # Every robot is either allocated or in stock, every customer either got a robot or waits for it
+        stock = Stock.objects.get(robot_serial="R2-D2")
+        self.assertEqual(Notification.objects.count() + stock.count, robots_count)
+        self.assertEqual(Notification.objects.count() + Order.objects.count(), customers_count)
+        self.assertEqual(Order.objects.count(), stock.waiting)
+        self.assertFalse(Order.objects.exists() and stock.count)
@@ -1,10 +1,18 @@
+import logging
+
 from django.http import HttpRequest
 
-from orders.models import Order
+from asgiref.sync import sync_to_async
+
+from home.utils.log import log_duration
+from orders.utils.stock import reserve_robot
 from robots.models import Robot
 from customers.models import Customer
 
 
+logger = logging.getLogger(__name__)
+
+
 def _validate_new_order_request(request: HttpRequest) -> dict[str, str] | None:
     """Return valid data for creating a new order from POST request as `dict`.
     If something is wrong, raise `ValueError` with corresponding message.
@@ -31,12 +39,25 @@ def _validate_new_order_request(request: HttpRequest) -> dict[str, str] | None:
     if not Customer.email_is_valid(email):
         raise ValueError("email is invalid")
 
-    # Normalization. Make `serial` uppercase before return.
-    return {"serial": serial.upper(), "email": email}
+    # Normalization. Make `serial` uppercase and `email` lowercase before return.
+    return {"serial": serial.upper(), "email": Customer.normalize_email(email)}
+
+
+def _create_order(data: dict[str, str]) -> None:
+    """Allocate robot from stock or store new Order using `data` validated with `_validate_new_order_request`"""
+    with log_duration(logger, "order_created", serial=data["serial"]) as fields:
+        customer, _ = Customer.objects.get_or_create(email=data["email"])
+        fields["from_stock"] = reserve_robot(customer, data["serial"])
 
 
 def create_new_order(request: HttpRequest) -> None:
-    """Create new Order using data validated with `_validate_new_order_request`"""
-    data = _validate_new_order_request(request)
-    new_customer = Customer.objects.create(email=data["email"])
-    Order.objects.create(customer=new_customer, robot_serial=data["serial"])
+    """Create new Order using data validated with `_validate_new_order_request`.
+    Customers are looked up by email, and repeated orders of the same robot are coalesced into one.
+    If the robot is in stock, it's allocated to the customer right away, and no order is stored.
+    """
+    _create_order(_validate_new_order_request(request))
+
+
+async def acreate_new_order(request: HttpRequest) -> None:
+    """Async `create_new_order`. Allocation needs a transaction, so it's moved to a thread."""
+    await sync_to_async(_create_order)(_validate_new_order_request(request))
@@ -1,23 +1,38 @@
+from collections import Counter
+
 from django.dispatch import receiver
-from django.core.mail import send_mail
 from django.db.models.signals import post_save
 
-from orders.models import Order
 from robots.models import Robot
+from robots.utils.signals import robots_bulk_created, robots_imported
+from orders.models import Order, Stock
+from orders.utils.stock import allocate_robots
 
 
 @receiver(post_save, sender=Robot)
-def notify_customers_robot_available(sender, instance, **kwargs) -> None:
-    """Notify all customers who ordered a robot when the one they desired is assembled.
-    Delete orders from DB after sending notifications.
+def notify_customers_robot_available(sender, instance, created, **kwargs) -> None:
+    """Notify the customer who has been waiting for the robot the longest when the one they desired is assembled.
+    Delete fulfilled order from DB after queueing notification. Emails are sent by `send_notifications` command.
+    If nobody is waiting, the robot stays in stock.
     """
-    if orders := Order.objects.filter(robot_serial=instance.serial):
-        email_subject = "Робот доступен к покупке!"
-        email_message = (
-            "Здравствуйте!\n\n"
-            f"Недавно Вы интересовались нашим роботом модели {instance.model}, версии {instance.version}.\n\n"
-            "Этот робот теперь в наличии. Если Вам подходит этот вариант — пожалуйста, свяжитесь с нами."
-        )
-        for order in orders:
-            send_mail(email_subject, email_message, "info@robocomplex.com", (order.customer.email,))
-            order.delete()
+    if created:
+        allocate_robots(Counter((instance.serial,)))
+
+
+@receiver(robots_bulk_created, sender=Robot)
+def notify_customers_robots_available(sender, instances, **kwargs) -> None:
+    """Batched `notify_customers_robot_available` for robots created with `bulk_create()`"""
+    allocate_robots(Counter(robot.serial for robot in instances))
+
+
+@receiver(robots_imported, sender=Robot)
+def notify_customers_robots_imported(sender, assembled, **kwargs) -> None:
+    """`notify_customers_robots_available` for a chunk of imported robots. Orders are allocated once per serial."""
+    allocate_robots(assembled)
+
+
+@receiver(post_save, sender=Order)
+def count_waiting_order(sender, instance, created, **kwargs) -> None:
+    """Count a new pending order in `Stock.waiting`, so robots it waits for aren't just put in stock"""
+    if created:
+        Stock.objects.add_waiting(Counter((instance.robot_serial,)))
@@ -0,0 +1,88 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from orders.models import Order, Notification, Stock
+from robots.models import Robot
+from customers.models import Customer
+
+
+def _robot_available_notification(email: str, serial: str) -> Notification:
+    """Return unsaved "robot available" email about robot with `serial` to `email`"""
+    model, version = Robot.split_serial(serial)
+    return Notification(
+        email=email,
+        subject="Робот доступен к покупке!",
+        message=(
+            "Здравствуйте!\n\n"
+            f"Недавно Вы интересовались нашим роботом модели {model}, версии {version}.\n\n"
+            "Этот робот теперь в наличии. Если Вам подходит этот вариант — пожалуйста, свяжитесь с нами."
+        ),
+    )
+
+
+def allocate_robots(assembled: Counter[str]) -> None:
+    """Put newly assembled robots (number per serial) in stock and allocate them to the oldest waiting orders.
+    Customers of fulfilled orders are notified through outbox, the orders are deleted.
+    """
+    # Optimization. Nobody is waiting for most serials, so a robot usually just goes to stock with a single UPDATE.
+    # The row is locked by the UPDATE, so an order can't be placed meanwhile without seeing the robot in stock.
+    if len(assembled) == 1:
+        ((serial, count),) = assembled.items()
+        if Stock.objects.filter(robot_serial=serial, waiting=0).update(count=F("count") + count):
+            return
+
+    serials = tuple(assembled)
+    with transaction.atomic():
+        Stock.objects.bulk_create((Stock(robot_serial=serial) for serial in serials), ignore_conflicts=True)
+        # Lock stock rows, so concurrent `reserve_robot()` can't see robots that are being allocated
+        stocks = tuple(Stock.objects.select_for_update().filter(robot_serial__in=serials))
+
+        waiting = {}
+        if waited := [stock.robot_serial for stock in stocks if stock.waiting]:
+            orders = Order.objects.filter(robot_serial__in=waited).select_related("customer").order_by("id")
+            for order in orders:
+                waiting.setdefault(order.robot_serial, []).append(order)
+
+        fulfilled = []
+        for stock in stocks:
+            stock.count += assembled[stock.robot_serial]
+            orders = waiting.get(stock.robot_serial, [])
+            allocated = orders[: stock.count]
+            stock.count -= len(allocated)
+            # Recounted, so orders deleted some other way are forgotten
+            stock.waiting = len(orders) - len(allocated)
+            fulfilled.extend(allocated)
+
+        # Optimization. `bulk_update()` builds a CASE per field with a WHEN per row, which takes longer than
+        # the UPDATEs themselves when an import assembles robots of many serials.
+        quote = connection.ops.quote_name
+        count, waiting, pk = (quote(Stock._meta.get_field(field).column) for field in ("count", "waiting", "id"))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {quote(Stock._meta.db_table)} SET {count} = %s, {waiting} = %s WHERE {pk} = %s",
+                [(stock.count, stock.waiting, stock.pk) for stock in stocks],
+            )
+        if fulfilled:
+            Notification.objects.bulk_create(
+                _robot_available_notification(order.customer.email, order.robot_serial) for order in fulfilled
+            )
+            Order.objects.filter(pk__in=[order.pk for order in fulfilled]).delete()
+
+
+def reserve_robot(customer: Customer, serial: str) -> bool:
+    """Allocate robot with `serial` to `customer` if it's in stock and notify them. Otherwise, store an order.
+    Return `True` if robot is allocated right away.
+    """
+    with transaction.atomic():
+        # The transaction starts with a write, so SQLite takes the write lock (waiting up to `busy_timeout` for it)
+        # before anything is read. Had it read first, it would fail with "database is locked" right away
+        # if another writer committed in between. Conditional UPDATE never lets the counter go below zero.
+        if Stock.objects.filter(robot_serial=serial, count__gt=0).update(count=F("count") - 1):
+            _robot_available_notification(customer.email, serial).save()
+            return True
+
+        # `Stock.waiting` is counted by `post_save` within this transaction
+        Order.objects.get_or_create(customer=customer, robot_serial=serial)
+        return False
@@ -1,9 +1,9 @@
 from django.urls import reverse
 from django.shortcuts import render, redirect
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed
 from django.views.decorators.http import require_http_methods, require_GET
 
-from orders.utils.factory import create_new_order
+from orders.utils.factory import create_new_order, acreate_new_order
 
 
 @require_http_methods(("GET", "POST"))
@@ -21,6 +21,23 @@ def new_order_view(request: HttpRequest) -> HttpResponse:
             return redirect(reverse("successful_order_view"))
 
 
+async def new_order_async_view(request: HttpRequest) -> HttpResponse:
+    """Async `new_order_view`"""
+    if request.method == "GET":
+        return render(request, template_name="orders/order.html")
+
+    if request.method == "POST":
+        try:
+            await acreate_new_order(request)
+        except ValueError:
+            return redirect(reverse("failed_order_view"))
+        else:
+            return redirect(reverse("successful_order_view"))
+
+    # Django 4.2 `require_http_methods` doesn't support async views
+    return HttpResponseNotAllowed(("GET", "POST"))
+
+
 @require_GET
 def successful_order_view(request: HttpRequest) -> HttpResponse:
     """Displayed when order is successfully submitted"""
@@ -1,3 +1,59 @@
 from django.contrib import admin
 
-# Register your models here.
+from home.utils.admin import IndexedDatesQuerySet, LargeTableAdmin
+from robots.models import Robot
+from robots.utils.counters import production_counters
+
+
+class SerialPartFilter(admin.SimpleListFilter):
+    """Filter robots by a part of their serial. Choices are taken from production totals of every serial
+    instead of `SELECT DISTINCT` over all robots.
+    """
+
+    # 0 for model, 1 for version
+    part = 0
+
+    def lookups(self, request, model_admin):
+        totals, _ = production_counters.totals()
+        return [(value, value) for value in sorted({Robot.split_serial(serial)[self.part] for serial in totals})]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+
+        return queryset.filter(**{self.parameter_name: self.value()})
+
+
+class ModelFilter(SerialPartFilter):
+    title = "model"
+    parameter_name = "model"
+    part = 0
+
+
+class VersionFilter(SerialPartFilter):
+    title = "version"
+    parameter_name = "version"
+    part = 1
+
+
+@admin.register(Robot)
+class RobotAdmin(LargeTableAdmin):
+    list_display = ("serial", "model", "version", "created")
+    list_filter = (ModelFilter, VersionFilter)
+    # Both are backed by the unique index of `created`
+    date_hierarchy = "created"
+    ordering = ("-created",)
+    # Read-only. Robots are added by the API and imports, which keep production totals and stock in sync with them.
+    actions = None
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return IndexedDatesQuerySet(self.model).order_by(*self.get_ordering(request))
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class RobotsConfig(AppConfig):
     name = "robots"
+
+    def ready(self):
+        import robots.utils.signals
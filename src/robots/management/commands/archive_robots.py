@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from robots.models import archive_horizon
+from robots.utils.archive import BATCH_SIZE, archive_robots
+
+
+class Command(BaseCommand):
+    help = (
+        "Move robots assembled more than `ROBOTS_ARCHIVE_AFTER_DAYS` days ago from `Robot` to `ArchivedRobot` "
+        "in batches, each in its own transaction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Robots moved in one transaction")
+
+    def handle(self, *args, batch_size, **options):
+        if batch_size < 1:
+            raise CommandError("'--batch-size' must be a positive number")
+        if (horizon := archive_horizon()) is None:
+            raise CommandError("Archival is disabled by `ROBOTS_ARCHIVE_AFTER_DAYS` setting")
+
+        archived = archive_robots(horizon, batch_size)
+        for month, count in sorted(archived.items()):
+            self.stdout.write(f"{month:%Y-%m}: {count}")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived.total()} robots assembled before {horizon:%Y-%m-%d}"))
@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from robots.utils.export import EXPORT_FORMATS, export_robots
+
+
+class Command(BaseCommand):
+    help = "Export raw robot records as CSV or NDJSON to a file or stdout"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=tuple(EXPORT_FORMATS), default="csv", dest="export_format")
+        parser.add_argument("--model", type=str.upper)
+        parser.add_argument("--robot-version", type=str.upper, dest="robot_version")
+        parser.add_argument("--start", type=date.fromisoformat, help="First day, 'YYYY-MM-DD'")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last day, 'YYYY-MM-DD'")
+        parser.add_argument("--output", "-o", help="File to write to. Defaults to stdout.")
+
+    def handle(self, *args, export_format, model, robot_version, start, end, output, **options):
+        lines = export_robots(export_format, model=model, version=robot_version, start=start, end=end)
+
+        if output is None:
+            for chunk in lines:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with open(output, "w", encoding="utf-8", newline="") as file:
+            file.writelines(lines)
+        self.stderr.write(self.style.SUCCESS(f"Robots exported to {output}"))
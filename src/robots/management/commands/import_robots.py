@@ -0,0 +1,51 @@
+import sys
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from robots.utils.importer import IMPORT_FORMATS, CHUNK_SIZE, import_robots, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Import robot records from CSV (with a header) or NDJSON file, e.g. made by `export_robots`. "
+        "Rejected records are reported as NDJSON to a side file or stderr."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to read from. '-' for stdin.")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, default="csv", dest="import_format")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Records inserted in one transaction")
+        parser.add_argument("--rejected", help="File to report rejected records to. Defaults to stderr.")
+
+    def handle(self, *args, path, import_format, chunk_size, rejected, **options):
+        if chunk_size < 1:
+            raise CommandError("'--chunk-size' must be a positive number")
+
+        try:
+            file = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+            rejected_file = None if rejected is None else open(rejected, "w", encoding="utf-8")
+        except OSError as e:
+            raise CommandError(e)
+
+        rejected_count = 0
+
+        def reject(line_num: int, record: dict | ValueError, error: Exception) -> None:
+            nonlocal rejected_count
+            rejected_count += 1
+            record = None if isinstance(record, ValueError) else record
+            line = json.dumps({"line": line_num, "error": f"{error}", "record": record}, ensure_ascii=False)
+            if rejected_file is None:
+                self.stderr.write(line)
+            else:
+                rejected_file.write(line + "\n")
+
+        try:
+            imported = import_robots(read_records(file, import_format), reject, chunk_size)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+            if rejected_file is not None:
+                rejected_file.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} robots, {rejected_count} rejected"))
@@ -0,0 +1,38 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.core.management.base import BaseCommand
+
+from robots.models import Robot, ArchivedRobot, ProductionDailyRollup
+from robots.utils.cache import bump_production_generation
+
+
+class Command(BaseCommand):
+    help = "Rebuild `ProductionDailyRollup` from scratch using `Robot` and `ArchivedRobot` tables"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            totals = Counter()
+            for queryset in (Robot.objects.all(), ArchivedRobot.objects.all()):
+                rows = (
+                    queryset.annotate(day=TruncDate("created"))
+                    .values_list("model", "version", "day")
+                    .annotate(count=Count("id"))
+                    .order_by()
+                )
+                for model, version, day, count in rows.iterator():
+                    totals[model, version, day] += count
+
+            ProductionDailyRollup.objects.all().delete()
+            created = ProductionDailyRollup.objects.bulk_create(
+                (
+                    ProductionDailyRollup(model=model, version=version, day=day, count=count)
+                    for (model, version, day), count in totals.items()
+                ),
+                batch_size=1000,
+            )
+        bump_production_generation()
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(created)} rollup rows"))
@@ -0,0 +1,54 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.core.management.base import BaseCommand, CommandError
+
+from robots.models import Robot, ArchivedRobot, ProductionDailyRollup, ProductionSnapshot
+from robots.utils.counters import ProductionCounters
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that production totals rebuilt from the last snapshot and events, as well as `ProductionDailyRollup`, "
+        "exactly match the number of robots per serial, archived ones included"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--snapshot", action="store_true", help="Save a snapshot of totals if they match")
+
+    def handle(self, *args, snapshot, **options):
+        # Every source is read within one transaction, i.e. from the same state of DB even during ingestion
+        with transaction.atomic():
+            # Archived robots are still counted by events and rollup
+            robots = Counter()
+            for queryset in (Robot.objects.all(), ArchivedRobot.objects.all()):
+                for row in queryset.values("model", "version").annotate(count=Count("id")).order_by():
+                    robots[f"{row['model']}-{row['version']}"] += row["count"]
+            events, last_event_id = ProductionCounters().totals()
+            rollup = Counter(
+                {
+                    f"{row['model']}-{row['version']}": row["count"]
+                    for row in ProductionDailyRollup.objects.values("model", "version")
+                    .annotate(count=Sum("count"))
+                    .order_by()
+                }
+            )
+
+        mismatches = [
+            f"{serial}: robots {robots[serial]}, events {events.get(serial, 0)}, rollup {rollup[serial]}"
+            for serial in sorted(robots.keys() | events.keys() | rollup.keys())
+            if not robots[serial] == events.get(serial, 0) == rollup[serial]
+        ]
+        if mismatches:
+            for mismatch in mismatches:
+                self.stderr.write(mismatch)
+            raise CommandError(f"Production totals of {len(mismatches)} serials don't match robots")
+
+        if snapshot:
+            ProductionSnapshot.objects.create(last_event_id=last_event_id, totals=events)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Production totals of {sum(robots.values())} robots match, last event id is {last_event_id}"
+            )
+        )
@@ -0,0 +1,79 @@
+import time
+import logging
+from typing import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone as tz
+from django.core.management.base import BaseCommand, CommandError
+
+from robots.models import ReportJob
+from robots.utils.jobs import build_report, claim_next_job, collect_garbage
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build reports queued as `ReportJob`s in a pool of processes and delete expired ones from `REPORTS_DIR`. "
+        "Only one worker is supposed to run at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.REPORTS_MAX_WORKERS,
+            help="Processes building reports in parallel. Build them in this process if 0.",
+        )
+        parser.add_argument("--interval", type=float, default=0, help="Check queue every N seconds. Exit if 0.")
+
+    def handle(self, *args, workers, interval, **options):
+        if workers < 0:
+            raise CommandError("'--workers' must not be negative")
+
+        # Jobs left by a worker stopped midway
+        ReportJob.objects.filter(status=ReportJob.Status.RUNNING).update(status=ReportJob.Status.QUEUED)
+
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=django.setup) if workers else None
+        running: dict[Future, ReportJob] = {}
+        try:
+            while True:
+                if deleted := collect_garbage():
+                    self.stdout.write(f"Deleted {deleted} expired reports")
+
+                while len(running) < max(workers, 1) and (job := claim_next_job()):
+                    if executor is None:
+                        self._finish(job, lambda: build_report(job.id))
+                        continue
+                    # Forked processes mustn't share DB connections of this one
+                    connections.close_all()
+                    running[executor.submit(build_report, job.id)] = job
+
+                if running:
+                    done, _ = wait(running, timeout=interval or None, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._finish(running.pop(future), future.result)
+                    continue
+                if not interval:
+                    break
+                time.sleep(interval)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def _finish(self, job: ReportJob, get_filename: Callable[[], str]) -> None:
+        """Mark `job` as done with the filename returned by `get_filename()` or as failed if it raises"""
+        try:
+            filename = get_filename()
+        except (Exception,) as e:
+            logger.exception("Failed to build report of job %s", job.id)
+            ReportJob.objects.filter(id=job.id).update(status=ReportJob.Status.FAILED, error=f"{e}", finished=tz.now())
+            self.stdout.write(f"Job {job.id} failed: {e}")
+        else:
+            ReportJob.objects.filter(id=job.id).update(
+                status=ReportJob.Status.DONE, filename=filename, finished=tz.now()
+            )
+            self.stdout.write(f"Job {job.id} is done")
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.17 on 2026-10-18 10:27
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    Robot = apps.get_model("robots", "Robot")
+    ProductionDailyRollup = apps.get_model("robots", "ProductionDailyRollup")
+
+    rows = (
+        Robot.objects.annotate(day=TruncDate("created")).values("model", "version", "day").annotate(count=Count("id"))
+    )
+    ProductionDailyRollup.objects.bulk_create(
+        (ProductionDailyRollup(**row) for row in rows.order_by()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("robots", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductionDailyRollup",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("model", models.CharField(max_length=2)),
+                ("version", models.CharField(max_length=2)),
+                ("day", models.DateField()),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="productiondailyrollup",
+            constraint=models.UniqueConstraint(
+                fields=("day", "model", "version"), name="unique_rollup_day_model_version"
+            ),
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
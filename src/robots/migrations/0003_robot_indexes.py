@@ -0,0 +1,55 @@
+# Generated by Django 4.2.17 on 2026-10-18 10:29
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def delete_duplicate_robots(apps, schema_editor):
+    """Keep the first robot assembled at every second and delete the rest, so `unique_robot_created` can be added.
+    Production rollup backfilled by the previous migration counts them, so they are subtracted from it as well.
+    """
+    Robot = apps.get_model("robots", "Robot")
+    ProductionDailyRollup = apps.get_model("robots", "ProductionDailyRollup")
+
+    # Duplicates are adjacent when ordered by `created`
+    duplicates, totals = [], Counter()
+    previous = None
+    robots = Robot.objects.order_by("created", "id").values_list("id", "model", "version", "created")
+    for robot_id, model, version, created in robots.iterator(BATCH_SIZE):
+        if created == previous:
+            duplicates.append(robot_id)
+            # Days are truncated in the current time zone, like `TruncDate` does in the previous migration
+            totals[model, version, timezone.localdate(created)] += 1
+        previous = created
+
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        Robot.objects.filter(id__in=duplicates[start : start + BATCH_SIZE]).delete()
+    for (model, version, day), count in totals.items():
+        ProductionDailyRollup.objects.filter(model=model, version=version, day=day).update(count=F("count") - count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("robots", "0002_productiondailyrollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_robots, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="robot",
+            index=models.Index(
+                fields=["model", "version", "created"],
+                name="robot_model_version_created",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="robot",
+            constraint=models.UniqueConstraint(fields=("created",), name="unique_robot_created"),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:04
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_events(apps, schema_editor):
+    Robot = apps.get_model("robots", "Robot")
+    ProductionEvent = apps.get_model("robots", "ProductionEvent")
+
+    rows = Robot.objects.values("model", "version").annotate(count=Count("id")).order_by()
+    ProductionEvent.objects.bulk_create((ProductionEvent(**row) for row in rows), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("robots", "0003_robot_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductionEvent",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("model", models.CharField(max_length=2)),
+                ("version", models.CharField(max_length=2)),
+                ("count", models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ProductionSnapshot",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("last_event_id", models.PositiveBigIntegerField(db_index=True)),
+                ("totals", models.JSONField(default=dict)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
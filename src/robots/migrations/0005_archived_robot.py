@@ -0,0 +1,27 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("robots", "0004_production_events"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedRobot",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("serial", models.CharField(max_length=5)),
+                ("model", models.CharField(max_length=2)),
+                ("version", models.CharField(max_length=2)),
+                ("created", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="archivedrobot",
+            constraint=models.UniqueConstraint(fields=("created",), name="unique_archived_robot_created"),
+        ),
+    ]
@@ -1,32 +1,50 @@
-from re import fullmatch
-from datetime import datetime
+import re
+from collections import Counter
+from datetime import date, datetime
+from typing import Iterable
 
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction, IntegrityError
 from django.utils import timezone
-from django.db.models import Count
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
 
+from home.utils.replica import REPORT_HINTS
 
-class RobotsManager(models.Manager):
-    def models(self) -> tuple[str]:
-        """Get unique `Robot.model` values"""
-        return tuple(self.values_list("model", flat=True).distinct())
+# Optimization. Compile once instead of looking it up in `re` cache on every call.
+SERIAL_PATTERN = re.compile("[a-zA-Z0-9]{2}-[a-zA-Z0-9]{2}")
 
-    def last_week_production_summary(self, model: str) -> dict:
-        """Extract `Robot.model` production totals for the last week
-        e.g. {"R2": ({"version": "D2", "count": "42"}, {"version": "D3", "count": "7"}), ...}
-        """
-        now = timezone.now()
-        week_ago = now - timezone.timedelta(weeks=1)
+# Periods production reports can be aggregated by
+GRANULARITIES = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}
+
+
+def _group_by_model(rows) -> dict:
+    """Turn `{"model", "version", "count"}` rows ordered by model into a production summary of every model
+    e.g. {"R2": ({"version": "D2", "count": 42}, {"version": "D3", "count": 7}), "13": (...), ...}
+    """
+    data = {}
+    for row in rows:
+        data.setdefault(row["model"], []).append({"version": row["version"], "count": row["count"]})
+
+    return {model: tuple(model_data) for model, model_data in data.items()}
+
+
+def archive_horizon() -> datetime | None:
+    """Return the moment robots assembled before are moved to `ArchivedRobot` or `None` if archival is disabled.
+    Robots assembled after it are never looked up in the archive.
+    """
+    if settings.ROBOTS_ARCHIVE_AFTER_DAYS is None:
+        return None
+
+    return timezone.now() - timezone.timedelta(days=settings.ROBOTS_ARCHIVE_AFTER_DAYS)
 
-        data = tuple(
-            self.filter(model=model, created__range=(week_ago, now)).values("version").annotate(count=Count("id"))
-        )
 
-        return {model: data} if data else {}
+def reaches_archive(start: datetime | None) -> bool:
+    """Return `True` if a window starting at `start` (`None` is the very beginning) may contain archived robots"""
+    if (horizon := archive_horizon()) is None:
+        return False
 
-    def is_assembled_at_second(self, timestamp: datetime) -> bool:
-        """Return True if there's a robot already assembled at that second, otherwise False"""
-        return self.filter(created=timestamp).first() is not None
+    return start is None or start < horizon
 
 
 class Robot(models.Model):
@@ -34,9 +52,170 @@ class Robot(models.Model):
     model = models.CharField(max_length=2, blank=False, null=False)
     version = models.CharField(max_length=2, blank=False, null=False)
     created = models.DateTimeField(blank=False, null=False)
-    objects = RobotsManager()
+
+    class Meta:
+        # Unique constraint also serves as an index for `created` range lookups
+        constraints = (models.UniqueConstraint(fields=("created",), name="unique_robot_created"),)
+        indexes = (models.Index(fields=("model", "version", "created"), name="robot_model_version_created"),)
 
     @staticmethod
     def serial_is_valid(serial: str) -> bool:
         """Return `True` if `serial` is something like 'R2-D2', '13-xs' etc., otherwise `False`"""
-        return fullmatch("[a-zA-Z0-9]{2}-[a-zA-Z0-9]{2}", serial) is not None
+        return SERIAL_PATTERN.fullmatch(serial) is not None
+
+    @staticmethod
+    def split_serial(serial: str) -> tuple[str, str]:
+        """Return `model` and `version` of robot with `serial`, e.g. ('R2', 'D2') for 'R2-D2'.
+        Serial is sliced rather than split, since `model` and `version` may contain '-' themselves, e.g. 'A--D2'.
+        """
+        return serial[:2], serial[3:]
+
+
+class ProductionDailyRollupManager(models.Manager):
+    def add(self, model: str, version: str, day: date, count: int = 1) -> None:
+        """Increase production total of `model`-`version` robots assembled on `day` by `count`"""
+        with transaction.atomic():
+            if self.filter(model=model, version=version, day=day).update(count=F("count") + count):
+                return
+            try:
+                with transaction.atomic():
+                    self.create(model=model, version=version, day=day, count=count)
+            except IntegrityError:
+                # Another process has just created the row. Increase it instead.
+                self.filter(model=model, version=version, day=day).update(count=F("count") + count)
+
+    def add_totals(self, totals: Counter[tuple[str, str, date]]) -> None:
+        """Batched `add`. `totals` is the number of robots per (model, version, day)."""
+        if not totals:
+            return
+        # Optimization. Rows are inserted or increased by a single upsert with `executemany()`. Reading them and
+        # `bulk_update()` building a CASE per row took longer than the robots' INSERTs during imports.
+        quote = connection.ops.quote_name
+        columns = [quote(self.model._meta.get_field(field).column) for field in ("model", "version", "day", "count")]
+        count = columns[-1]
+        sql = (
+            f"INSERT INTO {quote(self.model._meta.db_table)} ({', '.join(columns)}) VALUES (%s, %s, %s, %s) "
+            f"ON CONFLICT ({', '.join(columns[:-1])}) DO UPDATE SET {count} = {count} + excluded.{count}"
+        )
+        adapt = connection.ops.adapt_datefield_value
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [(model, version, adapt(day), n) for (model, version, day), n in totals.items()])
+
+    def add_robots(self, robots: Iterable[Robot]) -> None:
+        """Count `robots` in production totals. Touch every (model, version, day) row only once."""
+        self.add_totals(Counter((robot.model, robot.version, timezone.localdate(robot.created)) for robot in robots))
+
+    def last_week_production_summary(self, today: date | None = None) -> dict:
+        """Extract production totals of every model for the 7 days up to `today` (including it, defaults to the
+        current day). See `_group_by_model`.
+        """
+        today = today or timezone.localdate()
+        week_ago = today - timezone.timedelta(days=6)
+
+        rows = (
+            self.filter(day__range=(week_ago, today))
+            .values("model", "version")
+            .annotate(count=Sum("count"))
+            .order_by("model", "version")
+        )
+
+        return _group_by_model(rows.iterator())
+
+    def production_report(self, start: date, end: date, granularity: str, model: str | None = None):
+        """Return production totals within `start`-`end` days (inclusive) aggregated by DB per `granularity` period.
+        `granularity` is one of `GRANULARITIES`.
+        Rows are like {"period": date, "model": "R2", "version": "D2", "count": 42}, ordered by model and period.
+        """
+        queryset = self.db_manager(hints=REPORT_HINTS).filter(day__range=(start, end))
+        if model is not None:
+            queryset = queryset.filter(model=model)
+
+        return (
+            queryset.annotate(period=GRANULARITIES[granularity]("day"))
+            .values("period", "model", "version")
+            .annotate(count=Sum("count"))
+            .order_by("model", "period", "version")
+        )
+
+
+class ProductionDailyRollup(models.Model):
+    """Robot production totals per model, version and day. Kept in sync with `Robot` by signals."""
+
+    model = models.CharField(max_length=2, blank=False, null=False)
+    version = models.CharField(max_length=2, blank=False, null=False)
+    day = models.DateField(blank=False, null=False)
+    count = models.PositiveIntegerField(default=0, blank=False, null=False)
+    objects = ProductionDailyRollupManager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=("day", "model", "version"), name="unique_rollup_day_model_version"),
+        )
+
+
+class ProductionEventManager(models.Manager):
+    def append(self, counts: Counter[tuple[str, str]]) -> None:
+        """Append an event per (model, version) of `counts` with the number of robots produced"""
+        self.bulk_create(
+            self.model(model=model, version=version, count=count) for (model, version), count in counts.items()
+        )
+
+
+class ProductionEvent(models.Model):
+    """Append-only stream of produced robots, written in the same transaction as the robots themselves.
+    Events are never updated or deleted, so totals can be rebuilt from any `ProductionSnapshot` plus the events after it.
+    """
+
+    model = models.CharField(max_length=2, blank=False, null=False)
+    version = models.CharField(max_length=2, blank=False, null=False)
+    count = models.PositiveIntegerField(default=1, blank=False, null=False)
+    objects = ProductionEventManager()
+
+
+class ProductionSnapshot(models.Model):
+    """Production totals per serial, e.g. {"R2-D2": 42}, after applying every `ProductionEvent` up to `last_event_id`"""
+
+    last_event_id = models.PositiveBigIntegerField(db_index=True, blank=False, null=False)
+    totals = models.JSONField(default=dict, blank=False, null=False)
+    created = models.DateTimeField(auto_now_add=True, blank=False, null=False)
+
+
+class ArchivedRobot(models.Model):
+    """Robot assembled before `archive_horizon()`, moved out of `Robot` by `archive_robots` command.
+    Robots are archived oldest first, so the archive grows month by month. It's only looked up by `created`.
+    """
+
+    serial = models.CharField(max_length=5, blank=False, null=False)
+    model = models.CharField(max_length=2, blank=False, null=False)
+    version = models.CharField(max_length=2, blank=False, null=False)
+    created = models.DateTimeField(blank=False, null=False)
+
+    class Meta:
+        # Robot assembled at some second is also unique across `Robot` and `ArchivedRobot`. That's checked by
+        # `robots.utils.factory` in the transactions creating robots, which hold SQLite write lock meanwhile.
+        constraints = (models.UniqueConstraint(fields=("created",), name="unique_archived_robot_created"),)
+
+
+class ReportJob(models.Model):
+    """Report built in background by `run_report_jobs` command into a file in `REPORTS_DIR`.
+    Requests for the same report of the same production state share one job, see `robots.utils.jobs`.
+    """
+
+    class Kind(models.TextChoices):
+        LAST_WEEK = "last-week"
+        PRODUCTION = "production"
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    key = models.CharField(max_length=255, unique=True, blank=False, null=False)
+    kind = models.CharField(max_length=16, choices=Kind.choices, blank=False, null=False)
+    params = models.JSONField(default=dict, blank=False, null=False)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED, db_index=True)
+    error = models.TextField(blank=True, null=False)
+    filename = models.CharField(max_length=255, blank=True, null=False)
+    created = models.DateTimeField(auto_now_add=True, blank=False, null=False)
+    finished = models.DateTimeField(blank=True, null=True)
@@ -1,3 +1,1139 @@
-from django.test import TestCase
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import subprocess
+from datetime import date, datetime, timezone
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.utils import timezone as tz
+from django.db import connection, IntegrityError, OperationalError
+from django.db.migrations.executor import MigrationExecutor
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from django.test import TestCase, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from openpyxl import load_workbook
+
+from home.utils import metrics
+from robots.models import (
+    Robot,
+    ArchivedRobot,
+    ProductionDailyRollup,
+    ProductionEvent,
+    ProductionSnapshot,
+    ReportJob,
+)
+from robots.utils import archive, cache, jobs, factory
+from robots.utils.group_commit import GroupCommitWriter, WriteBufferFull
+from robots.utils.counters import ProductionCounters, production_counters
+from robots.utils.export import export_robots
+from robots.utils.factory import TIMESTAMP_FORMAT, _validate_robot_params
+from orders.models import Order, Notification, Stock
+from customers.models import Customer
+
+
+class NewRobotViewTest(TestCase):
+    def test_robot_assembled_at_the_same_second_is_rejected(self):
+        data = {"model": "R2", "version": "D2", "created": "2023-01-01 00:00:00"}
+
+        first = self.client.post(reverse("new_robot_view"), data=data, content_type="application/json")
+        second = self.client.post(reverse("new_robot_view"), data=data, content_type="application/json")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(second.json()["message"], "A robot assembled at this second already exists")
+        self.assertEqual(Robot.objects.count(), 1)
+        self.assertEqual(ProductionDailyRollup.objects.get().count, 1)
+
+    def test_other_integrity_errors_are_not_reported_as_duplicates(self):
+        data = {"model": "R2", "version": "D2", "created": "2023-01-01 00:00:00"}
+        error = IntegrityError("NOT NULL constraint failed: robots_productionevent.model")
+
+        with mock.patch("robots.models.ProductionEventManager.create", side_effect=error):
+            with self.assertRaises(IntegrityError):
+                self.client.post(reverse("new_robot_view"), data=data, content_type="application/json")
+
+        self.assertFalse(Robot.objects.exists())
+
+
+class DeleteDuplicateRobotsMigrationTest(TransactionTestCase):
+    before = [("robots", "0002_productiondailyrollup")]
+    after = [("robots", "0003_robot_indexes")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_are_deleted(self):
+        apps = self.migrate(self.before)
+        Robot = apps.get_model("robots", "Robot")
+        ProductionDailyRollup = apps.get_model("robots", "ProductionDailyRollup")
+        first, second = (datetime(2023, 1, 1, second=idx, tzinfo=timezone.utc) for idx in range(2))
+        kept = [
+            Robot.objects.create(serial="R2-D2", model="R2", version="D2", created=first),
+            Robot.objects.create(serial="13-XS", model="13", version="XS", created=second),
+        ]
+        Robot.objects.create(serial="R2-D2", model="R2", version="D2", created=first)
+        Robot.objects.create(serial="R2-D2", model="R2", version="D2", created=second)
+        ProductionDailyRollup.objects.create(model="R2", version="D2", day=date(2023, 1, 1), count=3)
+        ProductionDailyRollup.objects.create(model="13", version="XS", day=date(2023, 1, 1), count=1)
+
+        apps = self.migrate(self.after)
+        Robot = apps.get_model("robots", "Robot")
+        ProductionDailyRollup = apps.get_model("robots", "ProductionDailyRollup")
+
+        self.assertEqual(sorted(Robot.objects.values_list("id", flat=True)), [robot.id for robot in kept])
+        self.assertEqual(sorted(ProductionDailyRollup.objects.values_list("model", "count")), [("13", 1), ("R2", 1)])
+
+
+class NewRobotsBatchViewTest(TestCase):
+    def post(self, body: str, content_type: str = "application/json"):
+        return self.client.post(reverse("new_robots_batch_view"), data=body, content_type=content_type)
+
+    def test_json_array_reports_every_record(self):
+        Robot.objects.create(
+            serial="R2-D2", model="R2", version="D2", created=datetime(2023, 1, 1, tzinfo=timezone.utc)
+        )
+        records = [
+            {"model": "r2", "version": "d2", "created": "2023-01-01 00:00:01"},
+            {"model": "R2", "version": "D2", "created": "2023-01-01 00:00:00"},
+            {"model": "R2", "version": "D2", "created": "2023-01-01 00:00:01"},
+            {"model": "R2", "version": "D2"},
+        ]
+
+        response = self.post(json.dumps(records))
+
+        self.assertEqual(response.status_code, 200)
+        statuses = [item["status"] for item in response.json()["data"]]
+        self.assertEqual(statuses, ["success", "error", "error", "error"])
+        self.assertEqual(response.json()["data"][0]["data"][0]["fields"]["serial"], "R2-D2")
+        self.assertEqual(Robot.objects.count(), 2)
+
+    def test_ndjson(self):
+        body = (
+            '{"model": "R2", "version": "D2", "created": "2023-01-01 00:00:01"}\n'
+            "not json\n"
+            '{"model": "13", "version": "XS", "created": "2023-01-01 00:00:02"}\n'
+        )
+
+        response = self.post(body, content_type="application/x-ndjson")
+
+        statuses = [item["status"] for item in response.json()["data"]]
+        self.assertEqual(statuses, ["success", "error", "success"])
+        self.assertEqual(Robot.objects.count(), 2)
+
+    def test_empty_body(self):
+        self.assertEqual(self.post("").status_code, 400)
+
+    def test_concurrent_duplicate_is_reported_per_record(self):
+        records = [
+            {"model": "R2", "version": "D2", "created": "2023-01-01 00:00:01"},
+            {"model": "13", "version": "XS", "created": "2023-01-01 00:00:02"},
+        ]
+        create_robots, calls = factory._create_robots, []
+
+        def create_robots_after_concurrent_one(results):
+            calls.append(results)
+            if len(calls) == 1:
+                # Created by another request after the check for robots assembled at the same second
+                Robot.objects.create(serial="R2-D2", model="R2", version="D2", created=results[0]["created"])
+                raise IntegrityError("UNIQUE constraint failed: robots_robot.created")
+            return create_robots(results)
+
+        with mock.patch.object(factory, "_create_robots", create_robots_after_concurrent_one):
+            response = self.post(json.dumps(records))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["status"] for item in response.json()["data"]], ["error", "success"])
+        self.assertEqual(Robot.objects.count(), 2)
+
+        conflict = IntegrityError("UNIQUE constraint failed: robots_robot.created")
+        with mock.patch.object(factory, "_create_robots", side_effect=conflict) as create_robots:
+            self.assertEqual(self.post(json.dumps(records)).status_code, 400)
+        self.assertEqual(create_robots.call_count, factory.MAX_ATTEMPTS)
+
+    def test_notifies_waiting_customers(self):
+        customer = Customer.objects.create(email="address@example.org")
+        Order.objects.create(customer=customer, robot_serial="R2-D2")
+        Order.objects.create(customer=customer, robot_serial="X5-LT")
+
+        self.post(json.dumps([{"model": "R2", "version": "D2", "created": "2023-01-01 00:00:01"}]))
+
+        self.assertEqual(list(Notification.objects.values_list("email", flat=True)), ["address@example.org"])
+        self.assertEqual(list(Order.objects.values_list("robot_serial", flat=True)), ["X5-LT"])
+
+
+class ProductionDailyRollupTest(TestCase):
+    def test_single_and_batch_paths_are_counted(self):
+        now = tz.localtime().replace(microsecond=0, tzinfo=None)
+        records = [
+            {"model": "R2", "version": "D2", "created": f"{now - tz.timedelta(seconds=1)}"},
+            {"model": "R2", "version": "D2", "created": f"{now - tz.timedelta(seconds=2)}"},
+            {"model": "13", "version": "XS", "created": f"{now - tz.timedelta(seconds=3)}"},
+        ]
+        self.client.post(reverse("new_robot_view"), data=records[0], content_type="application/json")
+        self.client.post(reverse("new_robots_batch_view"), data=records[1:], content_type="application/json")
+
+        expected = {"13": ({"version": "XS", "count": 1},), "R2": ({"version": "D2", "count": 2},)}
+        self.assertEqual(ProductionDailyRollup.objects.last_week_production_summary(), expected)
+
+        ProductionDailyRollup.objects.all().delete()
+        call_command("rebuild_production_rollup", stdout=StringIO())
+        self.assertEqual(ProductionDailyRollup.objects.last_week_production_summary(), expected)
+
+
+class LastWeekStatsQueriesTest(TestCase):
+    def setUp(self):
+        self.now = tz.now().replace(microsecond=0)
+
+    def seed(self, models_count: int) -> None:
+        # Keep `created` unique across several seeds
+        now = self.now - tz.timedelta(seconds=Robot.objects.count())
+        Robot.objects.bulk_create(
+            Robot(serial=f"{idx:02}-V1", model=f"{idx:02}", version="V1", created=now - tz.timedelta(seconds=idx))
+            for idx in range(models_count)
+        )
+        call_command("rebuild_production_rollup", stdout=StringIO())
+
+    def count_report_queries(self) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse("last_week_stats_view")).status_code, 200)
+        return len(queries)
+
+    def test_report_queries_dont_depend_on_models_count(self):
+        self.seed(models_count=3)
+        few_models_queries = self.count_report_queries()
+
+        self.seed(models_count=60)
+        self.assertEqual(self.count_report_queries(), few_models_queries)
+
+
+class LastWeekStatsViewTest(TestCase):
+    def setUp(self):
+        caches["reports"].clear()
+
+    def test_report_layout(self):
+        now = tz.now().replace(microsecond=0)
+        Robot.objects.create(serial="R2-D2", model="R2", version="D2", created=now)
+        Robot.objects.create(serial="R2-A1", model="R2", version="A1", created=now - tz.timedelta(seconds=1))
+
+        response = self.client.get(reverse("last_week_stats_view"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("filename=", response["Content-Disposition"])
+        wb = load_workbook(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(wb.sheetnames, ["R2"])
+        ws = wb["R2"]
+        self.assertEqual(
+            [row for row in ws.iter_rows(values_only=True)],
+            [("Модель", "Версия", "Количество за неделю"), ("R2", "A1", 1), ("R2", "D2", 1)],
+        )
+        self.assertTrue(ws["A1"].font.bold)
+        self.assertEqual(ws["C1"].alignment.horizontal, "center")
+        self.assertEqual((ws.column_dimensions["A"].width, ws.column_dimensions["C"].width), (10, 25))
+
+    def test_empty_report(self):
+        response = self.client.get(reverse("last_week_stats_view"))
+
+        wb = load_workbook(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(wb.sheetnames, ["Sheet"])
+
+
+class LastWeekStatsCacheTest(TestCase):
+    def setUp(self):
+        caches["reports"].clear()
+        metrics.report_cache_requests.clear()
+
+    def cache_requests(self) -> tuple[int, int]:
+        values = metrics.report_cache_requests.values
+        return values.get(("hit",), 0), values.get(("miss",), 0)
+
+    def add_robot(self, seconds_ago: int) -> None:
+        created = tz.localtime().replace(microsecond=0, tzinfo=None) - tz.timedelta(seconds=seconds_ago)
+        data = {"model": "R2", "version": "D2", "created": f"{created}"}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("new_robot_view"), data=data, content_type="application/json")
+
+    def test_report_is_cached_until_new_robot_is_added(self):
+        self.add_robot(seconds_ago=1)
+        first = self.client.get(reverse("last_week_stats_view"))
+        second = self.client.get(reverse("last_week_stats_view"))
+
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertIn("Last-Modified", first)
+        self.assertEqual(self.cache_requests(), (1, 1))
+
+        # Far enough from the first one, even if the clock ticks in between
+        self.add_robot(seconds_ago=10)
+        third = self.client.get(reverse("last_week_stats_view"))
+
+        self.assertNotEqual(first["ETag"], third["ETag"])
+        self.assertEqual(self.cache_requests(), (1, 2))
+        wb = load_workbook(BytesIO(b"".join(third.streaming_content)))
+        self.assertEqual(wb["R2"]["C2"].value, 2)
+
+    def test_generation_is_shared_between_processes(self):
+        generation = cache.production_generation()
+
+        # E.g. `import_robots` command
+        code = "import django; django.setup(); from robots.utils import cache; cache.bump_production_generation()"
+        subprocess.run(
+            # "test" argument makes settings the same as the ones of `manage.py test`
+            (sys.executable, "-c", code, "test"),
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "R4C.settings"},
+            check=True,
+        )
+
+        self.assertNotEqual(cache.production_generation(), generation)
+        self.assertIsNotNone(cache.production_modified())
+
+    def test_cache_requests_are_exposed_as_metrics(self):
+        self.client.get(reverse("last_week_stats_view"))
+
+        self.assertIn(
+            'r4c_report_cache_requests_total{result="miss"} 1',
+            self.client.get(reverse("metrics_view")).content.decode(),
+        )
+
+    def test_conditional_get(self):
+        self.add_robot(seconds_ago=1)
+        etag = self.client.get(reverse("last_week_stats_view"))["ETag"]
+
+        response = self.client.get(reverse("last_week_stats_view"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.cache_requests(), (0, 1))
+
+    def test_report_is_modified_when_its_window_moves(self):
+        self.add_robot(seconds_ago=1)
+        # Robots were added for the last time yesterday, the window has moved at midnight since
+        yesterday = tz.now() - tz.timedelta(days=1)
+        caches["reports"].set(cache.MODIFIED_KEY, yesterday, timeout=None)
+
+        response = self.client.get(
+            reverse("last_week_stats_view"), HTTP_IF_MODIFIED_SINCE=http_date(yesterday.timestamp())
+        )
+
+        self.assertEqual(response.status_code, 200)
+        midnight = tz.make_aware(datetime.combine(tz.localdate(), datetime.min.time()))
+        self.assertEqual(response["Last-Modified"], http_date(midnight.timestamp()))
+
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        caches["reports"].clear()
+
+    async def test_new_robot(self):
+        data = {"model": "R2", "version": "D2", "created": "2023-01-01 00:00:00"}
+
+        first = await self.async_client.post(
+            reverse("new_robot_async_view"), data=data, content_type="application/json"
+        )
+        second = await self.async_client.post(
+            reverse("new_robot_async_view"), data=data, content_type="application/json"
+        )
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()["data"][0]["fields"]["serial"], "R2-D2")
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(await Robot.objects.acount(), 1)
+
+    async def test_last_week_stats(self):
+        response = await self.async_client.get(reverse("last_week_stats_async_view"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("filename=", response["Content-Disposition"])
+
+        response = await self.async_client.get(
+            reverse("last_week_stats_async_view"), headers={"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_method_not_allowed(self):
+        response = await self.async_client.post(reverse("last_week_stats_async_view"))
+
+        self.assertEqual(response.status_code, 405)
+
+
+class ValidateRobotParamsTest(SimpleTestCase):
+    def test_timestamp_is_parsed_like_strptime(self):
+        for created in ("2023-01-01 00:00:00", "2023-1-1 0:0:0", "2024-02-29 23:59:59"):
+            params = _validate_robot_params({"model": "r2", "version": "d2", "created": created})
+            expected = datetime.strptime(created, TIMESTAMP_FORMAT).replace(tzinfo=tz.get_default_timezone())
+            self.assertEqual(params, {"model": "R2", "version": "D2", "created": expected})
+
+    def test_invalid_timestamps(self):
+        for created in (
+            "2023-01-01T00:00:00",
+            "2023-02-30 00:00:00",
+            "2023-01-01 24:00:00",
+            "2023-01-01",
+            "２０２３-01-01 00:00:00",
+        ):
+            with self.assertRaisesMessage(ValueError, "'created' must match the following pattern"):
+                _validate_robot_params({"model": "R2", "version": "D2", "created": created})
+
+    def test_invalid_params(self):
+        cases = (
+            ({"model": "R2", "version": "D2"}, ValueError, "exactly 3 params"),
+            ({"model": "R2", "version": "D2", "date": ""}, TypeError, "'created' is missing"),
+            ({"model": "R2", "version": 2, "created": ""}, TypeError, "'version' must be a string"),
+            ({"model": "R ", "version": "D2", "created": ""}, ValueError, "'model' must contain exactly 2"),
+        )
+        for params, exception, message in cases:
+            with self.assertRaisesMessage(exception, message):
+                _validate_robot_params(params)
+
+
+class ProductionReportViewTest(TestCase):
+    def setUp(self):
+        rows = (
+            ("R2", "D2", date(2023, 1, 2), 3),
+            ("R2", "D2", date(2023, 1, 8), 4),
+            ("R2", "D2", date(2023, 1, 9), 5),
+            ("R2", "A1", date(2023, 2, 1), 1),
+            ("13", "XS", date(2023, 1, 3), 2),
+        )
+        ProductionDailyRollup.objects.bulk_create(
+            ProductionDailyRollup(model=model, version=version, day=day, count=count)
+            for model, version, day, count in rows
+        )
+
+    def get(self, **params):
+        return self.client.get(reverse("production_report_view"), data=params)
+
+    def test_weekly_report(self):
+        response = self.get(start="2023-01-01", end="2023-01-31", granularity="week", model="r2")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["data"],
+            [
+                {"period": "2023-01-02", "model": "R2", "version": "D2", "count": 7},
+                {"period": "2023-01-09", "model": "R2", "version": "D2", "count": 5},
+            ],
+        )
+
+    def test_monthly_report_is_paginated(self):
+        first = self.get(start="2023-01-01", end="2023-02-28", granularity="month", page_size=2)
+        second = self.get(start="2023-01-01", end="2023-02-28", granularity="month", page_size=2, page=2)
+
+        self.assertEqual((first.json()["pages"], second.json()["page"]), (2, 2))
+        self.assertEqual(
+            first.json()["data"] + second.json()["data"],
+            [
+                {"period": "2023-01-01", "model": "13", "version": "XS", "count": 2},
+                {"period": "2023-01-01", "model": "R2", "version": "D2", "count": 12},
+                {"period": "2023-02-01", "model": "R2", "version": "A1", "count": 1},
+            ],
+        )
+
+    def test_xlsx_report(self):
+        response = self.get(start="2023-01-01", end="2023-01-31", granularity="month", format="xlsx")
+
+        wb = load_workbook(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(wb.sheetnames, ["13", "R2"])
+        rows = list(wb["R2"].iter_rows(values_only=True))
+        self.assertEqual(rows, [("Период", "Версия", "Количество"), (datetime(2023, 1, 1), "D2", 12)])
+
+    def test_invalid_params(self):
+        for params in (
+            {"start": "2023-13-01"},
+            {"start": "2023-02-01", "end": "2023-01-01"},
+            {"granularity": "year"},
+            {"format": "csv"},
+            {"page": "0"},
+            {"page_size": "100000"},
+            {"page": "100"},
+        ):
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json()["status"], "error")
+
+
+class ExportRobotsTest(TestCase):
+    def setUp(self):
+        Robot.objects.bulk_create(
+            Robot(serial=f"{model}-{version}", model=model, version=version, created=created)
+            for model, version, created in (
+                ("R2", "D2", tz.make_aware(datetime(2023, 1, 1, 12))),
+                ("R2", "A1", tz.make_aware(datetime(2023, 1, 2, 23, 59, 59))),
+                ("13", "XS", tz.make_aware(datetime(2023, 1, 3))),
+            )
+        )
+
+    def get(self, **params):
+        return self.client.get(reverse("export_robots_view"), data=params)
+
+    def test_csv_export(self):
+        response = self.get(model="r2")
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            b"".join(response.streaming_content).decode().splitlines(),
+            [
+                "serial,model,version,created",
+                "R2-D2,R2,D2,2023-01-01 12:00:00",
+                "R2-A1,R2,A1,2023-01-02 23:59:59",
+            ],
+        )
+
+    def test_ndjson_export_by_days_range(self):
+        response = self.get(format="ndjson", start="2023-01-02", end="2023-01-02")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(
+            [json.loads(line) for line in b"".join(response.streaming_content).splitlines()],
+            [{"serial": "R2-A1", "model": "R2", "version": "A1", "created": "2023-01-02 23:59:59"}],
+        )
+
+    def test_invalid_params(self):
+        for params in ({"format": "xlsx"}, {"start": "2023-01-32"}, {"start": "2023-01-03", "end": "2023-01-01"}):
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json()["status"], "error")
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command("export_robots", "--format", "ndjson", "--robot-version", "xs", stdout=stdout)
+
+        self.assertEqual(
+            json.loads(stdout.getvalue()),
+            {"serial": "13-XS", "model": "13", "version": "XS", "created": "2023-01-03 00:00:00"},
+        )
+
+
+class ImportRobotsCommandTest(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+        Robot.objects.create(serial="R2-D2", model="R2", version="D2", created=tz.make_aware(datetime(2023, 1, 1)))
+
+    def import_robots(self, content: str, *args) -> tuple[str, list[dict]]:
+        path, rejected = self.tmp_dir / "robots", self.tmp_dir / "rejected.ndjson"
+        path.write_text(content, encoding="utf-8")
+        stdout = StringIO()
+        call_command("import_robots", path, "--rejected", rejected, *args, stdout=stdout)
+
+        return stdout.getvalue(), [json.loads(line) for line in rejected.read_text(encoding="utf-8").splitlines()]
+
+    def test_csv_import(self):
+        stdout, rejected = self.import_robots(
+            "serial,model,version,created\n"
+            "R2-D2,r2,d2,2023-01-02 10:00:00\n"
+            "R2-D2,R2,D2,2023-01-01 00:00:00\n"
+            "13-XS,13,XS,2023-01-02 11:00:00\n"
+            "XX-XX,13,XS,2023-01-02 12:00:00\n"
+            "13-XS,13,XS,2023-01-02 11:00:00\n"
+            "13-XS,13,XS\n",
+            "--chunk-size",
+            "2",
+        )
+
+        self.assertIn("Imported 2 robots, 4 rejected", stdout)
+        self.assertEqual(
+            [(item["line"], item["error"]) for item in rejected],
+            [
+                (3, "A robot assembled at this second already exists"),
+                (5, "'serial' must match 'model' and 'version'"),
+                (6, "A robot assembled at this second already exists"),
+                (7, "Invalid CSV"),
+            ],
+        )
+        self.assertEqual(rejected[0]["record"]["created"], "2023-01-01 00:00:00")
+        self.assertEqual(
+            set(ProductionDailyRollup.objects.filter(day=date(2023, 1, 2)).values_list("model", "version", "count")),
+            {("R2", "D2", 1), ("13", "XS", 1)},
+        )
+
+    def test_ndjson_import_from_stdin(self):
+        lines = '{"model": "R2", "version": "D2", "created": "2023-01-03 00:00:00"}\n\n[]\n{"model": "R2"}\n'
+        stdout, stderr = StringIO(), StringIO()
+        with mock.patch("sys.stdin", StringIO(lines)):
+            call_command("import_robots", "-", "--format", "ndjson", stdout=stdout, stderr=stderr)
+
+        self.assertIn("Imported 1 robots, 2 rejected", stdout.getvalue())
+        self.assertEqual(
+            [json.loads(line)["line"] for line in stderr.getvalue().splitlines()],
+            [3, 4],
+        )
+        self.assertEqual(Robot.objects.count(), 2)
+
+    def test_orders_are_allocated_once_per_serial_and_chunk(self):
+        customers = Customer.objects.bulk_create(Customer(email=f"user{idx}@example.org") for idx in range(3))
+        Order.objects.bulk_create(Order(customer=customer, robot_serial="13-XS") for customer in customers)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.import_robots(
+                "model,version,created\n13,XS,2023-01-02 10:00:00\n13,XS,2023-01-02 11:00:00\n",
+                "--chunk-size",
+                "2",
+            )
+
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(sum('"orders_notification"' in query["sql"] for query in queries.captured_queries), 1)
+
+    def test_stock_is_updated_along_with_every_chunk(self):
+        content = "model,version,created\n13,XS,2023-01-02 10:00:00\n13,XS,2023-01-02 11:00:00\n"
+        add_totals = ProductionDailyRollup.objects.add_totals
+
+        def add_totals_or_fail(totals) -> None:
+            # The process dies while importing the second chunk
+            if stock := Stock.objects.filter(robot_serial="13-XS").values_list("count", flat=True):
+                raise SystemExit(f"Killed with {stock[0]} robots in stock")
+            add_totals(totals)
+
+        with mock.patch.object(ProductionDailyRollup.objects, "add_totals", add_totals_or_fail):
+            with self.assertRaisesMessage(SystemExit, "Killed with 1 robots in stock"):
+                self.import_robots(content, "--chunk-size", "1")
+
+        self.assertEqual(Robot.objects.filter(serial="13-XS").count(), 1)
+
+    @override_settings(TIME_ZONE="Europe/Moscow")
+    def test_import_in_other_time_zone(self):
+        # R2-D2 of `setUp()` is assembled at 2023-01-01 00:00:00 UTC
+        stdout, rejected = self.import_robots(
+            "model,version,created\nR2,D2,2023-01-01 03:00:00\nR2,D2,2023-1-1 4:0:0\n"
+        )
+
+        self.assertIn("Imported 1 robots, 1 rejected", stdout)
+        self.assertEqual(rejected[0]["line"], 2)
+        self.assertEqual(Robot.objects.latest("created").created, datetime(2023, 1, 1, 1, 0, 0, tzinfo=timezone.utc))
+
+    def test_archived_robots_are_rejected(self):
+        ArchivedRobot.objects.create(
+            serial="R2-D2", model="R2", version="D2", created=tz.make_aware(datetime(2022, 1, 1))
+        )
+
+        stdout, rejected = self.import_robots("model,version,created\nR2,D2,2022-01-01 00:00:00\n")
+
+        self.assertIn("Imported 0 robots, 1 rejected", stdout)
+        self.assertEqual(rejected[0]["error"], "A robot assembled at this second already exists")
+
+
+class ArchiveRobotsTest(TestCase):
+    def setUp(self):
+        production_counters.reset()
+        self.now = tz.localtime().replace(microsecond=0)
+        timestamps = (
+            "2023-01-31 23:59:59",
+            "2023-02-01 00:00:00",
+            "2023-02-01 00:00:01",
+            f"{self.now - tz.timedelta(days=1):%Y-%m-%d %H:%M:%S}",
+        )
+        for created, (model, version) in zip(timestamps, (("R2", "D2"), ("R2", "D2"), ("13", "XS"), ("R2", "D2"))):
+            self.client.post(
+                reverse("new_robot_view"),
+                data={"model": model, "version": version, "created": created},
+                content_type="application/json",
+            )
+
+    def archive_robots(self) -> str:
+        stdout = StringIO()
+        call_command("archive_robots", "--batch-size", "2", stdout=stdout)
+
+        return stdout.getvalue()
+
+    def test_old_robots_are_moved_by_month(self):
+        stdout = self.archive_robots()
+
+        self.assertIn("2023-01: 1\n2023-02: 2\n", stdout)
+        self.assertIn("Archived 3 robots", stdout)
+        self.assertEqual(Robot.objects.count(), 1)
+        self.assertEqual(
+            [
+                (robot.serial, f"{robot.created:%Y-%m-%d %H:%M:%S}")
+                for robot in ArchivedRobot.objects.order_by("created")
+            ],
+            [("R2-D2", "2023-01-31 23:59:59"), ("R2-D2", "2023-02-01 00:00:00"), ("13-XS", "2023-02-01 00:00:01")],
+        )
+        self.assertIn("Archived 0 robots", self.archive_robots())
+
+    def test_export_includes_archived_robots(self):
+        def export(**params) -> list[str]:
+            return "".join(export_robots("csv", **params)).splitlines()[1:]
+
+        everything = export()
+        last_week = export(start=self.now.date() - tz.timedelta(weeks=1))
+        self.archive_robots()
+
+        self.assertEqual(len(everything), 4)
+        self.assertEqual(export(), everything)
+        self.assertEqual(export(model="13"), ["13-XS,13,XS,2023-02-01 00:00:01"])
+        # Windows newer than the archive horizon don't touch the archive
+        with self.assertNumQueries(1):
+            self.assertEqual(export(start=self.now.date() - tz.timedelta(weeks=1)), last_week)
+        with override_settings(ROBOTS_ARCHIVE_AFTER_DAYS=None):
+            self.assertEqual(export(), everything[-1:])
+
+    def test_conflicting_batches_are_retried(self):
+        archive_batch, calls = archive._archive_batch, []
+
+        def archive_batch_conflicting_twice(*args):
+            calls.append(args)
+            if len(calls) <= 2:
+                raise IntegrityError("Robots have been changed while archiving")
+            return archive_batch(*args)
+
+        with mock.patch.object(archive, "_archive_batch", archive_batch_conflicting_twice):
+            self.assertIn("Archived 3 robots", self.archive_robots())
+        self.assertEqual(ArchivedRobot.objects.count(), 3)
+
+        error = IntegrityError("Robots have been changed while archiving")
+        with mock.patch.object(archive, "_archive_batch", side_effect=error) as archive_batch:
+            with self.assertRaises(IntegrityError):
+                self.archive_robots()
+        self.assertEqual(archive_batch.call_count, archive.MAX_ATTEMPTS)
+
+    def test_archived_robots_are_not_duplicated(self):
+        self.archive_robots()
+        response = self.client.post(
+            reverse("new_robot_view"),
+            data={"model": "R2", "version": "D2", "created": "2023-02-01 00:00:00"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            reverse("new_robots_batch_view"),
+            data="\n".join(
+                json.dumps({"model": "R2", "version": "D2", "created": created})
+                for created in ("2023-01-31 23:59:59", "2023-01-15 00:00:00")
+            ),
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(
+            [item["status"] for item in response.json()["data"]],
+            ["error", "success"],
+        )
+        call_command("reconcile_production", stdout=StringIO())
+
+    @override_settings(ROBOTS_ARCHIVE_AFTER_DAYS=None)
+    def test_archival_can_be_disabled(self):
+        with self.assertRaises(CommandError):
+            self.archive_robots()
+
+
+class ProductionTotalsTest(TestCase):
+    def setUp(self):
+        production_counters.reset()
+
+    def post_robots(self, *created: str) -> None:
+        body = "\n".join(json.dumps({"model": "R2", "version": "D2", "created": c}) for c in created)
+        self.client.post(reverse("new_robots_batch_view"), data=body, content_type="application/x-ndjson")
+
+    def test_totals_follow_new_robots(self):
+        self.client.post(
+            reverse("new_robot_view"),
+            data={"model": "13", "version": "XS", "created": "2023-01-01 00:00:00"},
+            content_type="application/json",
+        )
+        self.post_robots("2023-01-01 00:00:01", "2023-01-01 00:00:02")
+
+        response = self.client.get(reverse("production_totals_view"))
+
+        self.assertEqual(
+            response.json()["data"],
+            [{"model": "13", "version": "XS", "count": 1}, {"model": "R2", "version": "D2", "count": 2}],
+        )
+        self.assertEqual(response.json()["total"], 3)
+
+        self.post_robots("2023-01-01 00:00:03")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("production_totals_view"))
+
+        self.assertEqual(response.json()["total"], 4)
+        # Only events after the previous call are read
+        self.assertEqual(len(queries), 1)
+
+    def test_model_with_dash(self):
+        self.client.post(
+            reverse("new_robot_view"),
+            data={"model": "A-", "version": "D2", "created": "2023-01-01 00:00:00"},
+            content_type="application/json",
+        )
+
+        response = self.client.get(reverse("production_totals_view"))
+
+        self.assertEqual(response.json()["data"], [{"model": "A-", "version": "D2", "count": 1}])
+
+    @override_settings(PRODUCTION_SNAPSHOT_EVERY=2)
+    def test_totals_are_rebuilt_from_snapshot_and_tail(self):
+        self.post_robots("2023-01-01 00:00:01", "2023-01-01 00:00:02")
+        self.post_robots("2023-01-01 00:00:03")
+        production_counters.totals()
+        self.post_robots("2023-01-01 00:00:04")
+
+        snapshot = ProductionSnapshot.objects.get()
+        self.assertEqual(snapshot.totals, {"R2-D2": 3})
+        # Events before the snapshot aren't read on startup anymore
+        ProductionEvent.objects.filter(id__lte=snapshot.last_event_id).update(count=0)
+        self.assertEqual(ProductionCounters().totals()[0], {"R2-D2": 4})
+
+    def test_reconciliation(self):
+        self.post_robots("2023-01-01 00:00:01", "2023-01-01 00:00:02")
+        stdout = StringIO()
+        call_command("reconcile_production", "--snapshot", stdout=stdout)
+
+        self.assertIn("Production totals of 2 robots match", stdout.getvalue())
+        self.assertEqual(ProductionSnapshot.objects.get().totals, {"R2-D2": 2})
+
+        Robot.objects.filter(created=tz.make_aware(datetime(2023, 1, 1, 0, 0, 1))).delete()
+        with self.assertRaises(CommandError):
+            call_command("reconcile_production", stdout=StringIO(), stderr=StringIO())
+
+
+class RobotAdminTest(TestCase):
+    robots_count = 1_000_000
+
+    @classmethod
+    def setUpTestData(cls):
+        # Robot per minute since 2022-01-01 (almost 2 years), 50 models of 3 versions
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Robot._meta.db_table} (serial, model, version, created)
+                WITH RECURSIVE seq(idx) AS (SELECT 0 UNION ALL SELECT idx + 1 FROM seq WHERE idx < %s)
+                SELECT printf('%%02d-V%%d', idx %% 50, idx %% 3), printf('%%02d', idx %% 50), printf('V%%d', idx %% 3),
+                       datetime(%s + idx * 60, 'unixepoch')
+                FROM seq
+                """,
+                (cls.robots_count - 1, int(datetime(2022, 1, 1, tzinfo=timezone.utc).timestamp())),
+            )
+        ProductionEvent.objects.bulk_create(
+            ProductionEvent(model=f"{idx:02}", version=f"V{version}", count=1)
+            for idx in range(50)
+            for version in range(3)
+        )
+        cls.admin = User.objects.create_superuser("admin", "admin@example.org", "password")
+
+    def setUp(self):
+        production_counters.reset()
+        self.client.force_login(self.admin)
+
+    def get_changelist(self, **params) -> list[str]:
+        """Return SQL of queries made by robots changelist with `params`"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:robots_robot_changelist"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["cl"].result_list), 100)
+
+        return [query["sql"] for query in queries]
+
+    def test_changelist_doesnt_scan_robots(self):
+        queries = self.get_changelist()
+
+        self.assertLessEqual(len(queries), 15)
+        for sql in queries:
+            self.assertNotIn("COUNT(*)", sql)
+            self.assertNotIn("DISTINCT", sql)
+
+    def test_date_hierarchy_and_filters(self):
+        queries = self.get_changelist(created__year=2022, model="07")
+
+        self.assertLessEqual(len(queries), 25)
+        for sql in queries:
+            self.assertNotIn("DISTINCT", sql)
+
+    def test_date_hierarchy_lists_every_period(self):
+        response = self.client.get(reverse("admin:robots_robot_changelist"), {"created__year": 2023})
+        self.assertEqual(len(response.context["cl"].result_list), 100)
+
+        self.assertContains(response, "created__month=1")
+        self.assertContains(response, "created__month=11")
+        self.assertNotContains(response, "created__month=12")
+
+        response = self.client.get(reverse("admin:robots_robot_changelist"))
+        self.assertContains(response, "created__year=2022")
+        self.assertContains(response, "created__year=2023")
+
+    def test_filters_of_serials_with_dashes(self):
+        ProductionEvent.objects.create(model="A-", version="-2")
+
+        response = self.client.get(reverse("admin:robots_robot_changelist"))
+
+        self.assertContains(response, "?model=A-")
+        self.assertContains(response, "?version=-2")
+
+    def test_robots_are_read_only(self):
+        robot = Robot.objects.order_by("id").first()
+        data = {"serial": "R2-D2", "model": "R2", "version": "D2", "created_0": "2023-01-01", "created_1": "00:00:00"}
+
+        self.assertNotContains(self.client.get(reverse("admin:robots_robot_changelist")), "delete_selected")
+        self.assertEqual(self.client.get(reverse("admin:robots_robot_add")).status_code, 403)
+        self.assertEqual(
+            self.client.post(reverse("admin:robots_robot_change", args=(robot.id,)), data).status_code, 403
+        )
+        self.assertEqual(self.client.post(reverse("admin:robots_robot_delete", args=(robot.id,))).status_code, 403)
+        self.assertTrue(Robot.objects.filter(id=robot.id, serial=robot.serial).exists())
+
+
+class ProductionTotalsConcurrencyTest(TransactionTestCase):
+    def test_totals_match_robots_under_concurrent_ingestion(self):
+        writers, robots_per_writer = 4, 25
+        production_counters.reset()
+        barrier = threading.Barrier(writers + 1, timeout=10)
+        done = threading.Event()
+        statuses = []
+
+        def write(writer: int) -> None:
+            barrier.wait()
+            try:
+                for idx in range(robots_per_writer):
+                    # Old enough to be looked up in the archive
+                    data = {"model": "R2", "version": f"D{writer}", "created": f"2023-01-01 00:{writer:02}:{idx:02}"}
+                    response = self.client_class().post(
+                        reverse("new_robot_view"), data=data, content_type="application/json"
+                    )
+                    statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        def read() -> None:
+            barrier.wait()
+            try:
+                while not done.is_set():
+                    production_counters.totals()
+            finally:
+                connection.close()
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        threads = [threading.Thread(target=write, args=(writer,)) for writer in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        reader.join()
+
+        self.assertEqual(set(statuses), {200})
+        totals, _ = production_counters.totals()
+        self.assertEqual(totals, {f"R2-D{writer}": robots_per_writer for writer in range(writers)})
+        self.assertEqual(Robot.objects.count(), writers * robots_per_writer)
+        call_command("reconcile_production", stdout=StringIO())
+
+
+class ReportJobTest(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.reports_dir = Path(tmp_dir.name)
+        settings = override_settings(REPORTS_DIR=self.reports_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.post_robot(f"{tz.localtime() - tz.timedelta(days=1):%Y-%m-%d %H:%M:%S}")
+
+    def post_robot(self, created: str) -> None:
+        self.client.post(
+            reverse("new_robot_view"),
+            data={"model": "R2", "version": "D2", "created": created},
+            content_type="application/json",
+        )
+
+    def enqueue(self, query: str = "") -> dict:
+        response = self.client.post(f"{reverse('new_report_job_view')}{query}")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers["Location"], response.json()["data"]["url"])
+
+        return response.json()["data"]
+
+    def run_jobs(self) -> str:
+        stdout = StringIO()
+        call_command("run_report_jobs", "--workers", "0", stdout=stdout)
+
+        return stdout.getvalue()
+
+    def test_report_is_built_in_background(self):
+        job = self.enqueue()
+        self.assertEqual((job["status"], job["download"]), ("queued", None))
+        self.assertEqual(self.client.get(reverse("report_job_download_view", args=(job["id"],))).status_code, 409)
+
+        self.assertIn(f"Job {job['id']} is done", self.run_jobs())
+
+        job = self.client.get(job["url"]).json()["data"]
+        self.assertEqual(job["status"], "done")
+        response = self.client.get(job["download"])
+        self.assertEqual(response.status_code, 200)
+        wb = load_workbook(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(
+            [tuple(row) for row in wb["R2"].values], [("Модель", "Версия", "Количество за неделю"), ("R2", "D2", 1)]
+        )
+
+    def test_requests_for_the_same_report_share_job(self):
+        job = self.enqueue()
+        self.assertEqual(self.enqueue()["id"], job["id"])
+        production_job = self.enqueue("?report=production&start=2023-01-01&granularity=month")
+        self.assertNotEqual(production_job["id"], job["id"])
+
+        self.run_jobs()
+        self.assertEqual(self.enqueue()["id"], job["id"])
+        # New robots make a new report
+        self.post_robot("2023-01-01 00:00:00")
+        self.assertNotEqual(self.enqueue()["id"], job["id"])
+
+        self.run_jobs()
+        response = self.client.get(reverse("report_job_download_view", args=(production_job["id"],)))
+        self.assertIn("production_20230101_", response.headers["Content-Disposition"])
+
+    def test_invalid_request(self):
+        for query in ("?report=weekly", "?report=production&start=2023-01-32"):
+            response = self.client.post(f"{reverse('new_report_job_view')}{query}")
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse("report_job_view", args=(42,))).status_code, 404)
+
+    def test_failed_job_keeps_error_and_is_retried(self):
+        job = self.enqueue()
+        with mock.patch("robots.utils.jobs.write_xlsx", side_effect=RuntimeError("Disk is full")):
+            self.assertIn("failed: Disk is full", self.run_jobs())
+
+        self.assertEqual(self.client.get(job["url"]).json()["data"]["error"], "Disk is full")
+        self.assertEqual(self.enqueue()["status"], "queued")
+        self.run_jobs()
+        self.assertEqual(self.client.get(job["url"]).json()["data"]["status"], "done")
+
+    def test_expired_reports_are_deleted(self):
+        job = self.enqueue()
+        self.run_jobs()
+        orphan = self.reports_dir / "orphan.tmp"
+        orphan.write_bytes(b"")
+        fresh_orphan = self.reports_dir / "fresh.tmp"
+        fresh_orphan.write_bytes(b"")
+        long_ago = (tz.now() - tz.timedelta(hours=2)).timestamp()
+        os.utime(orphan, (long_ago, long_ago))
+
+        self.assertEqual(jobs.collect_garbage(), 1)
+        self.assertEqual(sorted(path.name for path in self.reports_dir.iterdir()), [f"{job['id']}.xlsx", "fresh.tmp"])
+
+        ReportJob.objects.update(finished=tz.now() - tz.timedelta(hours=2))
+        os.utime(self.reports_dir / f"{job['id']}.xlsx", (long_ago, long_ago))
+        self.assertEqual(jobs.collect_garbage(), 1)
+        self.assertEqual(self.client.get(job["url"]).status_code, 404)
+        self.assertNotEqual(self.enqueue()["id"], job["id"])
+
+    def test_files_of_running_jobs_are_kept(self):
+        job = self.enqueue()
+        self.assertEqual(jobs.claim_next_job().id, job["id"])
+        self.reports_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.reports_dir / f"{job['id']}.tmp"
+        tmp_path.write_bytes(b"")
+        long_ago = (tz.now() - tz.timedelta(hours=2)).timestamp()
+        os.utime(tmp_path, (long_ago, long_ago))
+
+        self.assertEqual(jobs.collect_garbage(), 0)
+        self.assertTrue(tmp_path.exists())
+
+
+@override_settings(ROBOTS_GROUP_COMMIT=True, ROBOTS_GROUP_COMMIT_DELAY_MS=50)
+class GroupCommitTest(TransactionTestCase):
+    def setUp(self):
+        production_counters.reset()
+        self.addCleanup(factory.group_commit_writer.stop)
+
+    def post_robot(self, created: str, view: str = "new_robot_view"):
+        return self.client_class().post(
+            reverse(view), data={"model": "R2", "version": "D2", "created": created}, content_type="application/json"
+        )
+
+    def test_concurrent_robots_are_committed_together(self):
+        timestamps = [f"2023-01-01 00:00:{idx:02}" for idx in range(20)] + ["2023-01-01 00:00:00"]
+        responses = {}
+
+        def post(created: str) -> None:
+            try:
+                responses.setdefault(created, []).append(self.post_robot(created).status_code)
+            finally:
+                connection.close()
+
+        with mock.patch("robots.utils.factory._create_robots", wraps=factory._create_robots) as create_robots:
+            threads = [threading.Thread(target=post, args=(created,)) for created in timestamps]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(responses.pop("2023-01-01 00:00:00")), [200, 400])
+        self.assertEqual({status for statuses in responses.values() for status in statuses}, {200})
+        self.assertEqual(Robot.objects.count(), 20)
+        self.assertLess(create_robots.call_count, 20)
+        call_command("reconcile_production", stdout=StringIO())
+
+    def test_fallback_errors_are_reported_per_robot(self):
+        batch = [
+            _validate_robot_params({"model": "R2", "version": "D2", "created": f"2023-01-01 00:00:0{idx}"})
+            for idx in range(3)
+        ]
+        create_robot = factory._create_robot
+
+        def create_robot_or_fail(params: dict) -> Robot:
+            if params is batch[1]:
+                raise OperationalError("database is locked")
+            return create_robot(params)
+
+        conflict = IntegrityError("UNIQUE constraint failed: robots_robot.created")
+        with mock.patch("robots.utils.factory._create_robots", side_effect=conflict):
+            with mock.patch("robots.utils.factory._create_robot", side_effect=create_robot_or_fail):
+                results = factory._create_robots_group(batch)
+
+        self.assertIsInstance(results[0], Robot)
+        self.assertIsInstance(results[1], OperationalError)
+        self.assertIsInstance(results[2], Robot)
+        self.assertEqual(Robot.objects.count(), 2)
+
+    def test_async_view(self):
+        self.assertEqual(self.post_robot("2023-01-01 00:00:00", "new_robot_async_view").status_code, 200)
+        self.assertEqual(self.post_robot("2023-01-01 00:00:00", "new_robot_async_view").status_code, 400)
+
+    def test_full_queue_is_rejected(self):
+        with mock.patch("robots.views.create_new_robot", side_effect=WriteBufferFull("Too many")):
+            response = self.post_robot("2023-01-01 00:00:00")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "1")
+
+    @override_settings(ROBOTS_GROUP_COMMIT_QUEUE_SIZE=1, ROBOTS_GROUP_COMMIT_BATCH_SIZE=1)
+    def test_writer_backpressure(self):
+        started, release = threading.Event(), threading.Event()
+
+        def write(records: list) -> list:
+            started.set()
+            release.wait()
+            return records
+
+        writer = GroupCommitWriter(write)
+        results = []
+        first = threading.Thread(target=lambda: results.append(writer.submit(1)))
+        first.start()
+        started.wait()
+        second = threading.Thread(target=lambda: results.append(writer.submit(2)))
+        second.start()
+        while not writer._queue.full():
+            time.sleep(0.001)
+
+        with self.assertRaises(WriteBufferFull):
+            writer.submit(3)
+        release.set()
+        first.join()
+        second.join()
+        writer.stop()
+        self.assertEqual(sorted(results), [1, 2])
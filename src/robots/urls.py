@@ -1,10 +1,31 @@
 from django.urls import path
 
-from robots.views import new_robot_view, last_week_stats_view, last_week_stats_error_view
-
+from robots.views import (
+    new_robot_view,
+    new_robot_async_view,
+    new_robots_batch_view,
+    last_week_stats_view,
+    last_week_stats_async_view,
+    last_week_stats_error_view,
+    production_report_view,
+    export_robots_view,
+    production_totals_view,
+    new_report_job_view,
+    report_job_view,
+    report_job_download_view,
+)
 
 urlpatterns = [
     path("new/", new_robot_view, name="new_robot_view"),
+    path("new-async/", new_robot_async_view, name="new_robot_async_view"),
+    path("new-batch/", new_robots_batch_view, name="new_robots_batch_view"),
     path("last-week-stats/", last_week_stats_view, name="last_week_stats_view"),
+    path("last-week-stats-async/", last_week_stats_async_view, name="last_week_stats_async_view"),
+    path("production/", production_report_view, name="production_report_view"),
+    path("export/", export_robots_view, name="export_robots_view"),
+    path("totals/", production_totals_view, name="production_totals_view"),
+    path("reports/", new_report_job_view, name="new_report_job_view"),
+    path("reports/<int:job_id>/", report_job_view, name="report_job_view"),
+    path("reports/<int:job_id>/download/", report_job_download_view, name="report_job_download_view"),
     path("last-week-stats-error/", last_week_stats_error_view, name="last_week_stats_error_view"),
 ]
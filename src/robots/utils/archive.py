@@ -0,0 +1,61 @@
+from collections import Counter
+from datetime import date, datetime
+
+from django.db import transaction, IntegrityError
+from django.utils import timezone as tz
+
+from robots.models import Robot, ArchivedRobot
+
+BATCH_SIZE = 10_000
+# Attempts to archive a batch that robots are created or deleted in concurrently
+MAX_ATTEMPTS = 5
+
+
+def _month(created: datetime) -> date:
+    """Return the first day of the local month `created` falls into"""
+    return tz.localdate(created).replace(day=1)
+
+
+def _archive_batch(horizon: datetime, batch_size: int) -> Counter[date]:
+    """Move up to `batch_size` of the oldest robots assembled before `horizon` to `ArchivedRobot` in one transaction.
+    Return the number of moved robots per month.
+    """
+    with transaction.atomic():
+        rows = list(
+            Robot.objects.filter(created__lt=horizon)
+            .order_by("created")
+            .values_list("serial", "model", "version", "created")[:batch_size]
+        )
+        if not rows:
+            return Counter()
+
+        ArchivedRobot.objects.bulk_create(
+            ArchivedRobot(serial=serial, model=model, version=version, created=created)
+            for serial, model, version, created in rows
+        )
+        # Robots are unique by `created`, so the range holds exactly the selected ones unless some were added since
+        deleted, _ = Robot.objects.filter(created__range=(rows[0][3], rows[-1][3])).delete()
+        if deleted != len(rows):
+            raise IntegrityError("Robots have been changed while archiving")
+
+    return Counter(_month(created) for *_, created in rows)
+
+
+def archive_robots(horizon: datetime, batch_size: int = BATCH_SIZE) -> Counter[date]:
+    """Move every robot assembled before `horizon` to `ArchivedRobot` in batches of `batch_size`.
+    Every batch is committed on its own, so robots can be assembled meanwhile.
+    Return the number of moved robots per month.
+    """
+    archived = Counter()
+    while True:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                batch = _archive_batch(horizon, batch_size)
+                break
+            except IntegrityError:
+                # Some robot of the batch was created or deleted concurrently. Now the batch will include it.
+                if attempt == MAX_ATTEMPTS:
+                    raise
+        if not batch:
+            return archived
+        archived.update(batch)
@@ -0,0 +1,56 @@
+import time
+from datetime import datetime
+from typing import Callable
+
+from django.core.cache import caches
+from django.utils import timezone as tz
+
+from home.utils import metrics
+
+GENERATION_KEY = "robots:production:generation"
+MODIFIED_KEY = "robots:production:modified"
+
+
+def _cache():
+    return caches["reports"]
+
+
+def production_generation() -> int:
+    """Return counter that changes every time new robots are committed to DB"""
+    if (generation := _cache().get(GENERATION_KEY)) is None:
+        # Counter may be evicted, so start from current time instead of zero. Otherwise, old reports could be reused.
+        _cache().add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = _cache().get(GENERATION_KEY)
+
+    return generation
+
+
+def production_modified() -> datetime | None:
+    """Return when `production_generation()` was changed last time, if it's known"""
+    return _cache().get(MODIFIED_KEY)
+
+
+def bump_production_generation() -> None:
+    """Invalidate every cached report"""
+    # Not `incr()`: it's a read and a write for file-based cache, so concurrent bumps could set the same generation
+    _cache().set(GENERATION_KEY, time.time_ns(), timeout=None)
+    _cache().set(MODIFIED_KEY, tz.now(), timeout=None)
+
+
+def report_cache_key(window: str) -> str:
+    """Return cache key of the report covering `window` for the current production generation"""
+    return f"robots:report:{window}:{production_generation()}"
+
+
+def get_or_create_report(window: str, create: Callable[[], bytes]) -> bytes:
+    """Return cached report covering `window`. If there's none, build it with `create()` and cache it."""
+    key = report_cache_key(window)
+    if (report := _cache().get(key)) is not None:
+        metrics.report_cache_requests.inc("hit")
+        return report
+
+    metrics.report_cache_requests.inc("miss")
+    report = create()
+    _cache().set(key, report)
+
+    return report
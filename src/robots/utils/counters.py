@@ -0,0 +1,58 @@
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+from robots.models import ProductionEvent, ProductionSnapshot
+
+
+class ProductionCounters:
+    """In-process production totals per serial, kept up to date by applying new `ProductionEvent` rows.
+    Loaded lazily from the last `ProductionSnapshot` plus the events after it. A new snapshot is saved every
+    `PRODUCTION_SNAPSHOT_EVERY` events, so rebuilding never reads the whole stream.
+    Event ids follow commit order because SQLite has only one writer at a time, so no event can be skipped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = None
+        self._last_event_id = 0
+        self._snapshot_event_id = 0
+
+    def _load(self) -> None:
+        snapshot = ProductionSnapshot.objects.order_by("-last_event_id").first()
+        self._totals = Counter(snapshot.totals if snapshot else {})
+        self._last_event_id = self._snapshot_event_id = snapshot.last_event_id if snapshot else 0
+
+    def _apply_tail(self) -> None:
+        events = ProductionEvent.objects.filter(id__gt=self._last_event_id).order_by("id")
+        for event_id, model, version, count in events.values_list("id", "model", "version", "count").iterator():
+            self._totals[f"{model}-{version}"] += count
+            self._last_event_id = event_id
+
+    def _snapshot(self) -> None:
+        ProductionSnapshot.objects.create(last_event_id=self._last_event_id, totals=dict(self._totals))
+        self._snapshot_event_id = self._last_event_id
+
+    def reset(self) -> None:
+        """Forget everything. Totals are loaded from DB again on next access."""
+        with self._lock:
+            self._totals = None
+
+    def totals(self, snapshot: bool = False) -> tuple[dict[str, int], int]:
+        """Return up-to-date totals per serial and id of the last applied event.
+        Save a snapshot if it's due or `snapshot` is `True`.
+        """
+        with self._lock:
+            if self._totals is None:
+                self._load()
+            self._apply_tail()
+            due = self._last_event_id - self._snapshot_event_id >= settings.PRODUCTION_SNAPSHOT_EVERY
+            if (snapshot or due) and self._last_event_id > self._snapshot_event_id:
+                self._snapshot()
+
+            return dict(self._totals), self._last_event_id
+
+
+# Shared by every thread of the process
+production_counters = ProductionCounters()
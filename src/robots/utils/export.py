@@ -0,0 +1,112 @@
+import csv
+import json
+import heapq
+from datetime import date, datetime, time
+from operator import itemgetter
+from typing import Iterator
+
+from django.http import HttpRequest
+from django.utils import timezone as tz
+
+from robots.models import Robot, ArchivedRobot, reaches_archive
+from robots.utils.factory import TIMESTAMP_FORMAT
+from robots.utils.reports import parse_date_param
+
+
+EXPORT_FIELDS = ("serial", "model", "version", "created")
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object that returns whatever is written to it, so `csv.writer` can render lines one by one"""
+
+    @staticmethod
+    def write(value: str) -> str:
+        return value
+
+
+def _start_of_day(day: date) -> datetime:
+    return tz.make_aware(datetime.combine(day, time.min))
+
+
+def _ndjson_line(row: tuple) -> str:
+    return json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n"
+
+
+def _validate_export_request(request: HttpRequest) -> dict:
+    """Return valid robots export params from GET request as `dict`.
+    If something is wrong, raise `ValueError` with corresponding message.
+    """
+    if (export_format := request.GET.get("format", "csv")) not in EXPORT_FORMATS:
+        raise ValueError(f"'format' must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    params = {
+        "export_format": export_format,
+        "start": parse_date_param(request.GET, "start"),
+        "end": parse_date_param(request.GET, "end"),
+    }
+    if params["start"] and params["end"] and params["start"] > params["end"]:
+        raise ValueError("'start' must not be later than 'end'")
+
+    # Normalization. Make `model` and `version` uppercase, the way they are stored.
+    for param in ("model", "version"):
+        params[param] = value.upper() if (value := request.GET.get(param)) else None
+
+    return params
+
+
+def export_robots(
+    export_format: str,
+    model: str | None = None,
+    version: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+) -> Iterator[str]:
+    """Yield robots assembled within `start`-`end` days (inclusive) as chunks of CSV or NDJSON lines, archived ones too.
+    Rows are read from DB in chunks without creating model instances, so memory usage doesn't depend on their number.
+    """
+    filters = {}
+    if model is not None:
+        filters["model"] = model
+    if version is not None:
+        filters["version"] = version
+    if start is not None:
+        filters["created__gte"] = _start_of_day(start)
+    if end is not None:
+        filters["created__lt"] = _start_of_day(end + tz.timedelta(days=1))
+
+    querysets = [Robot.objects.filter(**filters)]
+    if reaches_archive(filters.get("created__gte")):
+        querysets.append(ArchivedRobot.objects.filter(**filters))
+    # Both are read in order of `created`, so they're merged without sorting
+    rows = heapq.merge(
+        *(
+            queryset.order_by("created").values_list(*EXPORT_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+            for queryset in querysets
+        ),
+        key=itemgetter(EXPORT_FIELDS.index("created")),
+    )
+
+    if export_format == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        render = writer.writerow
+    else:
+        render = _ndjson_line
+
+    chunk = []
+    for serial, model, version, created in rows:
+        chunk.append(render((serial, model, version, tz.localtime(created).strftime(TIMESTAMP_FORMAT))))
+        if len(chunk) == CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk.clear()
+    if chunk:
+        yield "".join(chunk)
+
+
+def export_robots_request(request: HttpRequest) -> tuple[str, Iterator[str]]:
+    """Return format and lines of robots export described by params validated with `_validate_export_request`"""
+    params = _validate_export_request(request)
+
+    return params["export_format"], export_robots(**params)
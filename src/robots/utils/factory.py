@@ -1,10 +1,38 @@
-import json
+import re
+import logging
 from datetime import datetime as dt
 
+from django.conf import settings
+from django.db import transaction, IntegrityError
 from django.utils import timezone as tz
 from django.http import HttpRequest
 
-from robots.models import Robot
+from asgiref.sync import sync_to_async
+
+from home.utils.log import log_duration
+from robots.models import Robot, ArchivedRobot, reaches_archive
+from robots.utils.signals import robots_bulk_created
+from robots.utils.group_commit import GroupCommitWriter
+
+try:
+    # Optional. A lot faster than `json`, and raises `ValueError` subclass on invalid JSON as well.
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+logger = logging.getLogger(__name__)
+
+
+REQUIRED_PARAMS = ("model", "version", "created")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Same as `TIMESTAMP_FORMAT`. `datetime.strptime()` also accepts fields without leading zeros.
+TIMESTAMP_PATTERN = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2}) (\d{1,2}):(\d{1,2}):(\d{1,2})", re.ASCII)
+# Messages of `IntegrityError` raised by SQLite for `unique_robot_created` and `unique_archived_robot_created`
+DUPLICATE_ERRORS = frozenset(
+    f"UNIQUE constraint failed: {model._meta.db_table}.created" for model in (Robot, ArchivedRobot)
+)
+# Attempts to create a batch that conflicts with robots created concurrently
+MAX_ATTEMPTS = 5
 
 
 def _json_request_to_dict(request: HttpRequest) -> dict | None:
@@ -12,7 +40,7 @@ def _json_request_to_dict(request: HttpRequest) -> dict | None:
     If JSON isn't valid or doesn't use UTF-8 encoding, raise `ValueError` with corresponding message.
     """
     try:
-        params = json.loads(request.body.decode("utf-8"))
+        params = json_loads(request.body.decode("utf-8"))
     except UnicodeError:
         raise ValueError("Encoding must be 'utf-8'")
     except ValueError:
@@ -24,54 +52,249 @@ def _json_request_to_dict(request: HttpRequest) -> dict | None:
     return params
 
 
-def _validate_new_robot_request(request: HttpRequest) -> dict[str, str] | None:
-    """Return valid JSON that meet some requirements from `request.body` as `dict`.
-    If something is wrong, raise either `TypeError` or `ValueError` with corresponding message.
+def _json_request_to_list(request: HttpRequest) -> list[dict | ValueError]:
+    """Return records from `request.body` containing either a JSON array or NDJSON (one object per line).
+    Records that aren't valid JSON objects are replaced with `ValueError` so they can be reported per item.
+    If the body isn't UTF-8 or contains no records at all, raise `ValueError` with corresponding message.
     """
-    params = _json_request_to_dict(request)
+    try:
+        body = request.body.decode("utf-8")
+    except UnicodeError:
+        raise ValueError("Encoding must be 'utf-8'")
+
+    try:
+        records = json_loads(body)
+    except ValueError:
+        # Not a single JSON document. Treat it as NDJSON.
+        records = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json_loads(line))
+            except ValueError:
+                records.append(ValueError("Invalid JSON"))
+    else:
+        if isinstance(records, dict):
+            records = [records]
+        elif not isinstance(records, list):
+            raise ValueError("Invalid JSON")
+
+    if not records:
+        raise ValueError("Request must contain at least 1 robot")
+
+    return [record if isinstance(record, (dict, ValueError)) else ValueError("Invalid JSON") for record in records]
 
+
+def _parse_timestamp(timestamp: str) -> dt:
+    """Return aware `datetime` from `timestamp` in `TIMESTAMP_FORMAT`. Much faster than `datetime.strptime()`.
+    If `timestamp` is malformed, raise `ValueError`.
+    """
+    if (match := TIMESTAMP_PATTERN.fullmatch(timestamp)) is None:
+        raise ValueError(f"{timestamp!r} doesn't match {TIMESTAMP_FORMAT!r}")
+
+    return dt(*map(int, match.groups()), tzinfo=tz.get_default_timezone())
+
+
+def _validate_robot_params(params: dict) -> dict:
+    """Return normalized copy of `params` describing one robot, with `created` parsed into aware `datetime`.
+    If something is wrong, raise either `TypeError` or `ValueError` with corresponding message.
+    Doesn't touch DB, so checking for robots assembled at the same second is up to the caller.
+    """
     # Verify that JSON has all required params as strings
-    required_params = ("model", "version", "created")
-    if len(params) != len(required_params):
-        raise ValueError(f"Request must contain exactly {len(required_params)} params")
+    if len(params) != len(REQUIRED_PARAMS):
+        raise ValueError(f"Request must contain exactly {len(REQUIRED_PARAMS)} params")
 
-    for param in required_params:
-        if params.get(param) is None:
+    model, version, created = values = (params.get("model"), params.get("version"), params.get("created"))
+    for param, value in zip(REQUIRED_PARAMS, values):
+        if value is None:
             raise TypeError(f"'{param}' is missing")
-        if not isinstance(params[param], str):
+        if not isinstance(value, str):
             raise TypeError(f"'{param}' must be a string")
 
     # Verify that `model` and `version` are valid
     valid_length = 2
-    for param in ("model", "version"):
-        if len(params[param]) != valid_length or len(params[param].strip()) != valid_length:
+    for param, value in (("model", model), ("version", version)):
+        if len(value) != valid_length or len(value.strip()) != valid_length:
             raise ValueError(f"'{param}' must contain exactly {valid_length} non-whitespace characters")
 
     # Verify that the timestamp is in the correct format
-    timestamp_format = "%Y-%m-%d %H:%M:%S"
     try:
-        timestamp = dt.strptime(params["created"], timestamp_format).replace(tzinfo=tz.get_default_timezone())
+        timestamp = _parse_timestamp(created)
     except ValueError:
-        raise ValueError(f"'created' must match the following pattern: '{timestamp_format}'")
+        raise ValueError(f"'created' must match the following pattern: '{TIMESTAMP_FORMAT}'")
+
+    # Normalization. Make `model` and `version` uppercase.
+    return {"model": model.upper(), "version": version.upper(), "created": timestamp}
+
+
+def _validate_new_robot_request(request: HttpRequest) -> dict | None:
+    """Return valid JSON that meet some requirements from `request.body` as `dict`.
+    If something is wrong, raise either `TypeError` or `ValueError` with corresponding message.
+    """
+    return _validate_robot_params(_json_request_to_dict(request))
 
-    # Make sure there's no robot already assembled at that second
-    if Robot.objects.is_assembled_at_second(timestamp):
+
+def _is_duplicate(error: IntegrityError) -> bool:
+    """Return `True` if `error` means that a robot assembled at the same second already exists.
+    Errors of other constraints (e.g. raised by `post_save` receivers) are bugs, not invalid requests.
+    """
+    return f"{error}" in DUPLICATE_ERRORS
+
+
+def _check_archive(timestamps: list[dt]) -> None:
+    """Raise `IntegrityError` like `unique_archived_robot_created` constraint would if a robot assembled at any of
+    `timestamps` has been archived. Must be called in the transaction inserting the robots, after the INSERT:
+    since then it holds SQLite write lock, so no robot can be archived until the transaction is committed.
+    """
+    if (
+        timestamps
+        and reaches_archive(min(timestamps))
+        and ArchivedRobot.objects.filter(created__in=timestamps).exists()
+    ):
+        raise IntegrityError(f"UNIQUE constraint failed: {ArchivedRobot._meta.db_table}.created")
+
+
+def _create_robot(params: dict) -> Robot:
+    """Create and return new Robot using `params` validated with `_validate_robot_params`.
+    Robots assembled at the same second are rejected by `unique_robot_created` constraint instead of a SELECT.
+    Only robots old enough to be archived are looked up in `ArchivedRobot` as well, see `_check_archive`.
+    """
+    # `post_save` receivers (e.g. production rollup) must be committed along with the robot itself.
+    # The transaction starts with the INSERT, so SQLite takes the write lock before anything is read. Had it read
+    # first, it would fail with "database is locked" right away if another writer committed in between.
+    try:
+        with transaction.atomic():
+            robot = Robot.objects.create(
+                serial=f"{params['model']}-{params['version']}",
+                model=params["model"],
+                version=params["version"],
+                created=params["created"],
+            )
+            _check_archive([robot.created])
+            return robot
+    except IntegrityError as e:
+        if not _is_duplicate(e):
+            raise
         raise ValueError("A robot assembled at this second already exists")
 
-    # Normalization. Make `model` and `version` uppercase.
-    params["model"] = params["model"].upper()
-    params["version"] = params["version"].upper()
 
-    return params
+def _create_robots_group(batch: list[dict]) -> list[Robot | Exception]:
+    """`_create_robots` for `group_commit_writer`. If the batch conflicts with a robot created concurrently,
+    create its robots one by one, so only the conflicting one is rejected.
+    """
+    try:
+        return _create_robots(batch)
+    except IntegrityError:
+        results = []
+        for params in batch:
+            # Robots before it are committed already, so any error must be reported for this robot only
+            try:
+                results.append(_create_robot(params))
+            except (Exception,) as e:
+                results.append(e)
+
+        return results
+
+
+# Used instead of `_create_robot` if `ROBOTS_GROUP_COMMIT` is on
+group_commit_writer = GroupCommitWriter(_create_robots_group)
 
 
 def create_new_robot(request: HttpRequest) -> Robot | None:
-    """Create and return new Robot using params validated with `_validate_new_robot_request`"""
-    params = _validate_new_robot_request(request)
-
-    return Robot.objects.create(
-        serial=f"{params['model']}-{params['version']}",
-        model=params["model"],
-        version=params["version"],
-        created=dt.strptime(params["created"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=tz.get_default_timezone()),
-    )
+    """Create and return new Robot using params validated with `_validate_new_robot_request`.
+    If `ROBOTS_GROUP_COMMIT` is on, the robot is committed along with others received meanwhile. Either way,
+    it returns only once the robot is committed. If there's too many robots waiting, raise `WriteBufferFull`.
+    """
+    with log_duration(logger, "robot_ingest", group_commit=settings.ROBOTS_GROUP_COMMIT) as fields:
+        params = _validate_new_robot_request(request)
+        fields["serial"] = f"{params['model']}-{params['version']}"
+        if settings.ROBOTS_GROUP_COMMIT:
+            return group_commit_writer.submit(params)
+
+        return _create_robot(params)
+
+
+async def acreate_new_robot(request: HttpRequest) -> Robot | None:
+    """Async `create_new_robot`. Validation runs in the event loop, only DB work is moved to a thread.
+    Transactions aren't available in async code, that's why `Robot.objects.acreate()` isn't used.
+    """
+    with log_duration(logger, "robot_ingest", group_commit=settings.ROBOTS_GROUP_COMMIT) as fields:
+        params = _validate_new_robot_request(request)
+        fields["serial"] = f"{params['model']}-{params['version']}"
+        if settings.ROBOTS_GROUP_COMMIT:
+            # Waiting for the batch doesn't touch DB, so waiting requests mustn't share one thread
+            return await sync_to_async(group_commit_writer.submit, thread_sensitive=False)(params)
+
+        return await sync_to_async(_create_robot)(params)
+
+
+def _create_robots(results: list[dict | Exception]) -> list[Robot | Exception]:
+    """Create robots from params validated with `_validate_robot_params` in a single transaction, keeping exceptions.
+    Return results in the same order: either created `Robot` or the exception that rejected the record.
+    If some robot was created or archived concurrently after checking for robots assembled at the same second, raise
+    `IntegrityError` and create nothing.
+    """
+    # Optimization. Check the whole batch for robots assembled at the same second with one query.
+    timestamps = {params["created"] for params in results if isinstance(params, dict)}
+    taken = set(Robot.objects.filter(created__in=timestamps).values_list("created", flat=True))
+    if timestamps and reaches_archive(min(timestamps)):
+        taken.update(ArchivedRobot.objects.filter(created__in=timestamps).values_list("created", flat=True))
+
+    results, new_robots = list(results), []
+    for idx, params in enumerate(results):
+        if not isinstance(params, dict):
+            continue
+        if params["created"] in taken:
+            results[idx] = ValueError("A robot assembled at this second already exists")
+            continue
+        taken.add(params["created"])
+        results[idx] = Robot(
+            serial=f"{params['model']}-{params['version']}",
+            model=params["model"],
+            version=params["version"],
+            created=params["created"],
+        )
+        new_robots.append(results[idx])
+
+    if new_robots:
+        with transaction.atomic():
+            Robot.objects.bulk_create(new_robots)
+            _check_archive([robot.created for robot in new_robots])
+            # `bulk_create()` doesn't send `post_save`, so let receivers know about the whole batch at once
+            robots_bulk_created.send(sender=Robot, instances=new_robots)
+
+    return results
+
+
+def create_new_robots(request: HttpRequest) -> list[Robot | Exception]:
+    """Create robots from a JSON array or NDJSON `request.body` in a single transaction.
+    Return per-record results in the same order: either created `Robot` or the exception that rejected the record.
+    If the body itself can't be read, raise `ValueError` with corresponding message.
+    """
+    with log_duration(logger, "robots_batch_ingest") as fields:
+        results = []
+        for record in _json_request_to_list(request):
+            if isinstance(record, ValueError):
+                results.append(record)
+                continue
+            try:
+                results.append(_validate_robot_params(record))
+            except (TypeError, ValueError) as e:
+                results.append(e)
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                results = _create_robots(results)
+                break
+            except IntegrityError as e:
+                if not _is_duplicate(e):
+                    raise
+                # Some robot of the batch was created concurrently after the check. Now the check will find it,
+                # so only that record is rejected.
+                if attempt == MAX_ATTEMPTS:
+                    raise ValueError("A robot assembled at this second already exists")
+
+        fields["robots"] = len(results)
+        fields["rejected"] = sum(isinstance(result, Exception) for result in results)
+        return results
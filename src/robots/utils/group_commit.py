@@ -0,0 +1,108 @@
+import time
+import queue
+import threading
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class WriteBufferFull(Exception):
+    """Raised when there are already `ROBOTS_GROUP_COMMIT_QUEUE_SIZE` records waiting to be written"""
+
+
+class _Pending:
+    """Record waiting in `GroupCommitWriter` queue along with the result of writing it"""
+
+    __slots__ = ("record", "result", "done")
+
+    def __init__(self, record: Any):
+        self.record = record
+        self.result = None
+        self.done = threading.Event()
+
+
+class GroupCommitWriter:
+    """Bounded in-process queue of records written by one thread with `write(records) -> results` in batches.
+    A batch is written once it has `ROBOTS_GROUP_COMMIT_BATCH_SIZE` records or `ROBOTS_GROUP_COMMIT_DELAY_MS` ms
+    after its first record was queued, whichever comes first. `write` must return a result or an exception per record.
+    Settings are read when the thread is started, i.e. on the first `submit()` after `stop()`.
+    """
+
+    def __init__(self, write: Callable[[list], list]):
+        self._write = write
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+
+    def _start(self) -> None:
+        """Start the thread unless it's running. Must be called with `_lock` held."""
+        if self._thread is not None:
+            return
+        self._queue = queue.Queue(maxsize=settings.ROBOTS_GROUP_COMMIT_QUEUE_SIZE)
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(self._queue, settings.ROBOTS_GROUP_COMMIT_BATCH_SIZE, settings.ROBOTS_GROUP_COMMIT_DELAY_MS),
+            name="group-commit",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, pending_queue: queue.Queue, batch_size: int, delay_ms: float) -> None:
+        stopping = False
+        while not stopping:
+            batch = [pending_queue.get()]
+            deadline = time.monotonic() + delay_ms / 1000
+            while len(batch) < batch_size:
+                try:
+                    batch.append(pending_queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+
+            # `None` is queued by `stop()`
+            if None in batch:
+                stopping = True
+                batch = [pending for pending in batch if pending is not None]
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: list[_Pending]) -> None:
+        try:
+            results = self._write([pending.record for pending in batch])
+        except (Exception,) as e:
+            results = [e] * len(batch)
+        finally:
+            # Like at the end of a request
+            close_old_connections()
+
+        for pending, result in zip(batch, results):
+            pending.result = result
+            pending.done.set()
+
+    def submit(self, record: Any) -> Any:
+        """Queue `record` and wait until the batch it's written in is committed. Return its result or raise it.
+        If the queue is full, raise `WriteBufferFull` right away.
+        """
+        pending = _Pending(record)
+        # Under the lock, so nothing is queued after `stop()` has queued `None`
+        with self._lock:
+            self._start()
+            try:
+                self._queue.put_nowait(pending)
+            except queue.Full:
+                raise WriteBufferFull("Too many robots are waiting to be saved, try again later")
+
+        pending.done.wait()
+        if isinstance(pending.result, Exception):
+            raise pending.result
+
+        return pending.result
+
+    def stop(self) -> None:
+        """Write every queued record and stop the thread"""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = self._queue = None
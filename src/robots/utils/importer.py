@@ -0,0 +1,185 @@
+import csv
+from collections import Counter
+from datetime import datetime, tzinfo
+from itertools import islice
+from typing import Callable, Iterable, Iterator, TextIO
+
+from django.db import connection, transaction, IntegrityError
+from django.utils import timezone as tz
+
+from robots.models import Robot, ArchivedRobot, ProductionDailyRollup, ProductionEvent, reaches_archive
+from robots.utils.cache import bump_production_generation
+from robots.utils.factory import _is_duplicate, _validate_robot_params, json_loads
+from robots.utils.signals import robots_imported
+
+
+IMPORT_FORMATS = ("csv", "ndjson")
+CHUNK_SIZE = 20000
+# Timestamps looked up with one query. SQLite allows up to 32766 params.
+LOOKUP_BATCH_SIZE = 10_000
+# Attempts to import a chunk that conflicts with robots created concurrently
+MAX_ATTEMPTS = 5
+
+
+def read_records(file: TextIO, import_format: str) -> Iterator[tuple[int, dict | ValueError]]:
+    """Yield (line number, record) from CSV `file` with a header or NDJSON `file`, reading it line by line.
+    Lines that aren't valid JSON objects are yielded as `ValueError` so they can be reported.
+    """
+    if import_format == "csv":
+        # Optimization. `csv.DictReader` is implemented in Python, while `csv.reader` isn't.
+        reader = csv.reader(file)
+        header = next(reader, ())
+        for row in reader:
+            if row:
+                yield reader.line_num, dict(zip(header, row)) if len(row) == len(header) else ValueError("Invalid CSV")
+        return
+
+    for line_num, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json_loads(line)
+        except ValueError:
+            record = None
+        yield line_num, record if isinstance(record, dict) else ValueError("Invalid JSON")
+
+
+def _validate_import_record(record: dict) -> dict:
+    """Return `record` validated with `_validate_robot_params`. `serial` written by `export_robots` is allowed,
+    but it must match `model` and `version`. If something is wrong, raise either `TypeError` or `ValueError`.
+    """
+    if (serial := record.get("serial")) is not None:
+        record = {param: value for param, value in record.items() if param != "serial"}
+    params = _validate_robot_params(record)
+    if serial is not None and serial.upper() != f"{params['model']}-{params['version']}":
+        raise ValueError("'serial' must match 'model' and 'version'")
+
+    return params
+
+
+def _insert_sql() -> str:
+    """Return parametrized INSERT of a robot's serial, model, version and created"""
+    quote = connection.ops.quote_name
+    fields = ("serial", "model", "version", "created")
+    columns = ", ".join(quote(Robot._meta.get_field(field).column) for field in fields)
+
+    return f"INSERT INTO {quote(Robot._meta.db_table)} ({columns}) VALUES ({', '.join(['%s'] * len(fields))})"
+
+
+def _adapt_created(created: datetime, db_timezone: tzinfo) -> str:
+    """Same as `connection.ops.adapt_datetimefield_value(created)` for aware `created`, without its checks.
+    `db_timezone` is `connection.timezone`, which is slow to look up for every robot.
+    """
+    return f"{created.astimezone(db_timezone).replace(tzinfo=None)}"
+
+
+def _taken(model: type[Robot] | type[ArchivedRobot], values: list[str]) -> set[str]:
+    """Return those of `values` adapted with `_adapt_created` that some `model` robot is assembled at"""
+    quote = connection.ops.quote_name
+    column = quote(model._meta.get_field("created").column)
+    taken = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+            batch = values[start : start + LOOKUP_BATCH_SIZE]
+            # Cast, so the value comes back the same as it was adapted, not as `datetime`
+            cursor.execute(
+                f"SELECT CAST({column} AS TEXT) FROM {quote(model._meta.db_table)} "
+                f"WHERE {column} IN ({', '.join(['%s'] * len(batch))})",
+                batch,
+            )
+            taken.update(created for (created,) in cursor.fetchall())
+
+    return taken
+
+
+def _import_chunk(chunk: list[tuple[int, dict | ValueError]]) -> tuple[Counter[str], list[tuple]]:
+    """Create robots from valid records of `chunk` in a single transaction, along with production totals and stock.
+    Return the number of created robots per serial and rejected records as (line number, record, error).
+    If some robot was created or archived concurrently after checking for robots assembled at the same second,
+    raise `IntegrityError` and create nothing.
+    """
+    valid, rejected = [], []
+    for line_num, record in chunk:
+        if isinstance(record, ValueError):
+            rejected.append((line_num, record, record))
+            continue
+        try:
+            valid.append((line_num, record, _validate_import_record(record)))
+        except (TypeError, ValueError) as e:
+            rejected.append((line_num, record, e))
+
+    # Optimization. Timestamps are adapted for DB once, and robots assembled at the same second are looked up by them
+    # with raw queries. ORM would adapt every one of thousands of params again. Those written with leading zeros
+    # (as `export_robots` writes them) in the default time zone are already adapted, if DB uses the same one.
+    db_timezone = connection.timezone
+    same_timezone = connection.timezone_name == tz.get_default_timezone_name()
+    adapted = [
+        (
+            record["created"]
+            if same_timezone and len(record["created"]) == len("YYYY-MM-DD HH:MM:SS")
+            else _adapt_created(params["created"], db_timezone)
+        )
+        for _, record, params in valid
+    ]
+    archived = bool(valid) and reaches_archive(min(params["created"] for *_, params in valid))
+    taken = _taken(Robot, adapted)
+    if archived:
+        taken.update(_taken(ArchivedRobot, adapted))
+
+    rows, totals = [], Counter()
+    for (line_num, record, params), created in zip(valid, adapted):
+        if created in taken:
+            rejected.append((line_num, record, ValueError("A robot assembled at this second already exists")))
+            continue
+        taken.add(created)
+        model, version = params["model"], params["version"]
+        rows.append((f"{model}-{version}", model, version, created))
+        # `created` is already in the default time zone, so its date is the local one
+        totals[model, version, params["created"].date()] += 1
+
+    assembled = Counter(serial for serial, *_ in rows)
+    # Optimization. `bulk_create()` prepares every field of every instance with ORM. That alone is several times
+    # slower than parsing and validation together, so valid rows are inserted with a single `executemany()`.
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.executemany(_insert_sql(), rows)
+        # Like `_check_archive()` of robot views. The write lock is held since the INSERT.
+        if archived and _taken(ArchivedRobot, [created for *_, created in rows]):
+            raise IntegrityError(f"UNIQUE constraint failed: {ArchivedRobot._meta.db_table}.created")
+        ProductionDailyRollup.objects.add_totals(totals)
+        events = Counter()
+        for (model, version, _), count in totals.items():
+            events[model, version] += count
+        ProductionEvent.objects.append(events)
+        # Stock and orders are updated along with robots, so an import failed midway leaves them consistent
+        if assembled:
+            robots_imported.send(sender=Robot, assembled=assembled)
+            transaction.on_commit(bump_production_generation)
+
+    return assembled, sorted(rejected, key=lambda item: item[0])
+
+
+def import_robots(
+    records: Iterable[tuple[int, dict | ValueError]], reject: Callable, chunk_size: int = CHUNK_SIZE
+) -> int:
+    """Create robots from (line number, record) pairs yielded by `read_records()` in chunks of `chunk_size`.
+    Every chunk is committed on its own, and `robots_imported` is sent in its transaction, so waiting orders are
+    allocated once per serial and chunk. Every rejected record is passed to `reject(line_num, record, error)`.
+    Return the number of imported robots.
+    """
+    records = iter(records)
+    imported_count = 0
+    while chunk := list(islice(records, chunk_size)):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                imported, rejected = _import_chunk(chunk)
+                break
+            except IntegrityError as e:
+                # Some robot of the chunk was created concurrently after the check. Now the check will find it.
+                if not _is_duplicate(e) or attempt == MAX_ATTEMPTS:
+                    raise
+        for item in rejected:
+            reject(*item)
+        imported_count += imported.total()
+
+    return imported_count
@@ -0,0 +1,147 @@
+import os
+import json
+import logging
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+from django.http import HttpRequest
+from django.utils import timezone as tz
+
+from home.utils.log import log_duration
+from robots.models import ProductionDailyRollup, ProductionEvent, ReportJob
+from robots.utils.reports import _validate_production_report_request
+from robots.utils.xlsx import write_xlsx, write_production_report_xlsx
+
+logger = logging.getLogger(__name__)
+
+
+def _validate_report_job_request(request: HttpRequest) -> tuple[str, dict]:
+    """Return kind and JSON-serializable params of the report requested by `report` query param.
+    `last-week` report is the same as `last_week_stats_view` one, `production` accepts `production_report_view` params.
+    If something is wrong, raise `ValueError` with corresponding message.
+    """
+    if (kind := request.GET.get("report", ReportJob.Kind.LAST_WEEK)) not in ReportJob.Kind.values:
+        raise ValueError(f"'report' must be one of: {', '.join(ReportJob.Kind.values)}")
+
+    if kind == ReportJob.Kind.LAST_WEEK:
+        return kind, {"today": f"{tz.localdate()}"}
+
+    params = _validate_production_report_request(request)
+    return kind, {
+        "start": f"{params['start']}",
+        "end": f"{params['end']}",
+        "granularity": params["granularity"],
+        "model": params["model"],
+    }
+
+
+def enqueue_report_job(request: HttpRequest) -> tuple[ReportJob, bool]:
+    """Return job building the report described by `request` and whether it's a new one.
+    Reports of the same production state are identical, so requests for the same one share a job until it expires.
+    A failed job is queued once again. If request is invalid, raise `ValueError` with corresponding message.
+    """
+    kind, params = _validate_report_job_request(request)
+    # Every robot appends a production event, so the last event id identifies the production state
+    last_event_id = ProductionEvent.objects.aggregate(last_event_id=Max("id"))["last_event_id"] or 0
+    key = f"{kind}:{json.dumps(params, sort_keys=True)}:{last_event_id}"
+
+    job, created = ReportJob.objects.get_or_create(key=key, defaults={"kind": kind, "params": params})
+    if job.status == ReportJob.Status.FAILED:
+        ReportJob.objects.filter(id=job.id, status=ReportJob.Status.FAILED).update(
+            status=ReportJob.Status.QUEUED, error="", finished=None
+        )
+        job.refresh_from_db()
+
+    return job, created
+
+
+def claim_next_job() -> ReportJob | None:
+    """Mark the oldest queued job as running and return it. Return `None` if there's no queued jobs."""
+    while job := ReportJob.objects.filter(status=ReportJob.Status.QUEUED).order_by("id").first():
+        # Somebody else may have claimed the job meanwhile
+        if ReportJob.objects.filter(id=job.id, status=ReportJob.Status.QUEUED).update(status=ReportJob.Status.RUNNING):
+            job.status = ReportJob.Status.RUNNING
+            return job
+
+    return None
+
+
+def build_report(job_id: int) -> str:
+    """Write report of `ReportJob` with `job_id` into `REPORTS_DIR` and return its filename.
+    Runs in a worker process, so it receives only the id. The file appears only once it's complete.
+    """
+    job = ReportJob.objects.get(id=job_id)
+    reports_dir = Path(settings.REPORTS_DIR)
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    path = reports_dir / f"{job.id}.xlsx"
+
+    tmp_path = path.with_suffix(".tmp")
+    with log_duration(logger, "report_rendered", report=job.kind, job=job.id) as fields:
+        with open(tmp_path, "wb") as output:
+            if job.kind == ReportJob.Kind.LAST_WEEK:
+                today = date.fromisoformat(job.params["today"])
+                write_xlsx(ProductionDailyRollup.objects.last_week_production_summary(today), output)
+            else:
+                rows = ProductionDailyRollup.objects.production_report(
+                    date.fromisoformat(job.params["start"]),
+                    date.fromisoformat(job.params["end"]),
+                    job.params["granularity"],
+                    job.params["model"],
+                )
+                # Not the replica: the job is keyed by production state of the primary, and its report is kept
+                write_production_report_xlsx(rows.using(DEFAULT_DB_ALIAS).iterator(), output)
+            fields["size"] = output.tell()
+        os.replace(tmp_path, path)
+
+    return path.name
+
+
+def report_path(job: ReportJob) -> Path:
+    """Return path of the report built by `job`"""
+    return Path(settings.REPORTS_DIR) / job.filename
+
+
+def report_download_name(job: ReportJob) -> str:
+    """Return filename the report built by `job` is downloaded as"""
+    if job.kind == ReportJob.Kind.LAST_WEEK:
+        return f"report_{tz.localtime(job.finished):%Y%m%d_%H%M%S}.xlsx"
+
+    start, end = date.fromisoformat(job.params["start"]), date.fromisoformat(job.params["end"])
+    return f"production_{start:%Y%m%d}_{end:%Y%m%d}_{job.params['granularity']}.xlsx"
+
+
+def collect_garbage() -> int:
+    """Delete jobs finished more than `REPORTS_TTL` seconds ago, as well as files in `REPORTS_DIR` that don't belong
+    to any job and weren't modified for that long, e.g. left by a crashed worker. Return the number of deleted files.
+    """
+    expired_before = tz.now() - tz.timedelta(seconds=settings.REPORTS_TTL)
+    ReportJob.objects.filter(
+        status__in=(ReportJob.Status.DONE, ReportJob.Status.FAILED), finished__lt=expired_before
+    ).delete()
+
+    reports_dir = Path(settings.REPORTS_DIR)
+    if not reports_dir.is_dir():
+        return 0
+
+    alive = set(ReportJob.objects.exclude(filename="").values_list("filename", flat=True))
+    # Write-only workbook is only flushed to the file of a running job once it's saved, so the file may stay
+    # untouched for longer than `REPORTS_TTL` while a large report is being built. See `build_report`.
+    running = ReportJob.objects.filter(status=ReportJob.Status.RUNNING).values_list("id", flat=True)
+    alive.update(f"{job_id}.tmp" for job_id in running)
+    deleted = 0
+    for path in reports_dir.iterdir():
+        if path.name in alive:
+            continue
+        try:
+            if path.stat().st_mtime >= expired_before.timestamp():
+                continue
+        except FileNotFoundError:
+            # Renamed by a job that has just finished
+            continue
+        path.unlink(missing_ok=True)
+        deleted += 1
+
+    return deleted
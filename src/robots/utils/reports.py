@@ -0,0 +1,71 @@
+from datetime import date
+
+from django.http import HttpRequest, QueryDict
+from django.db.models import QuerySet
+from django.utils import timezone as tz
+
+from robots.models import ProductionDailyRollup, GRANULARITIES
+
+
+REPORT_FORMATS = ("json", "xlsx")
+MAX_PAGE_SIZE = 1000
+
+
+def parse_date_param(query: QueryDict, param: str, default: date | None = None) -> date | None:
+    """Return `param` from `query` parsed as 'YYYY-MM-DD' date or `default` if it's missing.
+    If it's malformed, raise `ValueError` with corresponding message.
+    """
+    if (value := query.get(param)) is None:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{param}' must match the following pattern: 'YYYY-MM-DD'")
+
+
+def _validate_production_report_request(request: HttpRequest) -> dict:
+    """Return valid production report params from GET request as `dict`.
+    Report covers the last 7 days by day unless `start`, `end` (both 'YYYY-MM-DD') or `granularity` are given.
+    If something is wrong, raise `ValueError` with corresponding message.
+    """
+    params = {
+        "end": parse_date_param(request.GET, "end", tz.localdate()),
+        "start": parse_date_param(request.GET, "start"),
+    }
+    if params["start"] is None:
+        params["start"] = params["end"] - tz.timedelta(days=6)
+    if params["start"] > params["end"]:
+        raise ValueError("'start' must not be later than 'end'")
+
+    if (granularity := request.GET.get("granularity", "day")) not in GRANULARITIES:
+        raise ValueError(f"'granularity' must be one of: {', '.join(GRANULARITIES)}")
+    params["granularity"] = granularity
+
+    if (report_format := request.GET.get("format", "json")) not in REPORT_FORMATS:
+        raise ValueError(f"'format' must be one of: {', '.join(REPORT_FORMATS)}")
+    params["format"] = report_format
+
+    # Normalization. Make `model` uppercase, the way it's stored.
+    params["model"] = model.upper() if (model := request.GET.get("model")) else None
+
+    for param, default in (("page", 1), ("page_size", MAX_PAGE_SIZE)):
+        try:
+            params[param] = int(request.GET.get(param, default))
+        except ValueError:
+            raise ValueError(f"'{param}' must be an integer")
+        if params[param] < 1:
+            raise ValueError(f"'{param}' must be positive")
+    if params["page_size"] > MAX_PAGE_SIZE:
+        raise ValueError(f"'page_size' must not exceed {MAX_PAGE_SIZE}")
+
+    return params
+
+
+def get_production_report(request: HttpRequest) -> tuple[dict, QuerySet]:
+    """Return params validated with `_validate_production_report_request` and rows of the report they describe"""
+    params = _validate_production_report_request(request)
+    rows = ProductionDailyRollup.objects.production_report(
+        params["start"], params["end"], params["granularity"], params["model"]
+    )
+
+    return params, rows
@@ -0,0 +1,44 @@
+from collections import Counter
+
+from django.db import transaction
+from django.dispatch import Signal, receiver
+from django.utils import timezone as tz
+from django.db.models.signals import post_save
+
+from robots.models import Robot, ProductionDailyRollup, ProductionEvent
+from robots.utils.cache import bump_production_generation
+
+
+# Sent after `Robot.objects.bulk_create()` since it bypasses `post_save`. Provides `instances` argument.
+robots_bulk_created = Signal()
+# Sent in the transaction of every chunk imported by `import_robots()`. Provides `assembled` argument:
+# number of imported robots per serial.
+robots_imported = Signal()
+
+
+@receiver(post_save, sender=Robot)
+def update_production_rollup(sender, instance, created, **kwargs) -> None:
+    """Count a new robot in `ProductionDailyRollup`. Invalidate cached reports once it's committed."""
+    if created:
+        ProductionDailyRollup.objects.add(instance.model, instance.version, tz.localdate(instance.created))
+        transaction.on_commit(bump_production_generation)
+
+
+@receiver(robots_bulk_created, sender=Robot)
+def update_production_rollup_bulk(sender, instances, **kwargs) -> None:
+    """Batched `update_production_rollup`. Touch every (model, version, day) row only once."""
+    ProductionDailyRollup.objects.add_robots(instances)
+    transaction.on_commit(bump_production_generation)
+
+
+@receiver(post_save, sender=Robot)
+def append_production_event(sender, instance, created, **kwargs) -> None:
+    """Append a new robot to the production event stream"""
+    if created:
+        ProductionEvent.objects.create(model=instance.model, version=instance.version)
+
+
+@receiver(robots_bulk_created, sender=Robot)
+def append_production_events(sender, instances, **kwargs) -> None:
+    """Batched `append_production_event`. Append one event per model and version."""
+    ProductionEvent.objects.append(Counter((robot.model, robot.version) for robot in instances))
@@ -1,61 +1,100 @@
-from pathlib import Path
+import logging
+from io import BytesIO
+from string import ascii_uppercase
+from typing import BinaryIO, Iterable
 
-from django.conf import settings
 from django.utils import timezone as tz
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 
-from robots.models import Robot
+from home.utils.log import log_duration
+from robots.models import ProductionDailyRollup
+from robots.utils.cache import get_or_create_report
+
+
+# Optimization. Create all of these only once since header is the same on every sheet.
+HEADER_FONT = Font(bold=True)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+NARROW_COLUMN_WIDTH = 10
+
+logger = logging.getLogger(__name__)
 
 
 def _get_last_week_stats() -> dict:
-    """Return summary of robot production totals for the last week"""
-    data = {}
-    for model in Robot.objects.models():
-        data |= Robot.objects.last_week_production_summary(model=model)
+    """Return summary of robot production totals for the last week.
+    Read from `ProductionDailyRollup`, so it costs the same no matter how many robots are stored.
+    """
+    return ProductionDailyRollup.objects.last_week_production_summary()
+
+
+def _create_sheet(wb: Workbook, title: str, header: tuple[str, ...], widths: tuple[int, ...]) -> WriteOnlyWorksheet:
+    """Create sheet in write-only `wb`, resize its columns to `widths` and fill bold centered `header`"""
+    ws = wb.create_sheet(title)
+    for column, width in zip(ascii_uppercase, widths):
+        ws.column_dimensions[column].width = width
 
-    return data
+    header_row = []
+    for value in header:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = HEADER_FONT
+        cell.alignment = HEADER_ALIGNMENT
+        header_row.append(cell)
+    ws.append(header_row)
 
+    return ws
 
-def create_xlsx_file() -> Path:
-    """Save data received from `_get_last_week_stats()` as `.xlsx` file. Return its path."""
-    wb = Workbook()
-    timestamp = tz.now()  # Will be added to filename to make it unique and informative
-    data = _get_last_week_stats()
 
-    # Optimization. Create all of these only once since header is the same on every sheet.
-    header = (("A1", "Модель"), ("B1", "Версия"), ("C1", "Количество за неделю"))
-    header_font = Font(bold=True)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    narrow_column_width, wide_column_width = 10, 25
+def write_xlsx(data: dict, output: BinaryIO) -> None:
+    """Write production summary `data` (one sheet per model) as `.xlsx` into binary file-like `output`.
+    Workbook is write-only, so rows are streamed instead of being kept in memory.
+    """
+    wb = Workbook(write_only=True)
 
     for model, model_data in data.items():
-        # Create sheet and resize table
-        ws = wb.create_sheet(model)
-        ws.column_dimensions["A"].width = narrow_column_width
-        ws.column_dimensions["B"].width = narrow_column_width
-        ws.column_dimensions["C"].width = wide_column_width
-
-        # Fill table header
-        for cell, value in header:
-            ws[cell] = value
-            ws[cell].font = header_font
-            ws[cell].alignment = header_alignment
-
-        # Fill table rows
-        for row_idx, version_data in enumerate(model_data, start=2):
-            ws[f"A{row_idx}"], ws[f"B{row_idx}"], ws[f"C{row_idx}"] = (
-                model,
-                version_data["version"],
-                version_data["count"],
-            )
-
-    # Remove default empty sheet from workbook
-    if len(wb.worksheets) > 1:
-        wb.remove(wb["Sheet"])
-
-    output_file = settings.REPORTS_DIR / f"report_{timestamp.strftime('%Y%m%d_%H%M%S')}.xlsx"
-    wb.save(output_file)
-
-    return output_file
+        ws = _create_sheet(
+            wb, model, ("Модель", "Версия", "Количество за неделю"), (NARROW_COLUMN_WIDTH, NARROW_COLUMN_WIDTH, 25)
+        )
+        for version_data in model_data:
+            ws.append((model, version_data["version"], version_data["count"]))
+
+    # Write-only workbook gets default empty sheet only if there's no other sheets
+    wb.save(output)
+
+
+def write_production_report_xlsx(rows: Iterable[dict], output: BinaryIO) -> None:
+    """Write production report `rows` ordered by model (one sheet per model) as `.xlsx` into binary file-like `output`.
+    See `ProductionDailyRollupManager.production_report`.
+    """
+    wb = Workbook(write_only=True)
+
+    ws, model = None, None
+    for row in rows:
+        if row["model"] != model:
+            model = row["model"]
+            ws = _create_sheet(wb, model, ("Период", "Версия", "Количество"), (12, NARROW_COLUMN_WIDTH, 15))
+        ws.append((row["period"], row["version"], row["count"]))
+
+    wb.save(output)
+
+
+def last_week_report_window() -> str:
+    """Return identifier of the days covered by the last-week report"""
+    return f"last-week:{tz.localdate()}"
+
+
+def _render_last_week_report() -> bytes:
+    """Return data received from `_get_last_week_stats()` as `.xlsx` file contents"""
+    with log_duration(logger, "report_rendered", report="last-week") as fields:
+        output = BytesIO()
+        write_xlsx(_get_last_week_stats(), output)
+        fields["size"] = output.tell()
+
+        return output.getvalue()
+
+
+def create_xlsx_report() -> BytesIO:
+    """Return last-week report as in-memory `.xlsx` file. It's rendered only if there's no cached one."""
+    return BytesIO(get_or_create_report(last_week_report_window(), _render_last_week_report))
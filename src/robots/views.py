@@ -1,15 +1,53 @@
 import json
+import logging
+from io import BytesIO
+import asyncio
+from datetime import datetime
 from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
 
+from django.db import close_old_connections
 from django.urls import reverse
+from django.conf import settings
+from django.core.paginator import Paginator, EmptyPage
+from django.utils import timezone as tz
 from django.core import serializers
 from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_GET
-from django.http import HttpRequest, HttpResponse, JsonResponse, FileResponse
+from django.views.decorators.http import require_GET, condition
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    JsonResponse,
+    FileResponse,
+    StreamingHttpResponse,
+)
 
-from robots.utils.factory import create_new_robot
-from robots.utils.xlsx import create_xlsx_file
+from asgiref.sync import sync_to_async
+
+from home.utils.log import log_duration
+from robots.models import Robot, ReportJob
+from robots.utils.factory import create_new_robot, acreate_new_robot, create_new_robots
+from robots.utils.group_commit import WriteBufferFull
+from robots.utils.cache import report_cache_key, production_modified
+from robots.utils.reports import get_production_report
+from robots.utils.export import EXPORT_FORMATS, export_robots_request
+from robots.utils.counters import production_counters
+from robots.utils.jobs import enqueue_report_job, report_path, report_download_name
+from robots.utils.xlsx import create_xlsx_report, last_week_report_window, write_production_report_xlsx
+
+logger = logging.getLogger(__name__)
+
+
+def _write_buffer_full(e: WriteBufferFull) -> JsonResponse:
+    """Ask client to retry in a second since group commit queue is full"""
+    response = JsonResponse({"status": "error", "message": f"{e}"}, status=HTTPStatus.TOO_MANY_REQUESTS)
+    response.headers["Retry-After"] = "1"
+
+    return response
 
 
 @csrf_exempt
@@ -20,6 +58,8 @@ def new_robot_view(request: HttpRequest) -> JsonResponse:
             new_robot = create_new_robot(request)
         except (TypeError, ValueError) as e:
             return JsonResponse({"status": "error", "message": f"{e}"}, status=HTTPStatus.BAD_REQUEST)
+        except WriteBufferFull as e:
+            return _write_buffer_full(e)
 
         return JsonResponse(
             {
@@ -35,15 +75,273 @@ def new_robot_view(request: HttpRequest) -> JsonResponse:
         )
 
 
+async def new_robot_async_view(request: HttpRequest) -> JsonResponse:
+    """Async `new_robot_view`"""
+    if request.method == "POST":
+        try:
+            new_robot = await acreate_new_robot(request)
+        except (TypeError, ValueError) as e:
+            return JsonResponse({"status": "error", "message": f"{e}"}, status=HTTPStatus.BAD_REQUEST)
+        except WriteBufferFull as e:
+            return _write_buffer_full(e)
+
+        return JsonResponse(
+            {
+                "status": "success",
+                "data": json.loads(serializers.serialize("json", [new_robot])),
+            },
+            status=HTTPStatus.OK,
+        )
+    else:
+        return JsonResponse(
+            {"status": "error", "message": HTTPStatus.METHOD_NOT_ALLOWED.phrase},
+            status=HTTPStatus.METHOD_NOT_ALLOWED,
+        )
+
+
+# Django 4.2 decorators don't support async views
+new_robot_async_view.csrf_exempt = True
+
+
+@csrf_exempt
+def new_robots_batch_view(request: HttpRequest) -> JsonResponse:
+    """JSON API endpoint for adding many robots to DB at once. Accepts either JSON array or NDJSON."""
+    if request.method == "POST":
+        try:
+            results = create_new_robots(request)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": f"{e}"}, status=HTTPStatus.BAD_REQUEST)
+
+        # Optimization. Serialize all new robots at once instead of one by one.
+        new_robots = iter(json.loads(serializers.serialize("json", (r for r in results if isinstance(r, Robot)))))
+
+        return JsonResponse(
+            {
+                "status": "success",
+                "data": [
+                    (
+                        {"status": "error", "message": f"{result}"}
+                        if isinstance(result, Exception)
+                        else {"status": "success", "data": [next(new_robots)]}
+                    )
+                    for result in results
+                ],
+            },
+            status=HTTPStatus.OK,
+        )
+    else:
+        return JsonResponse(
+            {"status": "error", "message": HTTPStatus.METHOD_NOT_ALLOWED.phrase},
+            status=HTTPStatus.METHOD_NOT_ALLOWED,
+        )
+
+
+def _last_week_stats_etag(request: HttpRequest) -> str:
+    """ETag of the last-week report. Changes when new robots are added or the report window moves."""
+    return report_cache_key(last_week_report_window())
+
+
+def _last_week_stats_last_modified(request: HttpRequest) -> datetime | None:
+    """Last-Modified of the last-week report, i.e. when new robots were added last time or when the report window
+    moved to the current day (at local midnight), whichever is later
+    """
+    if (modified := production_modified()) is None:
+        return None
+
+    return max(modified, tz.make_aware(datetime.combine(tz.localdate(), datetime.min.time())))
+
+
 @require_GET
+@condition(etag_func=_last_week_stats_etag, last_modified_func=_last_week_stats_last_modified)
 def last_week_stats_view(request: HttpRequest) -> HttpResponse | FileResponse:
-    """Response with .xlsx file containing summary of robot production totals for the last week"""
+    """Response with .xlsx file containing summary of robot production totals for the last week.
+    Report is cached until new robots are added, so conditional requests may get `304 Not Modified`.
+    """
+    timestamp = tz.now()  # Will be added to filename to make it unique and informative
     try:
-        file_path = create_xlsx_file()
+        report = create_xlsx_report()
     except (Exception,):
+        logger.exception("Failed to create last-week report")
         return redirect(reverse("last_week_stats_error_view"))
     else:
-        return FileResponse(open(file_path, "rb"), status=HTTPStatus.OK)
+        return FileResponse(report, filename=f"report_{timestamp.strftime('%Y%m%d_%H%M%S')}.xlsx", status=HTTPStatus.OK)
+
+
+# Bounded, so generating reports can't occupy every thread of the default executor
+_reports_executor = ThreadPoolExecutor(max_workers=settings.REPORTS_MAX_WORKERS, thread_name_prefix="reports")
+
+
+def _create_xlsx_report_in_executor() -> BytesIO:
+    """Run `create_xlsx_report()` in `_reports_executor` thread.
+    Close its DB connection afterwards if it's broken or older than `CONN_MAX_AGE`, like at the end of a request.
+    """
+    try:
+        return create_xlsx_report()
+    finally:
+        close_old_connections()
+
+
+async def last_week_stats_async_view(request: HttpRequest) -> HttpResponse | FileResponse:
+    """Async `last_week_stats_view`. Report is generated in a bounded thread pool instead of the event loop."""
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(("GET", "HEAD"))
+
+    etag = quote_etag(await sync_to_async(_last_week_stats_etag)(request))
+    last_modified = await sync_to_async(_last_week_stats_last_modified)(request)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    if response := get_conditional_response(request, etag=etag, last_modified=last_modified):
+        return response
+
+    timestamp = tz.now()  # Will be added to filename to make it unique and informative
+    try:
+        report = await asyncio.get_running_loop().run_in_executor(_reports_executor, _create_xlsx_report_in_executor)
+    except (Exception,):
+        logger.exception("Failed to create last-week report")
+        return redirect(reverse("last_week_stats_error_view"))
+
+    response = FileResponse(report, filename=f"report_{timestamp.strftime('%Y%m%d_%H%M%S')}.xlsx", status=HTTPStatus.OK)
+    response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+    return response
+
+
+@require_GET
+def production_report_view(request: HttpRequest) -> JsonResponse | FileResponse:
+    """JSON API endpoint with robot production totals for any days range, aggregated by day, week or month.
+    Rows are paginated. If `format=xlsx` is given, the whole report is returned as `.xlsx` file instead.
+    """
+    try:
+        params, rows = get_production_report(request)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=HTTPStatus.BAD_REQUEST)
+
+    if params["format"] == "xlsx":
+        with log_duration(logger, "report_rendered", report="production") as fields:
+            report = BytesIO()
+            write_production_report_xlsx(rows.iterator(), report)
+            fields["size"] = report.tell()
+        report.seek(0)
+        filename = f"production_{params['start']:%Y%m%d}_{params['end']:%Y%m%d}_{params['granularity']}.xlsx"
+        return FileResponse(report, filename=filename, status=HTTPStatus.OK)
+
+    paginator = Paginator(rows, params["page_size"])
+    try:
+        page = paginator.page(params["page"])
+    except EmptyPage as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=HTTPStatus.BAD_REQUEST)
+
+    return JsonResponse(
+        {"status": "success", "data": list(page.object_list), "page": page.number, "pages": paginator.num_pages},
+        status=HTTPStatus.OK,
+    )
+
+
+@require_GET
+def production_totals_view(request: HttpRequest) -> JsonResponse:
+    """JSON API endpoint with current production totals of every model and version.
+    Served from in-process counters, so it only reads production events added since the previous call.
+    """
+    totals, last_event_id = production_counters.totals()
+    data = []
+    for serial, count in sorted(totals.items()):
+        model, version = Robot.split_serial(serial)
+        data.append({"model": model, "version": version, "count": count})
+
+    return JsonResponse(
+        {"status": "success", "data": data, "total": sum(totals.values()), "last_event_id": last_event_id},
+        status=HTTPStatus.OK,
+    )
+
+
+@require_GET
+def export_robots_view(request: HttpRequest) -> JsonResponse | StreamingHttpResponse:
+    """Stream raw robot records as CSV or NDJSON file, optionally filtered by model, version and days range"""
+    try:
+        export_format, lines = export_robots_request(request)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": f"{e}"}, status=HTTPStatus.BAD_REQUEST)
+
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[export_format], status=HTTPStatus.OK)
+    response.headers["Content-Disposition"] = f'attachment; filename="robots.{export_format}"'
+
+    return response
+
+
+def _report_job_data(job: ReportJob) -> dict:
+    """Return public state of `job` with URLs to poll it and download its report"""
+    return {
+        "id": job.id,
+        "report": job.kind,
+        "params": job.params,
+        "status": job.status,
+        "error": job.error or None,
+        "created": job.created,
+        "finished": job.finished,
+        "url": reverse("report_job_view", args=(job.id,)),
+        "download": (
+            reverse("report_job_download_view", args=(job.id,)) if job.status == ReportJob.Status.DONE else None
+        ),
+    }
+
+
+def _report_job_not_found() -> JsonResponse:
+    return JsonResponse({"status": "error", "message": HTTPStatus.NOT_FOUND.phrase}, status=HTTPStatus.NOT_FOUND)
+
+
+@csrf_exempt
+def new_report_job_view(request: HttpRequest) -> JsonResponse:
+    """JSON API endpoint for queueing `.xlsx` report to be built in background by `run_report_jobs` command.
+    Report is described by query params: `report` (`last-week` or `production`) and `production_report_view` ones.
+    Requests for the same report share one job. Poll the returned URL until the job is done, then download the report.
+    """
+    if request.method == "POST":
+        try:
+            job, created = enqueue_report_job(request)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": f"{e}"}, status=HTTPStatus.BAD_REQUEST)
+
+        response = JsonResponse({"status": "success", "data": _report_job_data(job)}, status=HTTPStatus.ACCEPTED)
+        response.headers["Location"] = reverse("report_job_view", args=(job.id,))
+
+        return response
+    else:
+        return JsonResponse(
+            {"status": "error", "message": HTTPStatus.METHOD_NOT_ALLOWED.phrase},
+            status=HTTPStatus.METHOD_NOT_ALLOWED,
+        )
+
+
+@require_GET
+def report_job_view(request: HttpRequest, job_id: int) -> JsonResponse:
+    """JSON API endpoint with the state of report job"""
+    try:
+        job = ReportJob.objects.get(id=job_id)
+    except ReportJob.DoesNotExist:
+        return _report_job_not_found()
+
+    return JsonResponse({"status": "success", "data": _report_job_data(job)}, status=HTTPStatus.OK)
+
+
+@require_GET
+def report_job_download_view(request: HttpRequest, job_id: int) -> JsonResponse | FileResponse:
+    """Response with `.xlsx` file built by report job. Available until the job expires."""
+    try:
+        job = ReportJob.objects.get(id=job_id)
+    except ReportJob.DoesNotExist:
+        return _report_job_not_found()
+
+    if job.status != ReportJob.Status.DONE:
+        return JsonResponse(
+            {"status": "error", "message": f"Report is {job.status}, not done"}, status=HTTPStatus.CONFLICT
+        )
+    try:
+        report = open(report_path(job), "rb")
+    except FileNotFoundError:
+        return _report_job_not_found()
+
+    return FileResponse(report, filename=report_download_name(job), status=HTTPStatus.OK)
 
 
 @require_GET